@@ -0,0 +1 @@
+"""Performance benchmarks for goodbase, run against a fake Evergreen server."""
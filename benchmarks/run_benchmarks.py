@@ -0,0 +1,139 @@
+"""Run the benchmark suite and compare it against a saved baseline."""
+import json
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import click
+
+from benchmarks.scenarios import (
+    DEFAULT_ROUNDS,
+    REFERENCE_SCENARIO,
+    SCENARIOS,
+    BenchmarkResult,
+    measure,
+)
+
+BASELINE_FILE = Path(__file__).parent / "baseline.json"
+DEFAULT_TOLERANCE = 0.25
+
+
+def compare(
+    results: List[BenchmarkResult], baseline: Dict[str, Dict], tolerance: float
+) -> List[str]:
+    """
+    Find the measurements that regressed from the baseline.
+
+    Measurements may grow by `tolerance` before being reported, since they vary between runs.
+    This includes the number of API calls, since a search stops checking a version as soon as one
+    build misses the criteria, and how many other builds were requested by then depends on timing.
+    Wall times are compared relative to the reference scenario, so a baseline saved on one
+    machine can be compared against on another.
+
+    :param results: Measurements to check.
+    :param baseline: Baseline measurements by scenario name.
+    :param tolerance: Fraction measurements may grow by before being reported.
+    :return: Description of each regression.
+    """
+    regressions = []
+    for result in results:
+        expected = baseline.get(result.name)
+        if expected is None:
+            continue
+        if result.relative_wall is not None and result.relative_wall > expected["relative_wall"] * (
+            1 + tolerance
+        ):
+            regressions.append(
+                f"{result.name}: relative wall time {expected['relative_wall']:.3f} -> "
+                f"{result.relative_wall:.3f}"
+            )
+        if result.peak_memory_bytes > expected["peak_memory_bytes"] * (1 + tolerance):
+            regressions.append(
+                f"{result.name}: peak memory {expected['peak_memory_bytes']} -> "
+                f"{result.peak_memory_bytes} bytes"
+            )
+        if result.api_calls > expected["api_calls"] * (1 + tolerance):
+            regressions.append(
+                f"{result.name}: API calls {expected['api_calls']} -> {result.api_calls}"
+            )
+    return regressions
+
+
+def echo_result(result: BenchmarkResult) -> None:
+    """
+    Print the measurements of a scenario.
+
+    :param result: Measurements to print.
+    """
+    click.echo(
+        f"{result.name:<48} {result.wall_secs:>9.4f}s {result.relative_wall or 0:>9.2f}x "
+        f"{result.api_calls:>7} calls {result.peak_memory_bytes / 1024 / 1024:>9.2f} MiB"
+    )
+
+
+@click.command(context_settings=dict(max_content_width=100))
+@click.option("--rounds", type=int, default=DEFAULT_ROUNDS, help="Number of timed rounds.")
+@click.option("-k", "--filter", "name_filter", help="Only run scenarios containing this string.")
+@click.option(
+    "--output", type=click.Path(dir_okay=False), help="Save results to this file as JSON."
+)
+@click.option(
+    "--compare",
+    "compare_file",
+    type=click.Path(exists=True, dir_okay=False),
+    help="Compare results against this baseline file and fail on regressions.",
+)
+@click.option(
+    "--tolerance",
+    type=float,
+    default=DEFAULT_TOLERANCE,
+    show_default=True,
+    help="Fraction measurements may grow by before counting as a regression.",
+)
+def main(
+    rounds: int,
+    name_filter: Optional[str],
+    output: Optional[str],
+    compare_file: Optional[str],
+    tolerance: float,
+) -> None:
+    """
+    Run the goodbase benchmark suite.
+
+    Every scenario runs against a fake Evergreen server on this machine, so results only depend
+    on the code being measured. Wall times are also reported relative to a reference scenario
+    that is always run. Save a baseline with `--output benchmarks/baseline.json` and check for
+    regressions with `--compare benchmarks/baseline.json`.
+    """
+    reference = measure(REFERENCE_SCENARIO, rounds)
+    echo_result(reference.relative_to(reference))
+    results = []
+    for scenario in SCENARIOS:
+        if name_filter and name_filter not in scenario.name:
+            continue
+        result = measure(scenario, rounds).relative_to(reference)
+        results.append(result)
+        echo_result(result)
+
+    if output:
+        with open(output, "w") as output_file:
+            json.dump(
+                {result.name: result.as_baseline() for result in results},
+                output_file,
+                indent=2,
+                sort_keys=True,
+            )
+            output_file.write("\n")
+
+    if compare_file:
+        with open(compare_file) as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = compare(results, baseline, tolerance)
+        for regression in regressions:
+            click.echo(f"REGRESSION {regression}", err=True)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,487 @@
+"""Benchmark scenarios and the code to measure them."""
+from __future__ import annotations
+
+import gc
+import multiprocessing
+import shutil
+import statistics
+import tempfile
+import tracemalloc
+from abc import ABC, abstractmethod
+from multiprocessing.connection import Connection
+from pathlib import Path
+from threading import Lock
+from time import perf_counter
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import requests
+from evergreen import EvergreenApi
+
+from fake_evergreen import FakeEvergreenData, FakeEvergreenServer, create_search_service
+from goodbase.build_checker import BuildChecks
+from goodbase.evg_client import PooledEvergreenApi
+from goodbase.goodbase_options import GoodBaseOptions, OutputFormat
+from goodbase.models.build_status import BuildStatus
+from goodbase.services.cache_service import CacheService
+from goodbase.services.evg_service import BuildDataSource, EvergreenService
+from goodbase.services.executor_service import ExecutorService
+from goodbase.services.file_service import FileService
+from goodbase.services.git_service import GitAction
+from goodbase.services.profile_service import ProfileService
+
+PROJECT = "bench-project"
+DEFAULT_ROUNDS = 3
+# Number of strings the reference scenario sorts.
+REFERENCE_SIZE = 200_000
+
+
+class BenchmarkResult(NamedTuple):
+    """
+    Measurements of a benchmark scenario.
+
+    name: Name of scenario.
+    rounds: Number of timed rounds.
+    wall_secs: Median wall time of a round.
+    min_wall_secs: Fastest wall time of a round.
+    api_calls: Median number of requests made to Evergreen in a round.
+    peak_memory_bytes: Peak memory allocated during a round.
+    relative_wall: Median wall time as a multiple of the wall time of the reference scenario.
+    """
+
+    name: str
+    rounds: int
+    wall_secs: float
+    min_wall_secs: float
+    api_calls: int
+    peak_memory_bytes: int
+    relative_wall: Optional[float] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Get a dictionary representation of the result."""
+        return self._asdict()
+
+    def relative_to(self, reference: BenchmarkResult) -> BenchmarkResult:
+        """
+        Get this result with its wall time relative to the given reference result.
+
+        :param reference: Result of the reference scenario measured on the same machine.
+        :return: Result with its relative wall time filled in.
+        """
+        return self._replace(relative_wall=self.wall_secs / reference.wall_secs)
+
+    def as_baseline(self) -> Dict[str, Any]:
+        """
+        Get the measurements of this result that can be compared across machines.
+
+        Absolute wall times depend on the machine the benchmarks ran on, so only the wall time
+        relative to the reference scenario is kept.
+        """
+        return {
+            "name": self.name,
+            "rounds": self.rounds,
+            "relative_wall": self.relative_wall,
+            "api_calls": self.api_calls,
+            "peak_memory_bytes": self.peak_memory_bytes,
+        }
+
+
+def _serve_synthetic(data_kwargs: Dict[str, Any], conn: Connection) -> None:
+    """
+    Serve synthetic data until told to stop.
+
+    :param data_kwargs: Arguments to generate the data with.
+    :param conn: Connection to send the server URL on and wait for the stop message on.
+    """
+    with FakeEvergreenServer(FakeEvergreenData.synthetic(**data_kwargs)) as server:
+        conn.send(server.url)
+        conn.recv()
+
+
+class ServerProcess:
+    """
+    A fake Evergreen server running in a child process.
+
+    Running the server in its own process keeps the memory it uses to generate and serve data
+    out of the measurements of the process being benchmarked.
+    """
+
+    def __init__(self, **data_kwargs: Any) -> None:
+        """
+        Initialize the server process.
+
+        :param data_kwargs: Arguments to generate synthetic data with.
+        """
+        self.data_kwargs = data_kwargs
+        self.url = ""
+        self._conn: Optional[Connection] = None
+        self._process: Optional[multiprocessing.Process] = None
+
+    def __enter__(self) -> ServerProcess:
+        """Start the server and wait for it to be ready."""
+        self._conn, child_conn = multiprocessing.Pipe()
+        self._process = multiprocessing.Process(
+            target=_serve_synthetic, args=(self.data_kwargs, child_conn), daemon=True
+        )
+        self._process.start()
+        self.url = self._conn.recv()
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        """Stop the server."""
+        if self._conn is not None:
+            self._conn.send("stop")
+        if self._process is not None:
+            self._process.join()
+
+
+class RequestCounter:
+    """Counts the requests made through a session."""
+
+    def __init__(self, session: requests.Session) -> None:
+        """
+        Start counting requests made through the given session.
+
+        :param session: Session to count requests of.
+        """
+        self.count = 0
+        self._lock = Lock()
+        session.hooks["response"].append(self._on_response)
+
+    def _on_response(self, response: requests.Response, *args: Any, **kwargs: Any) -> None:
+        """Record that a request was made."""
+        # Responses arrive on every worker thread at once.
+        with self._lock:
+            self.count += 1
+
+
+class Scenario(ABC):
+    """
+    A benchmark scenario.
+
+    `setup` is called once before any rounds, and `teardown` once after all of them. Each round
+    calls `prepare` and then times `run`, so any per-round state, like a cold cache, is created
+    outside of the timed section.
+    """
+
+    name = ""
+
+    def setup(self) -> None:
+        """Create state shared by every round."""
+
+    def teardown(self) -> None:
+        """Clean up state shared by every round."""
+
+    def prepare(self) -> None:
+        """Create the state for a round."""
+
+    @abstractmethod
+    def run(self) -> Any:
+        """Run the code being benchmarked."""
+
+    def finish(self) -> None:
+        """Clean up the state for a round."""
+
+    def api_calls(self) -> int:
+        """Get the number of requests made to Evergreen in the last round."""
+        return 0
+
+
+class SearchScenario(Scenario):
+    """Search a project history for a revision with `SearchService.find_revision`."""
+
+    def __init__(
+        self,
+        name: str,
+        lookback: int,
+        n_variants: int,
+        n_tasks: int,
+        build_checks: List[BuildChecks],
+    ) -> None:
+        """
+        Initialize the scenario.
+
+        :param name: Name of scenario.
+        :param lookback: Number of versions to search, none of which meet the criteria.
+        :param n_variants: Number of build variants in each version.
+        :param n_tasks: Number of tasks in each build.
+        :param build_checks: Criteria to search with.
+        """
+        self.name = name
+        self.lookback = lookback
+        self.n_variants = n_variants
+        self.n_tasks = n_tasks
+        self.build_checks = build_checks
+        self._server: Optional[ServerProcess] = None
+        self._cache_dir: Optional[str] = None
+        self._search_service: Any = None
+        self._counter: Optional[RequestCounter] = None
+
+    def setup(self) -> None:
+        """Start a server with a history where no version meets the criteria."""
+        self._server = ServerProcess(
+            project_id=PROJECT,
+            n_versions=self.lookback + 1,
+            n_variants=self.n_variants,
+            n_tasks=self.n_tasks,
+            good_version_rate=0.0,
+        )
+        self._server.__enter__()
+
+    def teardown(self) -> None:
+        """Stop the server."""
+        if self._server is not None:
+            self._server.__exit__()
+
+    def prepare(self) -> None:
+        """Create a search service with a cold cache and no open connections."""
+        assert self._server is not None
+        self._cache_dir = tempfile.mkdtemp()
+        options = GoodBaseOptions(
+            max_lookback=self.lookback,
+            commit_limit=None,
+            operation=GitAction.NONE,
+            override_criteria=False,
+            output_format=OutputFormat.JSON,
+        )
+        self._search_service = create_search_service(
+            self._server.url, Path(self._cache_dir), options
+        )
+        self._counter = RequestCounter(self._search_service.evg_api._session)
+
+    def run(self) -> Any:
+        """Search for a revision."""
+        return self._search_service.find_revision(PROJECT, self.build_checks)
+
+    def finish(self) -> None:
+        """Stop the worker pool and remove the cache."""
+        self._search_service.evg_service.executor_service.shutdown()
+        if self._cache_dir is not None:
+            shutil.rmtree(self._cache_dir, ignore_errors=True)
+
+    def api_calls(self) -> int:
+        """Get the number of requests made to Evergreen in the last round."""
+        return self._counter.count if self._counter else 0
+
+
+class AnalyzeBuildScenario(Scenario):
+    """Summarize one large build with `EvergreenService.analyze_build`."""
+
+    def __init__(self, name: str, n_tasks: int, data_source: BuildDataSource) -> None:
+        """
+        Initialize the scenario.
+
+        :param name: Name of scenario.
+        :param n_tasks: Number of tasks in the build.
+        :param data_source: Where to get the data about the build from.
+        """
+        self.name = name
+        self.n_tasks = n_tasks
+        self.data_source = data_source
+        self._server: Optional[ServerProcess] = None
+        self._build_id = ""
+        self._cache_dir: Optional[str] = None
+        self._evg_service: Any = None
+        self._counter: Optional[RequestCounter] = None
+
+    def setup(self) -> None:
+        """Start a server with a single large build."""
+        self._server = ServerProcess(
+            project_id=PROJECT,
+            n_versions=1,
+            n_variants=1,
+            n_tasks=self.n_tasks,
+            n_running_versions=0,
+        )
+        self._server.__enter__()
+        version = next(EvergreenApi(api_server=self._server.url).versions_by_project(PROJECT))
+        self._build_id = version.build_variants_status[0].build_id
+
+    def teardown(self) -> None:
+        """Stop the server."""
+        if self._server is not None:
+            self._server.__exit__()
+
+    def prepare(self) -> None:
+        """Create a service with a cold cache."""
+        assert self._server is not None
+        self._cache_dir = tempfile.mkdtemp()
+        evg_api = PooledEvergreenApi(api_server=self._server.url)
+        self._counter = RequestCounter(evg_api._session)
+        self._evg_service = EvergreenService(
+            evg_api,
+            FileService(),
+            CacheService(cache_dir=Path(self._cache_dir)),
+            ExecutorService(options=_options()),
+            ProfileService(),
+        )
+
+    def run(self) -> Any:
+        """Summarize the build."""
+        return self._evg_service.analyze_build(self._build_id, self.data_source)
+
+    def finish(self) -> None:
+        """Stop the worker pool and remove the cache."""
+        self._evg_service.executor_service.shutdown()
+        if self._cache_dir is not None:
+            shutil.rmtree(self._cache_dir, ignore_errors=True)
+
+    def api_calls(self) -> int:
+        """Get the number of requests made to Evergreen in the last round."""
+        return self._counter.count if self._counter else 0
+
+
+class CheckScenario(Scenario):
+    """Check many builds against criteria with `BuildChecks.check`."""
+
+    def __init__(
+        self, name: str, n_builds: int, n_tasks: int, build_checks: List[BuildChecks]
+    ) -> None:
+        """
+        Initialize the scenario.
+
+        :param name: Name of scenario.
+        :param n_builds: Number of builds to check.
+        :param n_tasks: Number of tasks in each build.
+        :param build_checks: Criteria to check the builds against.
+        """
+        self.name = name
+        self.n_builds = n_builds
+        self.n_tasks = n_tasks
+        self.build_checks = build_checks
+        self._build_statuses: List[BuildStatus] = []
+
+    def setup(self) -> None:
+        """Create the builds to check, where every other task failed in every other build."""
+        all_tasks = [f"task_{i}" for i in range(self.n_tasks)]
+        self._build_statuses = [
+            BuildStatus(
+                build_name=f"build_{b}",
+                build_variant=f"variant-{b}-required",
+                successful_tasks=all_tasks if b % 2 == 0 else all_tasks[::2],
+                inactive_tasks=[],
+                all_tasks=all_tasks,
+            )
+            for b in range(self.n_builds)
+        ]
+
+    def run(self) -> Any:
+        """Check every build against every rule."""
+        return [bc.check(bs) for bs in self._build_statuses for bc in self.build_checks]
+
+
+class ReferenceScenario(Scenario):
+    """
+    A fixed amount of pure Python work that other wall times are measured relative to.
+
+    How fast the reference runs depends only on the machine and Python version, so dividing wall
+    times by it gives measurements that can be compared between machines.
+    """
+
+    name = "reference"
+
+    def run(self) -> Any:
+        """Build and sort a list of strings."""
+        return sorted(f"task_{i % 1009}_{i}" for i in range(REFERENCE_SIZE))
+
+
+def _options() -> GoodBaseOptions:
+    """Get options for services used in benchmarks."""
+    return GoodBaseOptions(
+        max_lookback=0, commit_limit=None, operation=GitAction.NONE, override_criteria=False
+    )
+
+
+THRESHOLDS = [
+    BuildChecks(build_variant_regex=[".*-required$"], success_threshold=0.95, run_threshold=0.9)
+]
+NAMED_TASKS = [
+    BuildChecks(
+        build_variant_regex=[".*-required$"],
+        successful_tasks={f"task_{i}" for i in range(0, 20, 2)},
+        active_tasks={f"task_{i}" for i in range(1, 20, 2)},
+    )
+]
+CRITERIA_GROUPS = [
+    BuildChecks(build_variant_regex=[".*-required$"], success_threshold=0.95),
+    BuildChecks(build_variant_regex=["^variant-1", "^variant-3"], run_threshold=0.9),
+    BuildChecks(build_variant_regex=["^variant-[0-9]-required$"], active_tasks={"task_0"}),
+]
+MANY_NAMED_TASKS = [
+    BuildChecks(
+        build_variant_regex=[".*-required$"],
+        successful_tasks={f"task_{i}" for i in range(0, 5000, 25)},
+    )
+]
+
+REFERENCE_SCENARIO = ReferenceScenario()
+SCENARIOS: List[Scenario] = [
+    SearchScenario("search-50-versions-20-variants-thresholds", 50, 20, 20, THRESHOLDS),
+    SearchScenario("search-200-versions-20-variants-thresholds", 200, 20, 20, THRESHOLDS),
+    SearchScenario("search-1000-versions-20-variants-thresholds", 1000, 20, 20, THRESHOLDS),
+    SearchScenario("search-50-versions-200-variants-thresholds", 50, 200, 20, THRESHOLDS),
+    SearchScenario("search-200-versions-20-variants-named-tasks", 200, 20, 20, NAMED_TASKS),
+    SearchScenario("search-200-versions-20-variants-3-rules", 200, 20, 20, CRITERIA_GROUPS),
+    AnalyzeBuildScenario("analyze-build-5000-tasks-counts", 5000, BuildDataSource.BUILD),
+    AnalyzeBuildScenario("analyze-build-5000-tasks-task-list", 5000, BuildDataSource.TASKS),
+    CheckScenario("check-100-builds-5000-tasks-thresholds", 100, 5000, THRESHOLDS),
+    CheckScenario("check-100-builds-5000-tasks-named-tasks", 100, 5000, MANY_NAMED_TASKS),
+    CheckScenario("check-100-builds-5000-tasks-3-rules", 100, 5000, CRITERIA_GROUPS),
+]
+
+
+def peak_memory(scenario: Scenario) -> int:
+    """
+    Measure the peak memory allocated during one round of a scenario that has been set up.
+
+    :param scenario: Scenario to measure.
+    :return: Peak number of bytes allocated.
+    """
+    scenario.prepare()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        scenario.run()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+        scenario.finish()
+
+
+def measure(scenario: Scenario, rounds: int = DEFAULT_ROUNDS) -> BenchmarkResult:
+    """
+    Measure the given scenario.
+
+    Wall time and API calls are taken from `rounds` timed rounds. Peak memory is taken from one
+    extra round with allocation tracing turned on, since tracing slows everything down.
+
+    :param scenario: Scenario to measure.
+    :param rounds: Number of timed rounds to run.
+    :return: Measurements of the scenario.
+    """
+    scenario.setup()
+    try:
+        wall_times = []
+        api_calls = []
+        for _ in range(rounds):
+            scenario.prepare()
+            gc.collect()
+            start = perf_counter()
+            try:
+                scenario.run()
+            finally:
+                wall_times.append(perf_counter() - start)
+                scenario.finish()
+            api_calls.append(scenario.api_calls())
+
+        peak_memory_bytes = peak_memory(scenario)
+    finally:
+        scenario.teardown()
+
+    return BenchmarkResult(
+        name=scenario.name,
+        rounds=rounds,
+        wall_secs=statistics.median(wall_times),
+        min_wall_secs=min(wall_times),
+        api_calls=int(statistics.median(api_calls)),
+        peak_memory_bytes=peak_memory_bytes,
+    )
@@ -0,0 +1,26 @@
+"""Benchmark scenarios for pytest-benchmark."""
+import pytest
+
+from benchmarks.scenarios import DEFAULT_ROUNDS, SCENARIOS, peak_memory
+
+pytest.importorskip("pytest_benchmark")
+
+
+@pytest.mark.parametrize("scenario", SCENARIOS, ids=[scenario.name for scenario in SCENARIOS])
+def test_scenario(benchmark, scenario):
+    rounds_started = []
+
+    def prepare():
+        if rounds_started:
+            scenario.finish()
+        scenario.prepare()
+        rounds_started.append(True)
+
+    scenario.setup()
+    try:
+        benchmark.pedantic(scenario.run, setup=prepare, rounds=DEFAULT_ROUNDS)
+        scenario.finish()
+        benchmark.extra_info["api_calls"] = scenario.api_calls()
+        benchmark.extra_info["peak_memory_bytes"] = peak_memory(scenario)
+    finally:
+        scenario.teardown()
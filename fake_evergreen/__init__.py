@@ -0,0 +1,12 @@
+"""An offline stand-in for the Evergreen REST API, for reproducible tests and benchmarks."""
+from fake_evergreen.data import FIXTURES_DIR, FakeEvergreenData
+from fake_evergreen.harness import create_search_service
+from fake_evergreen.server import EndpointBehavior, FakeEvergreenServer
+
+__all__ = [
+    "FIXTURES_DIR",
+    "EndpointBehavior",
+    "FakeEvergreenData",
+    "FakeEvergreenServer",
+    "create_search_service",
+]
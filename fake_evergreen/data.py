@@ -0,0 +1,276 @@
+"""Data served by the fake Evergreen server."""
+from __future__ import annotations
+
+import hashlib
+import json
+import random
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from evergreen import EvergreenApi
+from requests.exceptions import HTTPError
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+SUCCESS = "success"
+FAILED = "failed"
+STARTED = "started"
+UNDISPATCHED = "undispatched"
+# Not a status Evergreen reports: an undispatched task that was never activated.
+INACTIVE = "inactive"
+
+
+@dataclass
+class FakeEvergreenData:
+    """
+    Documents served by the fake Evergreen server, stored in the shape the REST API returns them.
+
+    projects: Project documents by project ID.
+    versions: Version documents of each project, newest first.
+    builds: Build documents by build ID.
+    tasks: Task documents of each build.
+    manifests: Manifest documents by project ID and revision, left out for revisions without one.
+    """
+
+    projects: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    versions: Dict[str, List[Dict[str, Any]]] = field(default_factory=dict)
+    builds: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    tasks: Dict[str, List[Dict[str, Any]]] = field(default_factory=dict)
+    manifests: Dict[Tuple[str, str], Dict[str, Any]] = field(default_factory=dict)
+
+    @classmethod
+    def synthetic(
+        cls,
+        project_id: str = "fake-project",
+        n_versions: int = 100,
+        n_variants: int = 10,
+        n_tasks: int = 50,
+        good_version_rate: float = 0.2,
+        n_running_versions: int = 3,
+        modules: Optional[List[str]] = None,
+        seed: int = 0,
+    ) -> FakeEvergreenData:
+        """
+        Generate a project with a history of versions.
+
+        Half of the build variants end in `-required`. A `good_version_rate` fraction of versions
+        have every task pass, the rest have some failing or unrun tasks, and the newest
+        `n_running_versions` are still running.
+
+        :param project_id: ID of project to generate.
+        :param n_versions: Number of versions to generate.
+        :param n_variants: Number of build variants in each version.
+        :param n_tasks: Number of tasks in each build.
+        :param good_version_rate: Fraction of versions where every task passes.
+        :param n_running_versions: Number of newest versions that are still running.
+        :param modules: Names of modules in the project.
+        :param seed: Seed for the random generator.
+        :return: Generated data.
+        """
+        rng = random.Random(seed)
+        data = cls()
+        data.projects[project_id] = {
+            "id": project_id,
+            "identifier": project_id,
+            "remote_path": "etc/evergreen.yml",
+            "enabled": True,
+        }
+        variants = [
+            f"variant-{i}-required" if i % 2 == 0 else f"variant-{i}" for i in range(n_variants)
+        ]
+        start_time = datetime(2021, 1, 1)
+        data.versions[project_id] = []
+        for order in range(n_versions, 0, -1):
+            revision = hashlib.sha1(f"{project_id} {seed} {order}".encode()).hexdigest()
+            version_id = f"{project_id.replace('-', '_')}_{revision}"
+            running = order > n_versions - n_running_versions
+            good = not running and rng.random() < good_version_rate
+            build_summaries = []
+            for build_variant in variants:
+                build_id = f"{version_id}_{build_variant.replace('-', '_')}"
+                task_statuses = [cls._task_status(rng, good, running) for _ in range(n_tasks)]
+                data._add_build(
+                    project_id, version_id, order, build_variant, build_id, task_statuses
+                )
+                build_summaries.append({"build_variant": build_variant, "build_id": build_id})
+
+            data.versions[project_id].append(
+                {
+                    "version_id": version_id,
+                    "revision": revision,
+                    "order": order,
+                    "project": project_id,
+                    "requester": "gitter_request",
+                    "create_time": (start_time + timedelta(hours=order)).isoformat() + "Z",
+                    "build_variants_status": build_summaries,
+                }
+            )
+            data.manifests[(project_id, revision)] = {
+                "id": version_id,
+                "revision": revision,
+                "project": project_id,
+                "branch": "master",
+                "modules": {
+                    module: {
+                        "repo": module,
+                        "branch": "master",
+                        "revision": hashlib.sha1(f"{module} {revision}".encode()).hexdigest(),
+                        "owner": "fake",
+                        "url": f"https://github.com/fake/{module}",
+                    }
+                    for module in modules or []
+                },
+            }
+        return data
+
+    @classmethod
+    def record(cls, evg_api: EvergreenApi, project_id: str, n_versions: int) -> FakeEvergreenData:
+        """
+        Record the newest versions of a project from a real Evergreen server.
+
+        :param evg_api: Client for the Evergreen server to record from.
+        :param project_id: ID of project to record.
+        :param n_versions: Number of versions to record.
+        :return: Recorded data.
+        """
+        data = cls()
+        data.projects[project_id] = evg_api.project_by_id(project_id).json
+        data.versions[project_id] = []
+        for idx, version in enumerate(evg_api.versions_by_project(project_id)):
+            if idx >= n_versions:
+                break
+            data.versions[project_id].append(version.json)
+            for build_summary in version.build_variants_status:
+                build = evg_api.build_by_id(build_summary.build_id)
+                data.builds[build.id] = build.json
+                data.tasks[build.id] = [task.json for task in build.get_tasks()]
+            try:
+                manifest = evg_api.manifest(project_id, version.revision)
+            except HTTPError as err:
+                if err.response is None or err.response.status_code != 404:
+                    raise
+                # Projects without modules have no manifest, which is served as a 404.
+                continue
+            data.manifests[(project_id, version.revision)] = manifest.json
+        return data
+
+    @classmethod
+    def load(cls, path: Path) -> FakeEvergreenData:
+        """
+        Load data saved with `save`.
+
+        :param path: File to load from.
+        :return: Loaded data.
+        """
+        with open(path) as data_file:
+            contents = json.load(data_file)
+        return cls(
+            projects=contents["projects"],
+            versions=contents["versions"],
+            builds=contents["builds"],
+            tasks=contents["tasks"],
+            manifests={
+                (manifest["project"], manifest["revision"]): manifest
+                for manifest in contents["manifests"]
+            },
+        )
+
+    def save(self, path: Path) -> None:
+        """
+        Save this data so it can be served again later.
+
+        :param path: File to save to.
+        """
+        contents = {
+            "projects": self.projects,
+            "versions": self.versions,
+            "builds": self.builds,
+            "tasks": self.tasks,
+            "manifests": list(self.manifests.values()),
+        }
+        with open(path, "w") as data_file:
+            json.dump(contents, data_file, indent=1, sort_keys=True)
+
+    def _add_build(
+        self,
+        project_id: str,
+        version_id: str,
+        order: int,
+        build_variant: str,
+        build_id: str,
+        task_statuses: List[str],
+    ) -> None:
+        """
+        Add a build with tasks in the given states.
+
+        :param project_id: ID of project the build belongs to.
+        :param version_id: ID of version the build belongs to.
+        :param order: Order of the version the build belongs to.
+        :param build_variant: Build variant of the build.
+        :param build_id: ID of the build.
+        :param task_statuses: Status of each task in the build.
+        """
+        tasks = [
+            {
+                "task_id": f"{build_id}_task_{i}",
+                "display_name": f"task_{i}",
+                "build_id": build_id,
+                "build_variant": build_variant,
+                "version_id": version_id,
+                "project_id": project_id,
+                "status": UNDISPATCHED if status == INACTIVE else status,
+                "activated": status != INACTIVE,
+            }
+            for i, status in enumerate(task_statuses)
+        ]
+        if STARTED in task_statuses:
+            build_status = STARTED
+        elif FAILED in task_statuses:
+            build_status = FAILED
+        elif UNDISPATCHED in task_statuses or INACTIVE in task_statuses:
+            build_status = "created"
+        else:
+            build_status = SUCCESS
+
+        self.tasks[build_id] = tasks
+        self.builds[build_id] = {
+            "_id": build_id,
+            "project_id": project_id,
+            "version": version_id,
+            "order": order,
+            "build_variant": build_variant,
+            "display_name": build_variant,
+            "activated": any(status != INACTIVE for status in task_statuses),
+            "status": build_status,
+            "tasks": [task["task_id"] for task in tasks],
+            "status_counts": {
+                "succeeded": task_statuses.count(SUCCESS),
+                "failed": task_statuses.count(FAILED),
+                "started": task_statuses.count(STARTED),
+                "undispatched": task_statuses.count(UNDISPATCHED),
+                "inactive": task_statuses.count(INACTIVE),
+                "dispatched": 0,
+                "timed_out": 0,
+            },
+        }
+
+    @staticmethod
+    def _task_status(rng: random.Random, good: bool, running: bool) -> str:
+        """
+        Pick a status for a task.
+
+        :param rng: Random generator to use.
+        :param good: True if every task in the version passed.
+        :param running: True if the version is still running.
+        :return: Status of the task.
+        """
+        if good:
+            return SUCCESS
+        roll = rng.random()
+        if running:
+            if roll < 0.8:
+                return SUCCESS if roll < 0.5 else STARTED
+            return UNDISPATCHED if roll < 0.9 else INACTIVE
+        return SUCCESS if roll < 0.9 else FAILED if roll < 0.97 else INACTIVE
@@ -0,0 +1,45 @@
+"""Wiring of real goodbase services against a fake Evergreen server."""
+from pathlib import Path
+
+from goodbase.evg_client import PooledEvergreenApi, connection_pool_size
+from goodbase.goodbase_options import GoodBaseOptions
+from goodbase.services.cache_service import CacheService
+from goodbase.services.evg_service import EvergreenService
+from goodbase.services.executor_service import ExecutorService
+from goodbase.services.file_service import FileService
+from goodbase.services.profile_service import ProfileService
+from goodbase.services.search_service import SearchService
+from goodbase.services.verdict_ledger_service import VerdictLedgerService
+from goodbase.services.version_index_service import VersionIndexService
+
+
+def create_search_service(
+    api_server: str, cache_dir: Path, options: GoodBaseOptions
+) -> SearchService:
+    """
+    Create a search service that talks to the given fake Evergreen server.
+
+    Every service is the real implementation, so searches exercise the same code paths they do
+    against Evergreen.
+
+    :param api_server: URL of fake Evergreen server to search.
+    :param cache_dir: Directory to cache data in.
+    :param options: Options for execution.
+    :return: Search service.
+    """
+    evg_api = PooledEvergreenApi(
+        pool_size=connection_pool_size(options.evg_workers), api_server=api_server
+    )
+    cache_service = CacheService(cache_dir=cache_dir)
+    profile_service = ProfileService()
+    evg_service = EvergreenService(
+        evg_api, FileService(), cache_service, ExecutorService(options=options), profile_service
+    )
+    return SearchService(
+        evg_api,
+        evg_service,
+        VersionIndexService(evg_api=evg_api, cache_service=cache_service),
+        VerdictLedgerService(cache_service=cache_service),
+        profile_service,
+        options,
+    )
@@ -0,0 +1,224 @@
+"""A local HTTP server that stands in for the Evergreen REST API."""
+from __future__ import annotations
+
+import json
+import random
+import re
+from collections import Counter
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+from time import sleep
+from typing import Any, Callable, Dict, List, Optional, Pattern, Tuple
+from urllib.parse import parse_qs, urlencode, urlparse
+
+from fake_evergreen.data import FakeEvergreenData
+
+VERSIONS = "versions"
+BUILD = "build"
+BUILD_TASKS = "build_tasks"
+MANIFEST = "manifest"
+PROJECTS = "projects"
+PROJECT = "project"
+
+DEFAULT_PAGE_SIZE = 10
+
+
+@dataclass
+class EndpointBehavior:
+    """
+    How an endpoint of the fake server should behave.
+
+    latency_secs: Number of seconds to wait before responding.
+    error_rate: Fraction of requests that should fail.
+    error_status: HTTP status code to fail requests with.
+    """
+
+    latency_secs: float = 0.0
+    error_rate: float = 0.0
+    error_status: int = 503
+
+
+class FakeEvergreenServer:
+    """
+    A local HTTP server that serves Evergreen REST API endpoints from a FakeEvergreenData.
+
+    Only the endpoints used to search for revisions are implemented: versions by project, build
+    by ID, tasks by build, manifests and projects. The latency and error rate of each endpoint
+    can be configured, and the number of requests made to each endpoint is counted.
+    """
+
+    def __init__(
+        self,
+        data: FakeEvergreenData,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        behaviors: Optional[Dict[str, EndpointBehavior]] = None,
+        seed: int = 0,
+    ) -> None:
+        """
+        Initialize the server.
+
+        :param data: Data to serve.
+        :param page_size: Number of versions to return in each page.
+        :param behaviors: Behavior of each endpoint, by endpoint name.
+        :param seed: Seed for deciding which requests fail.
+        """
+        self.data = data
+        self.page_size = page_size
+        self.behaviors = behaviors or {}
+        self.request_counts: Counter = Counter()
+        self.connections_opened = 0
+        self._lock = Lock()
+        self._rng = random.Random(seed)
+        self._routes: List[Tuple[str, Pattern, Callable[..., Any]]] = [
+            (VERSIONS, re.compile(r"^/rest/v2/projects/([^/]+)/versions$"), self._versions),
+            (BUILD_TASKS, re.compile(r"^/rest/v2/builds/([^/]+)/tasks$"), self._build_tasks),
+            (BUILD, re.compile(r"^/rest/v2/builds/([^/]+)$"), self._build),
+            (PROJECT, re.compile(r"^/rest/v2/projects/([^/]+)$"), self._project),
+            (PROJECTS, re.compile(r"^/rest/v2/projects$"), self._projects),
+            (MANIFEST, re.compile(r"^/plugin/manifest/get/([^/]+)/([^/]+)$"), self._manifest),
+        ]
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._create_handler())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[Thread] = None
+
+    @property
+    def url(self) -> str:
+        """URL of the server."""
+        return f"http://127.0.0.1:{self._httpd.server_address[1]}"
+
+    def __enter__(self) -> FakeEvergreenServer:
+        """Start the server."""
+        self.start()
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        """Stop the server."""
+        self.stop()
+
+    def start(self) -> None:
+        """Start serving requests in a background thread."""
+        self._thread = Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop serving requests."""
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def reset_counts(self) -> None:
+        """Reset the request and connection counts."""
+        with self._lock:
+            self.request_counts.clear()
+            self.connections_opened = 0
+
+    def handle(self, path: str, query: Dict[str, List[str]]) -> Tuple[int, Any, Dict[str, str]]:
+        """
+        Respond to a request.
+
+        :param path: Path that was requested.
+        :param query: Query parameters of the request.
+        :return: Status code, JSON body and extra headers of the response.
+        """
+        for endpoint, pattern, handler in self._routes:
+            match = pattern.match(path)
+            if not match:
+                continue
+
+            behavior = self.behaviors.get(endpoint, EndpointBehavior())
+            with self._lock:
+                self.request_counts[endpoint] += 1
+                fail = self._rng.random() < behavior.error_rate
+            if behavior.latency_secs:
+                sleep(behavior.latency_secs)
+            if fail:
+                return behavior.error_status, {"message": "injected error"}, {}
+            return handler(query, *match.groups())
+
+        return 404, {"message": f"unknown endpoint: {path}"}, {}
+
+    def _versions(
+        self, query: Dict[str, List[str]], project_id: str
+    ) -> Tuple[int, Any, Dict[str, str]]:
+        """Get a page of versions, continuing after the order given by `start`."""
+        if project_id not in self.data.versions:
+            return 404, {"message": "project not found"}, {}
+        versions = self.data.versions[project_id]
+        if "start" in query:
+            start = int(query["start"][0])
+            versions = [version for version in versions if version["order"] < start]
+        limit = int(query.get("limit", [self.page_size])[0])
+        page = versions[:limit]
+        headers = {}
+        if len(versions) > limit:
+            next_query = {k: v[0] for k, v in query.items()}
+            next_query["start"] = str(page[-1]["order"])
+            next_url = f"{self.url}/rest/v2/projects/{project_id}/versions?{urlencode(next_query)}"
+            headers["Link"] = f'<{next_url}>; rel="next"'
+        return 200, page, headers
+
+    def _build(self, query: Dict[str, List[str]], build_id: str) -> Tuple[int, Any, Dict[str, str]]:
+        """Get a build by ID."""
+        if build_id not in self.data.builds:
+            return 404, {"message": "build not found"}, {}
+        return 200, self.data.builds[build_id], {}
+
+    def _build_tasks(
+        self, query: Dict[str, List[str]], build_id: str
+    ) -> Tuple[int, Any, Dict[str, str]]:
+        """Get the tasks of a build."""
+        if build_id not in self.data.tasks:
+            return 404, {"message": "build not found"}, {}
+        return 200, self.data.tasks[build_id], {}
+
+    def _project(
+        self, query: Dict[str, List[str]], project_id: str
+    ) -> Tuple[int, Any, Dict[str, str]]:
+        """Get a project by ID."""
+        if project_id not in self.data.projects:
+            return 404, {"message": "project not found"}, {}
+        return 200, self.data.projects[project_id], {}
+
+    def _projects(self, query: Dict[str, List[str]]) -> Tuple[int, Any, Dict[str, str]]:
+        """Get all projects."""
+        return 200, list(self.data.projects.values()), {}
+
+    def _manifest(
+        self, query: Dict[str, List[str]], project_id: str, revision: str
+    ) -> Tuple[int, Any, Dict[str, str]]:
+        """Get the manifest of a revision."""
+        manifest = self.data.manifests.get((project_id, revision))
+        if manifest is None:
+            return 404, {"message": "manifest not found"}, {}
+        return 200, manifest, {}
+
+    def _create_handler(self) -> type:
+        """Create a request handler class that responds using this server."""
+        fake_server = self
+
+        class FakeEvergreenHandler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body are written separately, so do not wait to batch small writes.
+            disable_nagle_algorithm = True
+
+            def setup(self) -> None:
+                super().setup()
+                with fake_server._lock:
+                    fake_server.connections_opened += 1
+
+            def do_GET(self) -> None:
+                parsed = urlparse(self.path)
+                status, body, headers = fake_server.handle(parsed.path, parse_qs(parsed.query))
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+        return FakeEvergreenHandler
@@ -0,0 +1,255 @@
+"""Vectorized evaluation of criteria over the builds of many versions at once."""
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, List, Sequence, Set
+
+from goodbase.build_checker import BuildChecks, CriteriaMatcher
+from goodbase.models.build_status import BuildStatus
+from goodbase.models.task_names import TaskNameTable, popcount
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None  # type: ignore
+
+# Flags describing the state of a task in a build.
+TASK_PRESENT = 1
+TASK_SUCCESSFUL = 2
+TASK_INACTIVE = 4
+
+
+def _require_numpy() -> None:
+    """Ensure numpy is available for batch evaluation."""
+    if np is None:
+        raise ImportError(
+            "Batch evaluation requires numpy, install it with `pip install git-co-evg-base[batch]`."
+        )
+
+
+class BuildMatrix:
+    """
+    The build statuses of many versions, stored as arrays.
+
+    The arrays are indexed by version and build variant. Task level data is indexed by version,
+    build variant and task, but only for tasks named by criteria, since thresholds only need the
+    number of tasks in each state.
+
+    variants: Names of build variants in the matrix.
+    tasks: Names of tasks in the matrix.
+    has_build: Whether each version has a build for each build variant.
+    count_only: Whether each build was summarized without task names.
+    successful: Number of successful tasks in each build.
+    inactive: Number of inactive tasks in each build.
+    total: Number of tasks in each build.
+    task_flags: State of each named task in each build.
+    """
+
+    def __init__(
+        self,
+        variants: List[str],
+        tasks: List[str],
+        has_build: Any,
+        count_only: Any,
+        successful: Any,
+        inactive: Any,
+        total: Any,
+        task_flags: Any,
+    ) -> None:
+        """
+        Initialize the matrix.
+
+        :param variants: Names of build variants in the matrix.
+        :param tasks: Names of tasks in the matrix.
+        :param has_build: Whether each version has a build for each build variant.
+        :param count_only: Whether each build was summarized without task names.
+        :param successful: Number of successful tasks in each build.
+        :param inactive: Number of inactive tasks in each build.
+        :param total: Number of tasks in each build.
+        :param task_flags: State of each named task in each build.
+        """
+        self.variants = variants
+        self.tasks = tasks
+        self.has_build = has_build
+        self.count_only = count_only
+        self.successful = successful
+        self.inactive = inactive
+        self.total = total
+        self.task_flags = task_flags
+
+    @classmethod
+    def from_build_statuses(
+        cls, version_statuses: Sequence[Iterable[BuildStatus]], task_names: Iterable[str] = ()
+    ) -> BuildMatrix:
+        """
+        Create a matrix from the build statuses of each version.
+
+        :param version_statuses: Build statuses of each version.
+        :param task_names: Names of tasks to store task level data for.
+        :return: Matrix of build statuses.
+        """
+        _require_numpy()
+        statuses = [list(build_statuses) for build_statuses in version_statuses]
+        variants = sorted(
+            {bs.build_variant for build_statuses in statuses for bs in build_statuses}
+        )
+        variant_idx = {bv: i for i, bv in enumerate(variants)}
+        tasks = sorted(set(task_names))
+        task_bits: Dict[int, List[int]] = {}
+
+        def bits_in(table: TaskNameTable) -> List[int]:
+            # Statuses can be stored over different task name tables, each with its own bits.
+            if id(table) not in task_bits:
+                task_bits[id(table)] = [table.lookup_mask([task]) for task in tasks]
+            return task_bits[id(table)]
+
+        shape = (len(statuses), len(variants))
+
+        has_build = np.zeros(shape, dtype=bool)
+        count_only = np.zeros(shape, dtype=bool)
+        successful = np.zeros(shape, dtype=np.int64)
+        inactive = np.zeros(shape, dtype=np.int64)
+        total = np.zeros(shape, dtype=np.int64)
+        task_flags = np.zeros(shape + (len(tasks),), dtype=np.uint8)
+
+        for v_idx, build_statuses in enumerate(statuses):
+            for build_status in build_statuses:
+                b_idx = variant_idx[build_status.build_variant]
+                has_build[v_idx, b_idx] = True
+                if build_status.task_counts is not None:
+                    count_only[v_idx, b_idx] = True
+                    successful[v_idx, b_idx] = build_status.task_counts.successful
+                    inactive[v_idx, b_idx] = build_status.task_counts.inactive
+                    total[v_idx, b_idx] = build_status.task_counts.total
+                    continue
+
+                successful[v_idx, b_idx] = popcount(build_status.successful_mask)
+                inactive[v_idx, b_idx] = popcount(build_status.inactive_mask)
+                total[v_idx, b_idx] = popcount(build_status.all_mask)
+                for t_idx, task_bit in enumerate(bits_in(build_status.task_names)):
+                    if not task_bit & build_status.all_mask:
+                        continue
+                    flags = TASK_PRESENT
+                    if task_bit & build_status.successful_mask:
+                        flags |= TASK_SUCCESSFUL
+                    if task_bit & build_status.inactive_mask:
+                        flags |= TASK_INACTIVE
+                    task_flags[v_idx, b_idx, t_idx] = flags
+
+        return cls(variants, tasks, has_build, count_only, successful, inactive, total, task_flags)
+
+
+class BatchEvaluator:
+    """
+    Evaluates criteria against every version in a build matrix at once.
+
+    The results match checking each build of each version with `BuildChecks.check`.
+    """
+
+    def __init__(self, build_checks: List[BuildChecks]) -> None:
+        """
+        Initialize the evaluator.
+
+        :param build_checks: Criteria to evaluate.
+        """
+        _require_numpy()
+        self.build_checks = CriteriaMatcher.of(build_checks)
+
+    def task_names(self) -> Set[str]:
+        """Get the names of tasks the criteria need task level data for."""
+        names: Set[str] = set()
+        for bc in self.build_checks:
+            names.update(bc.successful_tasks or set())
+            names.update(bc.active_tasks or set())
+        return names
+
+    def evaluate(self, matrix: BuildMatrix) -> Any:
+        """
+        Determine which versions in the given matrix meet the criteria.
+
+        :param matrix: Build statuses of the versions to evaluate.
+        :return: Boolean array with whether each version meets the criteria.
+        """
+        missing_tasks = self.task_names() - set(matrix.tasks)
+        if missing_tasks:
+            raise ValueError(f"Build matrix is missing data for tasks: {sorted(missing_tasks)}")
+
+        passing = np.ones(matrix.has_build.shape, dtype=bool)
+        task_idx: Dict[str, int] = {task: i for i, task in enumerate(matrix.tasks)}
+        for bc in self.build_checks:
+            applies = np.array(
+                [
+                    any(applicable is bc for applicable in self.build_checks.applicable(bv))
+                    for bv in matrix.variants
+                ],
+                dtype=bool,
+            )
+            checked = matrix.has_build & applies[np.newaxis, :]
+            if not checked.any():
+                continue
+            passing &= ~checked | self._meets(bc, matrix, checked, task_idx)
+        return passing.all(axis=1)
+
+    @staticmethod
+    def _meets(bc: BuildChecks, matrix: BuildMatrix, checked: Any, task_idx: Dict[str, int]) -> Any:
+        """
+        Determine which builds meet the given criteria.
+
+        :param bc: Criteria to check.
+        :param matrix: Build statuses to check.
+        :param checked: Which builds the criteria apply to.
+        :param task_idx: Index of each task in the matrix.
+        :return: Boolean array with whether each build meets the criteria.
+        """
+        meets = np.ones(checked.shape, dtype=bool)
+        if bc.success_threshold or bc.run_threshold:
+            if (checked & (matrix.total == 0)).any():
+                raise ZeroDivisionError("Can not apply thresholds to a build with no tasks")
+            total = np.where(matrix.total == 0, 1, matrix.total)
+            if bc.success_threshold:
+                meets &= matrix.successful / total >= bc.success_threshold
+            if bc.run_threshold:
+                meets &= 1.0 - matrix.inactive / total >= bc.run_threshold
+
+        if bc.requires_task_names() and (checked & meets & matrix.count_only).any():
+            raise ValueError(
+                "Task names are needed to check some builds, but only task counts are available."
+            )
+
+        if bc.successful_tasks:
+            flags = matrix.task_flags[..., [task_idx[task] for task in bc.successful_tasks]]
+            unsuccessful = (flags & TASK_PRESENT).astype(bool) & ~(flags & TASK_SUCCESSFUL).astype(
+                bool
+            )
+            meets &= ~unsuccessful.any(axis=2)
+
+        if bc.active_tasks:
+            flags = matrix.task_flags[..., [task_idx[task] for task in bc.active_tasks]]
+            inactive = (flags & TASK_PRESENT).astype(bool) & (flags & TASK_INACTIVE).astype(bool)
+            meets &= ~inactive.any(axis=2)
+
+        return meets
+
+
+def evaluate_versions(
+    build_checks: List[BuildChecks], version_statuses: Sequence[Iterable[BuildStatus]]
+) -> List[bool]:
+    """
+    Determine which versions meet the criteria, given the build statuses of each version.
+
+    The versions are evaluated together with a `BatchEvaluator` when numpy is available, otherwise
+    each build is checked on its own.
+
+    :param build_checks: Criteria to evaluate.
+    :param version_statuses: Build statuses of each version.
+    :return: Whether each version meets the criteria.
+    """
+    if np is None:
+        matcher = CriteriaMatcher.of(build_checks)
+        return [
+            all(matcher.check(build_status) for build_status in build_statuses)
+            for build_statuses in version_statuses
+        ]
+
+    evaluator = BatchEvaluator(build_checks)
+    matrix = BuildMatrix.from_build_statuses(version_statuses, evaluator.task_names())
+    return [bool(passed) for passed in evaluator.evaluate(matrix)]
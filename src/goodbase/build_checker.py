@@ -1,6 +1,10 @@
 """Criteria for checking an evergreen build."""
+from __future__ import annotations
+
+import hashlib
+import json
 import re
-from typing import List, Optional, Set
+from typing import Callable, Dict, Iterable, List, Optional, Set
 
 import structlog
 from pydantic import BaseModel
@@ -9,6 +13,8 @@ from goodbase.models.build_status import BuildStatus
 
 LOGGER = structlog.get_logger(__name__)
 
+VERSION_CREATED_STATUS = "created"
+
 
 class BuildChecks(BaseModel):
     """
@@ -36,6 +42,52 @@ class BuildChecks(BaseModel):
         """
         return any(re.match(bv_regex, build_variant) for bv_regex in self.build_variant_regex)
 
+    def compile_variant_matcher(self) -> Callable[[str], bool]:
+        """
+        Compile the build variant regexes into a single matcher.
+
+        Regexes with groups are matched on their own, since combining them would renumber their
+        groups and break any backreferences to them.
+
+        :return: Function that returns True for build variants these checks apply to.
+        """
+        patterns = [re.compile(bv_regex) for bv_regex in self.build_variant_regex]
+        matchers = [p for p in patterns if p.groups]
+        plain = [p for p in patterns if not p.groups]
+        if len(plain) > 1:
+            try:
+                plain = [re.compile("|".join(f"(?:{p.pattern})" for p in plain))]
+            except re.error:
+                # Some regexes, such as ones with global flags, can not be combined.
+                pass
+        matchers.extend(plain)
+        return lambda build_variant: any(m.match(build_variant) for m in matchers)
+
+    def requires_task_names(self) -> bool:
+        """Determine if these checks need to know the names of tasks in a build."""
+        return bool(self.successful_tasks or self.active_tasks)
+
+    def guarantees_rejection(self, activated: Optional[bool], status: Optional[str]) -> bool:
+        """
+        Determine if builds of a version in the given state can never meet these checks.
+
+        This only looks at the version document, so a return value of False does not mean the
+        builds will meet the checks.
+
+        :param activated: Whether the version has been activated, if known.
+        :param status: Status of the version, if known.
+        :return: True if builds of a version in the given state are guaranteed to fail the checks.
+        """
+        if activated is False and (self.success_threshold or self.run_threshold):
+            # None of the tasks in an unactivated version have run.
+            return True
+
+        if status == VERSION_CREATED_STATUS and self.success_threshold:
+            # None of the tasks in a version that has not started have succeeded.
+            return True
+
+        return False
+
     def check(self, build_status: BuildStatus) -> bool:
         """
         Check if the given build stats meet the specified criteria.
@@ -46,6 +98,15 @@ class BuildChecks(BaseModel):
         if not self.should_apply(build_status.build_variant):
             return True
 
+        return self.meets(build_status)
+
+    def meets(self, build_status: BuildStatus) -> bool:
+        """
+        Check if the given build stats meet the specified criteria, assuming they apply to it.
+
+        :param build_status: Status of build to check.
+        :return: True if the build matches the criteria.
+        """
         if self.success_threshold and build_status.success_pct() < self.success_threshold:
             LOGGER.debug(
                 "Unmet criteria, success_threshold",
@@ -64,11 +125,14 @@ class BuildChecks(BaseModel):
             )
             return False
 
+        if self.requires_task_names() and not build_status.has_task_names():
+            raise ValueError(
+                f"Task names are needed to check build '{build_status.build_name}', "
+                "but only task counts are available."
+            )
+
         if self.successful_tasks:
-            if any(
-                task in build_status.all_tasks and task not in build_status.successful_tasks
-                for task in self.successful_tasks
-            ):
+            if build_status.unsuccessful_among(self.successful_tasks):
                 LOGGER.debug(
                     "Unmet criteria, successful_tasks",
                     build=build_status.build_name,
@@ -77,10 +141,7 @@ class BuildChecks(BaseModel):
                 return False
 
         if self.active_tasks:
-            if any(
-                task in build_status.all_tasks and task in build_status.inactive_tasks
-                for task in self.active_tasks
-            ):
+            if build_status.inactive_among(self.active_tasks):
                 LOGGER.debug(
                     "Unmet criteria, active_tasks",
                     build=build_status.build_name,
@@ -89,3 +150,94 @@ class BuildChecks(BaseModel):
                 return False
 
         return True
+
+
+class CriteriaMatcher(List[BuildChecks]):
+    """
+    A list of criteria compiled for checking many builds.
+
+    The build variant regexes of each criteria are compiled once, and the criteria that apply to
+    each build variant are remembered. Build variant names repeat across every version of a
+    project, so the regexes only need to run once per distinct build variant. The criteria should
+    not be modified once the matcher is created.
+    """
+
+    def __init__(self, build_checks: Iterable[BuildChecks] = ()) -> None:
+        """
+        Initialize the matcher.
+
+        :param build_checks: Criteria to match against.
+        """
+        super().__init__(build_checks)
+        self._variant_matchers: Optional[List[Callable[[str], bool]]] = None
+        self._routes: Dict[str, List[BuildChecks]] = {}
+        self._fingerprint: Optional[str] = None
+
+    @classmethod
+    def of(cls, build_checks: List[BuildChecks]) -> CriteriaMatcher:
+        """
+        Get a matcher for the given criteria, reusing it if it is already compiled.
+
+        :param build_checks: Criteria to match against.
+        :return: Matcher for the criteria.
+        """
+        if isinstance(build_checks, cls):
+            return build_checks
+        return cls(build_checks)
+
+    def applicable(self, build_variant: str) -> List[BuildChecks]:
+        """
+        Get the criteria that apply to the given build variant.
+
+        :param build_variant: Name of build variant.
+        :return: Criteria that apply to the build variant.
+        """
+        routes = self._routes.get(build_variant)
+        if routes is None:
+            if self._variant_matchers is None:
+                self._variant_matchers = [bc.compile_variant_matcher() for bc in self]
+            routes = [
+                bc for bc, matches in zip(self, self._variant_matchers) if matches(build_variant)
+            ]
+            self._routes[build_variant] = routes
+        return routes
+
+    def applies_to(self, build_variant: str) -> bool:
+        """
+        Determine if any criteria apply to the given build variant.
+
+        :param build_variant: Name of build variant.
+        :return: True if any criteria apply to the build variant.
+        """
+        return bool(self.applicable(build_variant))
+
+    def check(self, build_status: BuildStatus) -> bool:
+        """
+        Check if the given build stats meet all the criteria that apply to it.
+
+        :param build_status: Status of build to check.
+        :return: True if the build matches the criteria.
+        """
+        return all(bc.meets(build_status) for bc in self.applicable(build_status.build_variant))
+
+    def fingerprint(self) -> str:
+        """Get a stable fingerprint of the criteria."""
+        if self._fingerprint is None:
+            self._fingerprint = criteria_fingerprint(self)
+        return self._fingerprint
+
+
+def criteria_fingerprint(build_checks: List[BuildChecks]) -> str:
+    """
+    Create a stable fingerprint of the given criteria.
+
+    Equivalent criteria get the same fingerprint regardless of the order rules or tasks were
+    specified in, so it can be used to remember results across executions.
+
+    :param build_checks: Criteria to fingerprint.
+    :return: Fingerprint of the criteria.
+    """
+    canonical_rules = sorted(
+        json.dumps(bc.dict(), sort_keys=True, default=sorted) for bc in build_checks
+    )
+    return hashlib.sha256("\n".join(canonical_rules).encode()).hexdigest()[:16]
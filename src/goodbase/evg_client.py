@@ -0,0 +1,224 @@
+"""Evergreen API client tuned for making many concurrent requests."""
+from __future__ import annotations
+
+import threading
+from threading import Lock
+from time import time
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+from evergreen import RetryingEvergreenApi
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from goodbase.goodbase_options import DEFAULT_EVG_WORKERS
+from goodbase.services.profile_service import ENDPOINT, ProfileService, endpoint_name
+from goodbase.services.stats_service import StatsService
+
+# Threads outside the shared worker pool that also make requests to Evergreen: the main thread,
+# which pages through versions, and the thread that looks up modules to prefetch.
+EXTRA_REQUESTERS = 2
+
+
+def connection_pool_size(evg_workers: int) -> int:
+    """
+    Get the number of connections needed so no thread making requests waits for a connection.
+
+    :param evg_workers: Number of threads in the shared pool of Evergreen workers.
+    :return: Number of keep-alive connections to maintain.
+    """
+    return evg_workers + EXTRA_REQUESTERS
+
+
+def response_size(response: requests.Response) -> int:
+    """
+    Get the number of bytes of the body of the given response as it was sent.
+
+    :param response: Response to measure.
+    :return: Content-Length of the response if it was given, otherwise the size of its body.
+    """
+    try:
+        return int(response.headers["Content-Length"])
+    except (KeyError, ValueError):
+        return len(response.content)
+
+
+class ConnectionCounter:
+    """A thread-safe count of connections that have been opened."""
+
+    def __init__(self) -> None:
+        """Initialize the counter."""
+        self._lock = Lock()
+        self.count = 0
+
+    def increment(self) -> None:
+        """Record that a new connection was opened."""
+        with self._lock:
+            self.count += 1
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    """
+    An HTTP adapter that keeps a fixed-size pool of keep-alive connections.
+
+    When every connection in the pool is in use, requests wait for one to be returned instead of
+    opening a throw-away connection. Every new connection that is opened is counted, so reuse can
+    be verified. Requests sent by each thread are counted too, so retries can be detected.
+    """
+
+    def __init__(self, pool_size: int, **kwargs: Any) -> None:
+        """
+        Initialize the adapter.
+
+        :param pool_size: Number of connections to keep open to each host.
+        :param kwargs: Additional arguments to pass to the HTTPAdapter.
+        """
+        self.connection_counter = ConnectionCounter()
+        self._thread_sends = threading.local()
+        super().__init__(pool_maxsize=pool_size, pool_block=True, **kwargs)
+
+    @property
+    def sends_on_this_thread(self) -> int:
+        """Number of requests the current thread has sent through this adapter."""
+        return getattr(self._thread_sends, "count", 0)
+
+    def send(self, request: requests.PreparedRequest, *args: Any, **kwargs: Any) -> Any:
+        """
+        Send the given request, counting it against the current thread.
+
+        :param request: Request to send.
+        :param args: Arguments to pass to the HTTPAdapter.
+        :param kwargs: Keyword arguments to pass to the HTTPAdapter.
+        :return: Response to the request.
+        """
+        self._thread_sends.count = self.sends_on_this_thread + 1
+        return super().send(request, *args, **kwargs)
+
+    def init_poolmanager(self, *args: Any, **kwargs: Any) -> None:
+        """Create the pool manager, using connection pools that count new connections."""
+        super().init_poolmanager(*args, **kwargs)
+        counter = self.connection_counter
+
+        class CountingHTTPConnectionPool(HTTPConnectionPool):
+            def _new_conn(self) -> Any:
+                counter.increment()
+                return super()._new_conn()
+
+        class CountingHTTPSConnectionPool(HTTPSConnectionPool):
+            def _new_conn(self) -> Any:
+                counter.increment()
+                return super()._new_conn()
+
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": CountingHTTPConnectionPool,
+            "https": CountingHTTPSConnectionPool,
+        }
+
+
+class PooledEvergreenApi(RetryingEvergreenApi):
+    """A retrying Evergreen API client that shares one connection pool across all requests."""
+
+    def __init__(
+        self,
+        pool_size: int = DEFAULT_EVG_WORKERS,
+        profile_service: Optional[ProfileService] = None,
+        stats_service: Optional[StatsService] = None,
+        **kwargs: Any,
+    ) -> None:
+        """
+        Initialize the client.
+
+        :param pool_size: Number of keep-alive connections to maintain.
+        :param profile_service: Service to time each call to Evergreen with.
+        :param stats_service: Service to count each request to Evergreen with.
+        :param kwargs: Arguments to pass to the RetryingEvergreenApi.
+        """
+        self.pool_size = pool_size
+        self.profile_service = profile_service or ProfileService()
+        self.stats_service = stats_service or StatsService()
+        self.adapter = PooledHTTPAdapter(pool_size)
+        super().__init__(**kwargs)
+        self._session = self._create_session()
+
+    @classmethod
+    def from_config_file(
+        cls,
+        config_file: str,
+        pool_size: int,
+        profile_service: Optional[ProfileService] = None,
+        stats_service: Optional[StatsService] = None,
+    ) -> PooledEvergreenApi:
+        """
+        Create a client using the authentication in the given evergreen config file.
+
+        :param config_file: Evergreen config file with authentication information.
+        :param pool_size: Number of keep-alive connections to maintain.
+        :param profile_service: Service to time each call to Evergreen with.
+        :param stats_service: Service to count each request to Evergreen with.
+        :return: Evergreen API client.
+        """
+        return cls(
+            pool_size=pool_size,
+            profile_service=profile_service,
+            stats_service=stats_service,
+            **cls._setup_kwargs(config_file=config_file),
+        )
+
+    @property
+    def connections_opened(self) -> int:
+        """Number of new connections that have been opened to Evergreen."""
+        return self.adapter.connection_counter.count
+
+    def _call_api(  # type: ignore[override]
+        self,
+        url: str,
+        params: Optional[Dict] = None,
+        method: str = "GET",
+        data: Optional[str] = None,
+    ) -> requests.Response:
+        """
+        Call into the Evergreen API, timing the call, including any retries.
+
+        :param url: Url to call.
+        :param params: Parameters to pass to api.
+        :param method: HTTP method to make call with.
+        :param data: Extra data to send to the endpoint.
+        :return: Result from calling API.
+        """
+        endpoint = endpoint_name(url)
+        sends_before = self.adapter.sends_on_this_thread
+        try:
+            with self.profile_service.span(endpoint, ENDPOINT):
+                return super()._call_api(url, params, method, data)
+        finally:
+            retries = self.adapter.sends_on_this_thread - sends_before - 1
+            if retries > 0:
+                self.stats_service.record_retries(endpoint, retries)
+
+    def _log_api_call_time(  # type: ignore[override]
+        self, response: requests.Response, start_time: float
+    ) -> None:
+        """
+        Record a response from a single attempt at calling the Evergreen API.
+
+        :param response: Response from API.
+        :param start_time: Time the request was started.
+        """
+        super()._log_api_call_time(response, start_time)
+        self.stats_service.record_response(
+            endpoint_name(response.url),
+            response.status_code,
+            response_size(response),
+            time() - start_time,
+        )
+
+    def _create_session(self) -> requests.Session:
+        """Create a session that uses the shared connection pool."""
+        session = super()._create_session()
+        prefix = f"{urlparse(self._api_server).scheme}://"
+        existing_adapter = session.get_adapter(prefix)
+        if isinstance(existing_adapter, HTTPAdapter):
+            self.adapter.max_retries = existing_adapter.max_retries
+        session.mount(prefix, self.adapter)
+        return session
@@ -4,24 +4,36 @@ import logging
 import os.path
 import sys
 from pathlib import Path
-from typing import Dict, List, NamedTuple, Optional
+from threading import Thread
+from typing import Any, Dict, List, NamedTuple, Optional
 
 import click
 import inject
 import structlog
 import yaml
-from evergreen import EvergreenApi, RetryingEvergreenApi
+from evergreen import EvergreenApi
 from plumbum import ProcessExecutionError
 from rich.console import Console
 from rich.table import Table
 from structlog.stdlib import LoggerFactory
 
 from goodbase.build_checker import BuildChecks
-from goodbase.goodbase_options import GoodBaseOptions, OutputFormat
+from goodbase.evg_client import PooledEvergreenApi, connection_pool_size
+from goodbase.goodbase_options import DEFAULT_EVG_WORKERS, GoodBaseOptions, OutputFormat
+from goodbase.services.cache_service import CacheService
 from goodbase.services.criteria_service import CriteriaService
+from goodbase.services.daemon_service import (
+    DEFAULT_SOCKET_PATH,
+    DaemonClient,
+    DaemonUnavailableError,
+    SearchDaemon,
+)
 from goodbase.services.evg_service import EvergreenService
-from goodbase.services.git_service import GitAction, GitService
+from goodbase.services.executor_service import ExecutorService
+from goodbase.services.git_service import DEFAULT_GIT_WORKERS, GitAction, GitService
+from goodbase.services.profile_service import ProfileFormat, ProfileService
 from goodbase.services.search_service import SearchService
+from goodbase.services.stats_service import StatsService
 
 LOGGER = structlog.get_logger(__name__)
 
@@ -30,6 +42,7 @@ DEFAULT_EVG_PROJECT = "mongodb-mongo-master"
 DEFAULT_EVG_PROJECT_CONFIG = "etc/evergreen.yml"
 MAX_LOOKBACK = 50
 DEFAULT_THRESHOLD = 0.95
+BASE = "BASE"
 EXTERNAL_LOGGERS = [
     "evergreen",
     "inject",
@@ -61,6 +74,10 @@ class GoodBaseOrchestrator:
         git_service: GitService,
         criteria_service: CriteriaService,
         search_service: SearchService,
+        cache_service: CacheService,
+        daemon_client: DaemonClient,
+        profile_service: ProfileService,
+        stats_service: StatsService,
         options: GoodBaseOptions,
         console: Console,
     ) -> None:
@@ -71,6 +88,10 @@ class GoodBaseOrchestrator:
         :param git_service: Git Service.
         :param criteria_service: Service for working with criteria.
         :param search_service: Service to search revisions.
+        :param cache_service: Service for caching data between executions.
+        :param daemon_client: Client to send searches to a running daemon.
+        :param profile_service: Service for timing phases of execution.
+        :param stats_service: Service for counting requests made to Evergreen.
         :param options: Options for execution.
         :param console: Rich console to print to.
         """
@@ -78,11 +99,20 @@ class GoodBaseOrchestrator:
         self.git_service = git_service
         self.criteria_service = criteria_service
         self.search_service = search_service
+        self.cache_service = cache_service
+        self.daemon_client = daemon_client
+        self.profile_service = profile_service
+        self.stats_service = stats_service
         self.options = options
         self.console = console
+        self._module_prefetch: Optional[Thread] = None
 
     def attempt_git_operation(
-        self, operation: GitAction, revision: str, directory: Optional[Path] = None
+        self,
+        operation: GitAction,
+        revision: str,
+        directory: Optional[Path] = None,
+        fetch: bool = True,
     ) -> Optional[str]:
         """
         Attempt to perform the specified git operation.
@@ -90,28 +120,60 @@ class GoodBaseOrchestrator:
         :param operation: Git operation to perform.
         :param revision: Git revision to perform operation on.
         :param directory: Directory of git repository.
+        :param fetch: Whether to fetch from origin before performing the operation.
         :return: Error message if an error was encountered.
         """
         try:
             self.git_service.perform_action(
-                operation, revision, directory, self.options.branch_name
+                operation, revision, directory, self.options.branch_name, fetch
             )
         except ProcessExecutionError:
             LOGGER.warning("Error encountered during git operation", exc_info=True)
             return f"Encountered error performing '{operation}' on '{revision}'"
         return None
 
-    def checkout_modules(
+    def start_prefetch(self, evg_project: str) -> None:
+        """
+        Start fetching the base repository and every local module repository in the background.
+
+        :param evg_project: Evergreen project being checked out.
+        """
+        self.git_service.prefetch([None], self.options.git_workers)
+        self._module_prefetch = Thread(
+            target=self._prefetch_modules, args=(evg_project,), name="module-prefetch", daemon=True
+        )
+        self._module_prefetch.start()
+
+    def _prefetch_modules(self, evg_project: str) -> None:
+        """
+        Start fetching every local module repository in the background.
+
+        :param evg_project: Evergreen project being checked out.
+        """
+        try:
+            module_locations = self.evg_service.get_module_locations(evg_project)
+        except Exception:
+            LOGGER.debug("Unable to find modules to prefetch", exc_info=True)
+            return
+        module_directories = [
+            Path(location) / module for module, location in module_locations.items()
+        ]
+        self.git_service.prefetch(
+            [directory for directory in module_directories if directory.exists()],
+            self.options.git_workers,
+        )
+
+    def find_module_directories(
         self, evg_project: str, module_revisions: Dict[str, str]
-    ) -> Dict[str, str]:
+    ) -> Dict[str, Path]:
         """
-        Checkout existing modules to the specified revisions.
+        Find the directories of the given modules that are checked out locally.
 
         :param evg_project: Evergreen project of modules.
         :param module_revisions: Dictionary of module names and git revisions to check out.
-        :return: Dictionary of error encountered.
+        :return: Dictionary of module names and the directories they are checked out in.
         """
-        if self.options.operation == GitAction.NONE:
+        if not module_revisions:
             return {}
 
         module_locations = self.evg_service.get_module_locations(evg_project)
@@ -120,13 +182,53 @@ class GoodBaseOrchestrator:
             module_locations=module_locations,
             module_revisions=module_revisions,
         )
+        module_directories = {
+            module: Path(module_locations[module]) / module for module in module_revisions
+        }
+        return {module: path for module, path in module_directories.items() if path.exists()}
+
+    def fetch_repositories(
+        self, repositories: Dict[str, Optional[Path]], revisions: Dict[str, str]
+    ) -> Dict[str, str]:
+        """
+        Fetch the revisions that are missing from the given repositories concurrently.
+
+        :param repositories: Dictionary of repository names and their directories.
+        :param revisions: Dictionary of repository names and the revision each needs.
+        :return: Dictionary of repositories that could not be fetched and the error encountered.
+        """
+        fetch_errors = self.git_service.fetch_revisions(
+            {directory: revisions[name] for name, directory in repositories.items()},
+            self.options.git_workers,
+        )
         errors_encountered = {}
-        for module, module_rev in module_revisions.items():
-            directory = Path(module_locations[module]) / module
-            if directory.exists():
-                errmsg = self.attempt_git_operation(self.options.operation, module_rev, directory)
-                if errmsg:
-                    errors_encountered[module] = errmsg
+        for name, directory in repositories.items():
+            if directory in fetch_errors:
+                LOGGER.warning(
+                    "Error encountered during git fetch",
+                    repository=name,
+                    exc_info=fetch_errors[directory],
+                )
+                errors_encountered[name] = f"Encountered error fetching '{revisions[name]}'"
+        return errors_encountered
+
+    def checkout_modules(
+        self, module_revisions: Dict[str, str], module_directories: Dict[str, Path]
+    ) -> Dict[str, str]:
+        """
+        Checkout fetched modules to the specified revisions.
+
+        :param module_revisions: Dictionary of module names and git revisions to check out.
+        :param module_directories: Dictionary of module names and directories to check out in.
+        :return: Dictionary of error encountered.
+        """
+        errors_encountered = {}
+        for module, directory in module_directories.items():
+            errmsg = self.attempt_git_operation(
+                self.options.operation, module_revisions[module], directory, fetch=False
+            )
+            if errmsg:
+                errors_encountered[module] = errmsg
 
         return errors_encountered
 
@@ -138,22 +240,159 @@ class GoodBaseOrchestrator:
         """
         Find the latest git revision that matches the criteria and check it out in git.
 
+        The base repository and every module repository are fetched concurrently before any of
+        them are checked out. Any background fetches are finished before returning.
+
         :param evg_project: Evergreen project to check.
         :param build_checks: Criteria to enforce.
         :return: Revision that was checked out, if it exists.
         """
-        revision = self.search_service.find_revision(evg_project, build_checks)
-        if revision:
-            module_revisions = self.evg_service.get_modules_revisions(evg_project, revision)
-            errmsg = self.attempt_git_operation(self.options.operation, revision)
-            errors_encountered = self.checkout_modules(evg_project, module_revisions)
-            if errmsg:
-                errors_encountered["BASE"] = errmsg
+        if self.options.prefetch and self.options.operation != GitAction.NONE:
+            self.start_prefetch(evg_project)
+        try:
+            with self.profile_service.span("find_revision"):
+                revision = self.find_revision(evg_project, build_checks)
+            if revision:
+                with self.profile_service.span("get_modules_revisions"):
+                    module_revisions = self.evg_service.get_modules_revisions(evg_project, revision)
+                with self.profile_service.span("git_operation"):
+                    errors_encountered = self.perform_git_operations(
+                        evg_project, revision, module_revisions
+                    )
+
+                return RevisionInformation(
+                    revision=revision, module_revisions=module_revisions, errors=errors_encountered
+                )
+            return None
+        finally:
+            self.finish_prefetch()
+
+    def finish_prefetch(self) -> None:
+        """Wait for any background fetches so they are not abandoned when the process exits."""
+        if self._module_prefetch is not None:
+            self._module_prefetch.join()
+        self.git_service.wait_for_prefetches()
+
+    def perform_git_operations(
+        self, evg_project: str, revision: str, module_revisions: Dict[str, str]
+    ) -> Dict[str, str]:
+        """
+        Perform the git operation on the base repository and every checked out module.
 
-            return RevisionInformation(
-                revision=revision, module_revisions=module_revisions, errors=errors_encountered
+        :param evg_project: Evergreen project being checked out.
+        :param revision: Git revision of the base repository.
+        :param module_revisions: Dictionary of module names and git revisions to check out.
+        :return: Dictionary of errors encountered by repository.
+        """
+        if self.options.operation == GitAction.NONE:
+            return {}
+
+        if self._module_prefetch is not None:
+            self._module_prefetch.join()
+        module_directories = self.find_module_directories(evg_project, module_revisions)
+        with self.profile_service.span("fetch_repositories"):
+            errors_encountered = self.fetch_repositories(
+                {BASE: None, **module_directories}, {BASE: revision, **module_revisions}
             )
-        return None
+        fetched_modules = {
+            module: directory
+            for module, directory in module_directories.items()
+            if module not in errors_encountered
+        }
+
+        if BASE not in errors_encountered:
+            errmsg = self.attempt_git_operation(self.options.operation, revision, fetch=False)
+            if errmsg:
+                errors_encountered[BASE] = errmsg
+        with self.profile_service.span("checkout_modules"):
+            errors_encountered.update(self.checkout_modules(module_revisions, fetched_modules))
+        return errors_encountered
+
+    def find_revision(self, evg_project: str, build_checks: List[BuildChecks]) -> Optional[str]:
+        """
+        Find the latest git revision that matches the criteria.
+
+        The search is sent to a running daemon if one is available, otherwise it is run in this
+        process. Searches limited to revisions reachable in the local clone, searches for
+        several candidates to rebase or merge onto, and searches being profiled or counted,
+        always run in this process.
+
+        :param evg_project: Evergreen project to check.
+        :param build_checks: Criteria to enforce.
+        :return: Latest revision that matches the criteria, if it exists.
+        :raises ValueError: If the revisions reachable from the given ref can not be read.
+        """
+        reachable_revisions = None
+        if self.options.reachable_from is not None:
+            try:
+                with self.profile_service.span("reachable_revisions"):
+                    reachable_revisions = self.git_service.reachable_revisions(
+                        self.options.reachable_from
+                    )
+            except ProcessExecutionError as err:
+                LOGGER.warning("Error encountered reading reachable revisions", exc_info=True)
+                raise ValueError(
+                    f"Could not read revisions reachable from '{self.options.reachable_from}'"
+                ) from err
+        elif self.options.use_daemon and not self._choosing_candidates() and not self._measuring():
+            try:
+                with self.profile_service.span("daemon_search"):
+                    return self.daemon_client.find_revision(evg_project, build_checks, self.options)
+            except DaemonUnavailableError as err:
+                LOGGER.debug("Searching without daemon", reason=str(err))
+
+        if not self._choosing_candidates():
+            return self.search_service.find_revision(evg_project, build_checks, reachable_revisions)
+
+        candidates = self.search_service.find_revisions(
+            evg_project, build_checks, reachable_revisions, self.options.candidates
+        )
+        return self.choose_candidate(candidates)
+
+    def _measuring(self) -> bool:
+        """Determine if the Evergreen requests of this process are being profiled or counted."""
+        return self.profile_service.enabled or self.stats_service.enabled
+
+    def _choosing_candidates(self) -> bool:
+        """Determine if the found revision should be chosen from several passing revisions."""
+        return self.options.candidates > 1 and self.options.operation in {
+            GitAction.REBASE,
+            GitAction.MERGE,
+        }
+
+    def choose_candidate(self, candidates: List[str]) -> Optional[str]:
+        """
+        Choose the candidate revision that is the fewest commits away from HEAD.
+
+        The distance counts both the commits on HEAD that would be replayed and the commits from
+        the candidate that would be brought in. Ties go to the newest candidate. Candidates whose
+        distance can not be determined are ignored, falling back to the newest candidate if none
+        can be measured.
+
+        :param candidates: Passing revisions, newest first.
+        :return: Revision to perform the git operation with, if there are any candidates.
+        """
+        if len(candidates) <= 1:
+            return candidates[0] if candidates else None
+
+        with self.profile_service.span("choose_candidate"):
+            try:
+                self.git_service.fetch_missing_revisions(candidates)
+            except ProcessExecutionError:
+                LOGGER.debug("Unable to fetch candidates", exc_info=True)
+
+            distances = {}
+            for candidate in candidates:
+                try:
+                    distances[candidate] = sum(self.git_service.commit_distance(candidate))
+                except ProcessExecutionError:
+                    LOGGER.debug("Unable to measure candidate", revision=candidate, exc_info=True)
+
+        if not distances:
+            return candidates[0]
+
+        LOGGER.debug("Measured candidates", distances=distances)
+        return min(distances, key=lambda candidate: distances[candidate])
 
     def save_criteria(self, name: str, build_checks: BuildChecks) -> None:
         """
@@ -190,6 +429,10 @@ class GoodBaseOrchestrator:
         """
         self.criteria_service.import_criteria(import_file)
 
+    def purge_cache(self) -> None:
+        """Remove all locally cached Evergreen data."""
+        self.cache_service.purge()
+
     def display_criteria(self) -> None:
         """Display saved criteria."""
         for group in self.criteria_service.get_all_criteria():
@@ -211,6 +454,79 @@ class GoodBaseOrchestrator:
 
             self.console.print(table)
 
+    def display_profile(
+        self, profile_output: Optional[Path], profile_format: ProfileFormat
+    ) -> None:
+        """
+        Display how long each phase of execution and each Evergreen endpoint took.
+
+        The breakdown is written to stderr, so it does not mix with the command output.
+
+        :param profile_output: File to write the raw timing spans to.
+        :param profile_format: Format to write the raw timing spans in.
+        """
+        table = Table(title="Profile")
+        table.add_column("Category")
+        table.add_column("Name")
+        table.add_column("Count", justify="right")
+        table.add_column("Total (s)", justify="right")
+        table.add_column("p50 (ms)", justify="right")
+        table.add_column("p95 (ms)", justify="right")
+        for summary in self.profile_service.summarize():
+            table.add_row(
+                summary.category,
+                summary.name,
+                str(summary.span_count),
+                f"{summary.total_secs:.3f}",
+                f"{summary.p50_secs * 1000:.1f}",
+                f"{summary.p95_secs * 1000:.1f}",
+            )
+        Console(stderr=True).print(table)
+
+        if profile_output:
+            self.profile_service.write(profile_output, profile_format)
+
+    def display_stats(self) -> None:
+        """
+        Display the requests made to Evergreen and how often the local cache was used.
+
+        The stats are written to stderr, so they do not mix with the command output.
+        """
+        stats = self.stats_service.as_dict()
+        console = Console(stderr=True)
+
+        requests_table = Table(title="Evergreen requests")
+        requests_table.add_column("Endpoint")
+        for column in ["Requests", "Errors", "Retries", "KiB received"]:
+            requests_table.add_column(column, justify="right")
+        endpoint_rows = list(stats["endpoints"].items())
+        for idx, (name, endpoint_stats) in enumerate(endpoint_rows + [("Total", stats)]):
+            requests_table.add_row(
+                name,
+                str(endpoint_stats["requests"]),
+                str(endpoint_stats["errors"]),
+                str(endpoint_stats["retries"]),
+                f"{endpoint_stats['bytes_received'] / 1024:.1f}",
+                # Separate the total from the endpoints.
+                end_section=idx == len(endpoint_rows) - 1,
+            )
+        console.print(requests_table)
+
+        latency_table = Table(title="Request latency")
+        latency_table.add_column("Latency")
+        latency_table.add_column("Requests", justify="right")
+        for bucket, count in stats["latency_histogram"].items():
+            latency_table.add_row(bucket, str(count))
+        console.print(latency_table)
+
+        cache_table = Table(title="Cache lookups")
+        cache_table.add_column("Namespace")
+        cache_table.add_column("Hits", justify="right")
+        cache_table.add_column("Misses", justify="right")
+        for namespace, cache_stats in stats["cache"].items():
+            cache_table.add_row(namespace, str(cache_stats["hits"]), str(cache_stats["misses"]))
+        console.print(cache_table)
+
 
 def configure_logging(verbose: bool) -> None:
     """
@@ -276,6 +592,35 @@ def configure_logging(verbose: bool) -> None:
     type=str,
     help="Oldest commit to check before giving up.",
 )
+@click.option(
+    "--search-window",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Number of versions to evaluate concurrently [default=1].",
+)
+@click.option(
+    "--evg-workers",
+    type=click.IntRange(min=1),
+    default=DEFAULT_EVG_WORKERS,
+    help=f"Number of threads to use for Evergreen requests [default={DEFAULT_EVG_WORKERS}].",
+)
+@click.option(
+    "--evg-max-in-flight",
+    type=click.IntRange(min=1),
+    help="Maximum number of Evergreen requests to have in-flight at once [default=evg-workers].",
+)
+@click.option(
+    "--git-workers",
+    type=click.IntRange(min=1),
+    default=DEFAULT_GIT_WORKERS,
+    help=f"Number of repositories to fetch from concurrently [default={DEFAULT_GIT_WORKERS}].",
+)
+@click.option(
+    "--no-version-index",
+    is_flag=True,
+    default=False,
+    help="Scan every version from Evergreen instead of resuming from the local version index.",
+)
 @click.option(
     "--git-operation",
     type=click.Choice([a.value for a in GitAction]),
@@ -283,6 +628,12 @@ def configure_logging(verbose: bool) -> None:
     help="Git operations to perform with found commit [default=checkout].",
 )
 @click.option("-b", "--branch", help="Name of branch to create on checkout.")
+@click.option(
+    "--candidates",
+    type=click.IntRange(min=1),
+    default=1,
+    help="With rebase or merge, use the closest to HEAD of this many passing revisions [default=1].",
+)
 @click.option(
     "--save-criteria",
     type=str,
@@ -309,6 +660,55 @@ def configure_logging(verbose: bool) -> None:
     default=OutputFormat.PLAINTEXT,
     help="Format of the command output [default=plaintext].",
 )
+@click.option(
+    "--purge-cache", is_flag=True, default=False, help="Remove locally cached Evergreen data."
+)
+@click.option(
+    "--serve",
+    is_flag=True,
+    default=False,
+    help="Run a daemon that keeps Evergreen data warm and answers searches from other calls.",
+)
+@click.option(
+    "--no-daemon",
+    is_flag=True,
+    default=False,
+    help="Always search in this process, even if a daemon is running.",
+)
+@click.option(
+    "--reachable-from",
+    metavar="REF",
+    help="Only consider revisions reachable from the given git ref, such as origin/master.",
+)
+@click.option(
+    "--no-prefetch",
+    is_flag=True,
+    default=False,
+    help="Wait until a revision is found before fetching from git remotes.",
+)
+@click.option(
+    "--profile",
+    is_flag=True,
+    default=False,
+    help="Display how long each phase and each Evergreen endpoint took.",
+)
+@click.option(
+    "--profile-output",
+    type=click.Path(dir_okay=False),
+    help="File to write raw timing spans to, implies --profile.",
+)
+@click.option(
+    "--profile-format",
+    type=click.Choice([f.value for f in ProfileFormat]),
+    default=ProfileFormat.JSON,
+    help="Format to write raw timing spans in [default=json].",
+)
+@click.option(
+    "--stats",
+    is_flag=True,
+    default=False,
+    help="Display the requests made to Evergreen, and add them to yaml and json output.",
+)
 @click.option("--verbose", is_flag=True, default=False, help="Enable debug logging.")
 def main(
     passing_task: List[str],
@@ -321,8 +721,14 @@ def main(
     commit_lookback: int,
     commit_limit: Optional[str],
     timeout_secs: Optional[int],
+    search_window: int,
+    evg_workers: int,
+    evg_max_in_flight: Optional[int],
+    git_workers: int,
+    no_version_index: bool,
     git_operation: GitAction,
     branch: Optional[str],
+    candidates: int,
     save_criteria: Optional[str],
     use_criteria: Optional[str],
     list_criteria: bool,
@@ -331,6 +737,15 @@ def main(
     import_criteria: Optional[str],
     output_format: OutputFormat,
     override: bool,
+    purge_cache: bool,
+    serve: bool,
+    no_daemon: bool,
+    no_prefetch: bool,
+    reachable_from: Optional[str],
+    profile: bool,
+    profile_output: Optional[str],
+    profile_format: ProfileFormat,
+    stats: bool,
     verbose: bool,
 ) -> None:
     """
@@ -381,7 +796,14 @@ def main(
     configure_logging(verbose)
 
     evg_config_file = os.path.expanduser(evg_config_file)
-    evg_api = RetryingEvergreenApi.get_api(config_file=evg_config_file)
+    profile_service = ProfileService(enabled=profile or profile_output is not None)
+    stats_service = StatsService(enabled=stats)
+    evg_api = PooledEvergreenApi.from_config_file(
+        evg_config_file,
+        pool_size=connection_pool_size(evg_workers),
+        profile_service=profile_service,
+        stats_service=stats_service,
+    )
 
     options = GoodBaseOptions(
         max_lookback=commit_lookback,
@@ -391,6 +813,15 @@ def main(
         timeout_secs=timeout_secs,
         branch_name=branch,
         output_format=output_format,
+        search_window=search_window,
+        evg_workers=evg_workers,
+        evg_max_in_flight=evg_max_in_flight,
+        use_version_index=not no_version_index,
+        use_daemon=not no_daemon,
+        git_workers=git_workers,
+        prefetch=not no_prefetch,
+        reachable_from=reachable_from,
+        candidates=candidates,
     )
 
     build_variant_checks = [".*-required$"]
@@ -418,11 +849,40 @@ def main(
     def dependencies(binder: inject.Binder) -> None:
         binder.bind(EvergreenApi, evg_api)
         binder.bind(GoodBaseOptions, options)
+        binder.bind(ProfileService, profile_service)
+        binder.bind(StatsService, stats_service)
+        binder.bind_to_constructor(CacheService, lambda: CacheService(stats_service=stats_service))
 
     inject.configure(dependencies)
+    ctx = click.get_current_context()
+    ctx.call_on_close(inject.instance(ExecutorService).shutdown)
+    ctx.call_on_close(
+        lambda: LOGGER.debug("Evergreen connections opened", count=evg_api.connections_opened)
+    )
+
+    if serve:
+        try:
+            inject.instance(SearchDaemon).serve(DEFAULT_SOCKET_PATH)
+        except ValueError as err:
+            click.echo(click.style(str(err), fg="red"))
+            sys.exit(1)
+        return
 
     orchestrator = GoodBaseOrchestrator()
-    if list_criteria:
+    if profile_service.enabled:
+        ctx.call_on_close(
+            lambda: orchestrator.display_profile(
+                Path(profile_output) if profile_output else None, ProfileFormat(profile_format)
+            )
+        )
+
+    if stats:
+        ctx.call_on_close(orchestrator.display_stats)
+
+    if purge_cache:
+        orchestrator.purge_cache()
+
+    elif list_criteria:
         orchestrator.display_criteria()
 
     elif save_criteria:
@@ -462,7 +922,11 @@ def main(
 
         LOGGER.debug("criteria", criteria=build_checks)
 
-        revision = orchestrator.checkout_good_base(evg_project, criteria)
+        try:
+            revision = orchestrator.checkout_good_base(evg_project, criteria)
+        except ValueError as err:
+            click.echo(click.style(str(err), fg="red"))
+            sys.exit(1)
 
         if revision:
             revision_dict = {
@@ -470,11 +934,14 @@ def main(
                 for module_name, module_revision in revision.module_revisions.items()
             }
             revision_dict["stable_revision"] = revision.revision
+            output_dict: Dict[str, Any] = dict(revision_dict)
+            if stats:
+                output_dict["stats"] = stats_service.as_dict()
 
             if output_format == OutputFormat.YAML:
-                print(yaml.dump(revision_dict, sort_keys=False))
+                print(yaml.dump(output_dict, sort_keys=False))
             elif output_format == OutputFormat.JSON:
-                print(json.dumps(revision_dict))
+                print(json.dumps(output_dict))
             else:  # "plaintext"
                 click.echo(click.style(f"Found revision: {revision.revision}", fg="green"))
                 for module_name, module_revision in revision.module_revisions.items():
@@ -492,7 +959,15 @@ def main(
                 for module, errmsg in revision.errors.items():
                     click.echo(click.style(f"\t{module}: {errmsg}", fg="yellow"))
         else:
-            click.echo(click.style("No revision found", fg="red"))
+            if stats and output_format in {OutputFormat.YAML, OutputFormat.JSON}:
+                no_match_dict = {"stable_revision": None, "stats": stats_service.as_dict()}
+                if output_format == OutputFormat.YAML:
+                    print(yaml.dump(no_match_dict, sort_keys=False))
+                else:
+                    print(json.dumps(no_match_dict))
+                click.echo(click.style("No revision found", fg="red"), err=True)
+            else:
+                click.echo(click.style("No revision found", fg="red"))
             sys.exit(1)
 
 
@@ -4,10 +4,12 @@ from typing import NamedTuple, Optional
 
 import structlog
 
-from goodbase.services.git_service import GitAction
+from goodbase.services.git_service import DEFAULT_GIT_WORKERS, GitAction
 
 LOGGER = structlog.get_logger(__name__)
 
+DEFAULT_EVG_WORKERS = 16
+
 
 class OutputFormat(str, Enum):
     """Format to display output in."""
@@ -28,6 +30,15 @@ class GoodBaseOptions(NamedTuple):
     * timeouts_secs: Number of seconds to scan before timing out.
     * branch_name: Name of branch to create on checkout.
     * output_format: Format to display output in.
+    * search_window: Number of versions to evaluate concurrently.
+    * evg_workers: Number of threads to use for Evergreen requests.
+    * evg_max_in_flight: Maximum number of Evergreen requests to have in-flight at once.
+    * use_version_index: Resume searches from the local index of project versions.
+    * use_daemon: Send searches to a running daemon when one is available.
+    * git_workers: Number of repositories to fetch from concurrently.
+    * prefetch: Fetch repositories in the background while searching.
+    * reachable_from: Only consider revisions reachable from this git ref in the local clone.
+    * candidates: Number of passing revisions to choose the closest to HEAD from.
     """
 
     max_lookback: int
@@ -37,6 +48,15 @@ class GoodBaseOptions(NamedTuple):
     timeout_secs: Optional[int] = None
     branch_name: Optional[str] = None
     output_format: OutputFormat = OutputFormat.PLAINTEXT
+    search_window: int = 1
+    evg_workers: int = DEFAULT_EVG_WORKERS
+    evg_max_in_flight: Optional[int] = None
+    use_version_index: bool = True
+    use_daemon: bool = True
+    git_workers: int = DEFAULT_GIT_WORKERS
+    prefetch: bool = True
+    reachable_from: Optional[str] = None
+    candidates: int = 1
 
     def lookback_limit_hit(self, index: int, revision: str, elapsed_seconds: float) -> bool:
         """
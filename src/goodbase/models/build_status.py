@@ -1,30 +1,208 @@
 """Model for evergreen build status."""
+from __future__ import annotations
+
 from dataclasses import dataclass
-from typing import Set
+from typing import Any, Dict, Iterable, NamedTuple, Optional, Set
+
+from goodbase.models.task_names import TASK_NAMES, TaskNameTable, popcount
+
+
+class TaskCounts(NamedTuple):
+    """
+    Number of tasks in a build by status.
+
+    successful: Number of tasks that were successful.
+    inactive: Number of tasks that have not been run.
+    total: Number of tasks in the build.
+    """
 
+    successful: int
+    inactive: int
+    total: int
 
-@dataclass
+
+@dataclass(init=False)
 class BuildStatus:
     """
     A summary of the results of an evergreen build.
 
+    Sets of tasks are stored as bitsets over a shared task name table, so the names of tasks
+    are only stored once no matter how many builds they appear in.
+
     build_name: Name of build results are for.
     build_variant: Name of build variant results are for.
-    successful_task: Set of tasks that were successful.
-    inactive_tasks: Set of tasks that have not be run.
-    all_tasks: Set of all tasks in the build.
+    successful_mask: Bitset of tasks that were successful.
+    inactive_mask: Bitset of tasks that have not be run.
+    all_mask: Bitset of all tasks in the build.
+    task_counts: Task counts for builds summarized without their task names.
+    finished: True if every task in the build has finished, so the status can no longer change.
+    task_names: Table the bitsets of tasks are stored over.
     """
 
+    __slots__ = (
+        "build_name",
+        "build_variant",
+        "successful_mask",
+        "inactive_mask",
+        "all_mask",
+        "task_counts",
+        "finished",
+        "task_names",
+    )
+
     build_name: str
     build_variant: str
-    successful_tasks: Set[str]
-    inactive_tasks: Set[str]
-    all_tasks: Set[str]
+    successful_mask: int
+    inactive_mask: int
+    all_mask: int
+    task_counts: Optional[TaskCounts]
+    finished: bool
+    task_names: TaskNameTable
+
+    def __init__(
+        self,
+        build_name: str,
+        build_variant: str,
+        successful_tasks: Iterable[str],
+        inactive_tasks: Iterable[str],
+        all_tasks: Iterable[str],
+        task_counts: Optional[TaskCounts] = None,
+        finished: bool = False,
+    ) -> None:
+        """
+        Create a build status.
+
+        :param build_name: Name of build results are for.
+        :param build_variant: Name of build variant results are for.
+        :param successful_tasks: Names of tasks that were successful.
+        :param inactive_tasks: Names of tasks that have not been run.
+        :param all_tasks: Names of all tasks in the build.
+        :param task_counts: Task counts for builds summarized without their task names.
+        :param finished: True if every task in the build has finished.
+        """
+        self.build_name = build_name
+        self.build_variant = build_variant
+        self.task_names = TASK_NAMES.current()
+        self.successful_mask = self.task_names.mask(successful_tasks)
+        self.inactive_mask = self.task_names.mask(inactive_tasks)
+        self.all_mask = self.task_names.mask(all_tasks)
+        self.task_counts = task_counts
+        self.finished = finished
+
+    def __eq__(self, other: object) -> bool:
+        """
+        Determine if the given build status is the same as this one.
+
+        Statuses stored over different task name tables are compared by their task names.
+
+        :param other: Object to compare to.
+        :return: True if the other object is an equal build status.
+        """
+        if not isinstance(other, BuildStatus):
+            return NotImplemented
+        return self.as_dict() == other.as_dict()
+
+    @property
+    def successful_tasks(self) -> Set[str]:
+        """Set of tasks that were successful."""
+        return self.task_names.names(self.successful_mask)
+
+    @property
+    def inactive_tasks(self) -> Set[str]:
+        """Set of tasks that have not been run."""
+        return self.task_names.names(self.inactive_mask)
+
+    @property
+    def all_tasks(self) -> Set[str]:
+        """Set of all tasks in the build."""
+        return self.task_names.names(self.all_mask)
+
+    @classmethod
+    def from_counts(
+        cls, build_name: str, build_variant: str, task_counts: TaskCounts, finished: bool = False
+    ) -> BuildStatus:
+        """
+        Create a build status that only knows how many tasks are in each state.
+
+        :param build_name: Name of build results are for.
+        :param build_variant: Name of build variant results are for.
+        :param task_counts: Number of tasks in each state.
+        :param finished: True if every task in the build has finished.
+        :return: Build status.
+        """
+        return cls(
+            build_name=build_name,
+            build_variant=build_variant,
+            successful_tasks=set(),
+            inactive_tasks=set(),
+            all_tasks=set(),
+            task_counts=task_counts,
+            finished=finished,
+        )
+
+    def has_task_names(self) -> bool:
+        """Determine if the names of tasks in this build are known."""
+        return self.task_counts is None
 
     def success_pct(self) -> float:
         """Percentage of tasks that were successful."""
-        return len(self.successful_tasks) / len(self.all_tasks)
+        if self.task_counts is not None:
+            return self.task_counts.successful / self.task_counts.total
+        return popcount(self.successful_mask) / popcount(self.all_mask)
 
     def active_pct(self) -> float:
         """Percent of tasks that were activated."""
-        return 1.0 - len(self.inactive_tasks) / len(self.all_tasks)
+        if self.task_counts is not None:
+            return 1.0 - self.task_counts.inactive / self.task_counts.total
+        return 1.0 - popcount(self.inactive_mask) / popcount(self.all_mask)
+
+    def unsuccessful_among(self, task_names: Iterable[str]) -> bool:
+        """
+        Determine if any of the given tasks are in this build but were not successful.
+
+        :param task_names: Names of tasks to check.
+        :return: True if any of the given tasks in this build did not succeed.
+        """
+        present = self.task_names.lookup_mask(task_names) & self.all_mask
+        return bool(present & ~self.successful_mask)
+
+    def inactive_among(self, task_names: Iterable[str]) -> bool:
+        """
+        Determine if any of the given tasks are in this build but have not been run.
+
+        :param task_names: Names of tasks to check.
+        :return: True if any of the given tasks in this build have not been run.
+        """
+        present = self.task_names.lookup_mask(task_names) & self.all_mask
+        return bool(present & self.inactive_mask)
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Convert this build status into a JSON serializable dictionary."""
+        return {
+            "build_name": self.build_name,
+            "build_variant": self.build_variant,
+            "successful_tasks": sorted(self.successful_tasks),
+            "inactive_tasks": sorted(self.inactive_tasks),
+            "all_tasks": sorted(self.all_tasks),
+            "task_counts": list(self.task_counts) if self.task_counts is not None else None,
+            "finished": self.finished,
+        }
+
+    @classmethod
+    def from_dict(cls, build_status_dict: Dict[str, Any]) -> BuildStatus:
+        """
+        Create a build status from a dictionary created by `as_dict`.
+
+        :param build_status_dict: Dictionary to create build status from.
+        :return: Build status.
+        """
+        task_counts = build_status_dict.get("task_counts")
+        return cls(
+            build_name=build_status_dict["build_name"],
+            build_variant=build_status_dict["build_variant"],
+            successful_tasks=build_status_dict["successful_tasks"],
+            inactive_tasks=build_status_dict["inactive_tasks"],
+            all_tasks=build_status_dict["all_tasks"],
+            task_counts=TaskCounts(*task_counts) if task_counts is not None else None,
+            finished=build_status_dict.get("finished", False),
+        )
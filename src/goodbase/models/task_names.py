@@ -0,0 +1,129 @@
+"""Table of interned task names for storing sets of tasks as bitsets."""
+from threading import Lock
+from typing import Dict, Iterable, List, Set
+
+# Projects have a few thousand distinct task names at most, so a table this large has mostly
+# collected names from other projects or from tasks that no longer exist.
+MAX_TASK_NAMES = 50_000
+
+
+def popcount(mask: int) -> int:
+    """
+    Count the number of tasks in the given bitset.
+
+    :param mask: Bitset of tasks.
+    :return: Number of bits set.
+    """
+    return bin(mask).count("1")
+
+
+class TaskNameTable:
+    """
+    A table that assigns each task name it sees a bit.
+
+    The same task names appear in nearly every build of a project, so sets of tasks are stored as
+    integer bitsets over this table instead of sets of strings. Each name is only stored once, and
+    set operations on tasks become bit operations.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the table."""
+        self._lock = Lock()
+        self._bits: Dict[str, int] = {}
+        self._names: List[str] = []
+
+    def __len__(self) -> int:
+        """Get the number of task names in the table."""
+        return len(self._names)
+
+    def mask(self, names: Iterable[str]) -> int:
+        """
+        Get a bitset of the given task names, adding any new names to the table.
+
+        :param names: Task names to include.
+        :return: Bitset of task names.
+        """
+        mask = 0
+        for name in names:
+            bit = self._bits.get(name)
+            if bit is None:
+                bit = self._add(name)
+            mask |= 1 << bit
+        return mask
+
+    def lookup_mask(self, names: Iterable[str]) -> int:
+        """
+        Get a bitset of the given task names, ignoring names that are not in the table.
+
+        A name that is not in the table can not be in any bitset, so the table does not need to
+        grow to answer queries about it.
+
+        :param names: Task names to include.
+        :return: Bitset of task names.
+        """
+        mask = 0
+        for name in names:
+            bit = self._bits.get(name)
+            if bit is not None:
+                mask |= 1 << bit
+        return mask
+
+    def names(self, mask: int) -> Set[str]:
+        """
+        Get the task names in the given bitset.
+
+        :param mask: Bitset of task names.
+        :return: Set of task names.
+        """
+        names = set()
+        while mask:
+            lowest_bit = mask & -mask
+            names.add(self._names[lowest_bit.bit_length() - 1])
+            mask ^= lowest_bit
+        return names
+
+    def _add(self, name: str) -> int:
+        """
+        Add the given task name to the table.
+
+        :param name: Task name to add.
+        :return: Bit assigned to the task name.
+        """
+        with self._lock:
+            # Another thread may have added the name while waiting for the lock.
+            bit = self._bits.get(name)
+            if bit is None:
+                bit = len(self._names)
+                self._names.append(name)
+                self._bits[name] = bit
+            return bit
+
+
+class TaskNameTables:
+    """
+    The task name table to store new sets of tasks over.
+
+    Tables only grow, so once the current table is full, a new one is started. Each set of tasks
+    keeps a reference to the table it was stored over, so an old table is freed once nothing
+    stored over it is left. This keeps the memory used by a long running process bounded.
+    """
+
+    def __init__(self, max_names: int = MAX_TASK_NAMES) -> None:
+        """
+        Initialize the tables.
+
+        :param max_names: Number of names a table can hold before a new one is started.
+        """
+        self.max_names = max_names
+        self._lock = Lock()
+        self._current = TaskNameTable()
+
+    def current(self) -> TaskNameTable:
+        """Get the table to store new sets of tasks over."""
+        with self._lock:
+            if len(self._current) >= self.max_names:
+                self._current = TaskNameTable()
+            return self._current
+
+
+TASK_NAMES = TaskNameTables()
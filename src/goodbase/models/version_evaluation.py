@@ -0,0 +1,14 @@
+"""Model for the result of checking an evergreen version."""
+from typing import NamedTuple
+
+
+class VersionEvaluation(NamedTuple):
+    """
+    The result of checking an evergreen version against criteria.
+
+    passed: True if the version met the criteria.
+    final: True if the builds the result was based on have finished, so it can no longer change.
+    """
+
+    passed: bool
+    final: bool
@@ -0,0 +1,158 @@
+"""A service for caching data on disk between executions."""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from threading import Lock
+from time import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import structlog
+from xdg import xdg_cache_home
+
+from goodbase.services.stats_service import StatsService
+
+LOGGER = structlog.get_logger(__name__)
+
+CACHE_DIR = xdg_cache_home() / "git_co_evg_base"
+DEFAULT_MAX_AGE_SECS = 14 * 24 * 60 * 60
+DEFAULT_MAX_SIZE_BYTES = 256 * 1024 * 1024
+
+
+class CacheService:
+    """
+    A service for caching data on disk between executions.
+
+    Entries are JSON documents grouped into namespaces. Entries older than `max_age_secs` are
+    treated as missing, and once the cache grows past `max_size_bytes` the least recently written
+    entries are evicted.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path = CACHE_DIR,
+        max_age_secs: float = DEFAULT_MAX_AGE_SECS,
+        max_size_bytes: int = DEFAULT_MAX_SIZE_BYTES,
+        stats_service: Optional[StatsService] = None,
+    ) -> None:
+        """
+        Initialize the service.
+
+        :param cache_dir: Directory to store cache entries in.
+        :param max_age_secs: Number of seconds an entry is valid for.
+        :param max_size_bytes: Maximum size the cache should be allowed to grow to.
+        :param stats_service: Service to count cache hits and misses with.
+        """
+        self.cache_dir = cache_dir
+        self.max_age_secs = max_age_secs
+        self.max_size_bytes = max_size_bytes
+        self.stats_service = stats_service or StatsService()
+        self._eviction_lock = Lock()
+        self._evicted = False
+
+    def get(
+        self, namespace: str, key: str, max_age_secs: Optional[float] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Get the cached entry for the given key.
+
+        :param namespace: Namespace the entry belongs to.
+        :param key: Key of entry to get.
+        :param max_age_secs: Number of seconds the entry is valid for, instead of the default.
+        :return: Cached entry if it exists and has not expired.
+        """
+        if max_age_secs is None:
+            max_age_secs = self.max_age_secs
+        entry = self._read(namespace, key, max_age_secs)
+        self.stats_service.record_cache_lookup(namespace, hit=entry is not None)
+        return entry
+
+    def put(self, namespace: str, key: str, value: Dict[str, Any]) -> None:
+        """
+        Store the given entry in the cache.
+
+        :param namespace: Namespace the entry belongs to.
+        :param key: Key to store entry under.
+        :param value: Entry to store.
+        """
+        self._evict_once()
+        entry_path = self._entry_path(namespace, key)
+        try:
+            entry_path.parent.mkdir(parents=True, exist_ok=True)
+            # Write to a temp file and move it into place so concurrent readers never see a
+            # partially written entry.
+            fd, tmp_name = tempfile.mkstemp(dir=entry_path.parent, suffix=".tmp")
+            with os.fdopen(fd, "w") as tmp_file:
+                json.dump(value, tmp_file)
+            os.replace(tmp_name, entry_path)
+        except OSError:
+            LOGGER.debug("Unable to write cache entry", namespace=namespace, key=key, exc_info=True)
+
+    def evict(self) -> None:
+        """Remove expired entries and shrink the cache to fit under its maximum size."""
+        entries: List[Tuple[float, int, Path]] = []
+        now = time()
+        for entry_path in self.cache_dir.glob("*/*.json"):
+            try:
+                stat = entry_path.stat()
+                if now - stat.st_mtime > self.max_age_secs:
+                    entry_path.unlink()
+                else:
+                    entries.append((stat.st_mtime, stat.st_size, entry_path))
+            except OSError:
+                continue
+
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, entry_path in sorted(entries):
+            if total_size <= self.max_size_bytes:
+                break
+            try:
+                entry_path.unlink()
+            except OSError:
+                continue
+            total_size -= size
+
+    def purge(self) -> None:
+        """Remove all entries from the cache."""
+        if self.cache_dir.exists():
+            shutil.rmtree(self.cache_dir)
+
+    def _evict_once(self) -> None:
+        """Run eviction the first time the cache is written to by this process."""
+        with self._eviction_lock:
+            if self._evicted:
+                return
+            self._evicted = True
+        self.evict()
+
+    def _read(self, namespace: str, key: str, max_age_secs: float) -> Optional[Dict[str, Any]]:
+        """
+        Read the cached entry for the given key, removing it if it has expired.
+
+        :param namespace: Namespace the entry belongs to.
+        :param key: Key of entry to read.
+        :param max_age_secs: Number of seconds the entry is valid for.
+        :return: Cached entry if it exists and has not expired.
+        """
+        entry_path = self._entry_path(namespace, key)
+        try:
+            if time() - entry_path.stat().st_mtime > max_age_secs:
+                entry_path.unlink()
+                return None
+            with open(entry_path) as entry_file:
+                return json.load(entry_file)
+        except (OSError, ValueError):
+            return None
+
+    def _entry_path(self, namespace: str, key: str) -> Path:
+        """
+        Get the path an entry should be stored at.
+
+        :param namespace: Namespace the entry belongs to.
+        :param key: Key of the entry.
+        :return: Path to the entry.
+        """
+        key_hash = hashlib.sha256(key.encode()).hexdigest()
+        return self.cache_dir / namespace / f"{key_hash}.json"
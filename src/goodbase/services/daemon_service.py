@@ -0,0 +1,331 @@
+"""A long running daemon that answers searches over a local Unix socket."""
+from __future__ import annotations
+
+import os
+import socket
+import socketserver
+from collections import OrderedDict
+from pathlib import Path
+from threading import Event, Lock, Thread
+from time import monotonic
+from typing import List, Optional, Tuple
+
+import inject
+import structlog
+from evergreen import EvergreenApi
+from pydantic import BaseModel
+from xdg import xdg_cache_home, xdg_runtime_dir
+
+from goodbase.build_checker import BuildChecks, criteria_fingerprint
+from goodbase.goodbase_options import GoodBaseOptions, OutputFormat
+from goodbase.services.evg_service import EvergreenService
+from goodbase.services.profile_service import ProfileService
+from goodbase.services.search_service import SearchService
+from goodbase.services.verdict_ledger_service import VerdictLedgerService
+from goodbase.services.version_index_service import VersionIndexService
+
+LOGGER = structlog.get_logger(__name__)
+
+DEFAULT_SOCKET_PATH = (xdg_runtime_dir() or xdg_cache_home()) / "git_co_evg_base.sock"
+DEFAULT_REFRESH_SECS = 60
+CONNECT_TIMEOUT_SECS = 0.5
+MAX_REFRESHED_SEARCHES = 8
+# Searches no client has asked for in this many seconds are no longer refreshed.
+SEARCH_IDLE_SECS = 60 * 60
+
+
+class DaemonUnavailableError(Exception):
+    """Raised when a search can not be answered by the daemon."""
+
+
+class SearchRequest(BaseModel):
+    """
+    A search sent from the command line to the daemon.
+
+    evg_project: Evergreen project to search.
+    build_checks: Criteria to enforce.
+    max_lookback: Number of commits to scan before giving up.
+    commit_limit: Oldest commit to look at before giving up.
+    timeout_secs: Number of seconds to scan before timing out.
+    search_window: Number of versions to evaluate concurrently.
+    use_version_index: Resume searches from the local index of project versions.
+    """
+
+    evg_project: str
+    build_checks: List[BuildChecks]
+    max_lookback: int
+    commit_limit: Optional[str] = None
+    timeout_secs: Optional[int] = None
+    search_window: int = 1
+    use_version_index: bool = True
+
+    @classmethod
+    def create(
+        cls, evg_project: str, build_checks: List[BuildChecks], options: GoodBaseOptions
+    ) -> SearchRequest:
+        """
+        Create a search request for the given search.
+
+        :param evg_project: Evergreen project to search.
+        :param build_checks: Criteria to enforce.
+        :param options: Options of the search.
+        :return: Search request.
+        """
+        return cls(
+            evg_project=evg_project,
+            build_checks=build_checks,
+            max_lookback=options.max_lookback,
+            commit_limit=options.commit_limit,
+            timeout_secs=options.timeout_secs,
+            search_window=options.search_window,
+            use_version_index=options.use_version_index,
+        )
+
+    def key(self) -> Tuple[str, str]:
+        """Get a key that is shared by equivalent searches."""
+        return self.evg_project, criteria_fingerprint(self.build_checks)
+
+
+class SearchResponse(BaseModel):
+    """
+    Response to a search request.
+
+    revision: Revision that was found, if any.
+    error: Description of error encountered during the search.
+    """
+
+    revision: Optional[str] = None
+    error: Optional[str] = None
+
+
+class SearchServer(socketserver.ThreadingUnixStreamServer):
+    """A Unix socket server that answers each connection on its own thread."""
+
+    daemon_threads = True
+
+
+class DaemonClient:
+    """A client to send searches to a running daemon."""
+
+    def __init__(self, socket_path: Path = DEFAULT_SOCKET_PATH) -> None:
+        """
+        Initialize the client.
+
+        :param socket_path: Path of the daemon's socket.
+        """
+        self.socket_path = socket_path
+
+    def find_revision(
+        self, evg_project: str, build_checks: List[BuildChecks], options: GoodBaseOptions
+    ) -> Optional[str]:
+        """
+        Ask the daemon for the latest revision that matches the given criteria.
+
+        :param evg_project: Evergreen project to search.
+        :param build_checks: Criteria to enforce.
+        :param options: Options of the search.
+        :return: First git revision to match the given criteria if it exists.
+        """
+        request = SearchRequest.create(evg_project, build_checks, options)
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+                conn.settimeout(CONNECT_TIMEOUT_SECS)
+                conn.connect(str(self.socket_path))
+                # The search itself can take as long as the search is allowed to take.
+                conn.settimeout(None)
+                conn.sendall(request.json().encode() + b"\n")
+                with conn.makefile("rb") as conn_file:
+                    response_line = conn_file.readline()
+        except OSError as err:
+            raise DaemonUnavailableError(f"Could not reach daemon: {err}") from err
+
+        if not response_line:
+            raise DaemonUnavailableError("Daemon closed connection without responding")
+        response = SearchResponse.parse_raw(response_line)
+        if response.error:
+            raise DaemonUnavailableError(f"Daemon could not complete search: {response.error}")
+        return response.revision
+
+
+class SearchDaemon:
+    """
+    A long running process that answers searches over a local Unix socket.
+
+    The Evergreen session, on-disk caches and version indexes stay warm between searches. In the
+    background, the indexes of recently searched projects are refreshed and recent searches are
+    re-run, so their builds and verdicts are ready before the next search is asked for. A search
+    stops being refreshed once no client has asked for it for `SEARCH_IDLE_SECS`.
+    """
+
+    @inject.autoparams()
+    def __init__(
+        self,
+        evg_api: EvergreenApi,
+        evg_service: EvergreenService,
+        version_index_service: VersionIndexService,
+        verdict_ledger_service: VerdictLedgerService,
+        profile_service: ProfileService,
+        options: GoodBaseOptions,
+    ) -> None:
+        """
+        Initialize the daemon.
+
+        :param evg_api: Client to query evergreen API.
+        :param evg_service: Service to work with evergreen.
+        :param version_index_service: Service to keep a local index of project versions.
+        :param verdict_ledger_service: Service to remember which versions met criteria.
+        :param profile_service: Service for timing phases of execution.
+        :param options: Good Base options for execution.
+        """
+        self.evg_api = evg_api
+        self.evg_service = evg_service
+        self.version_index_service = version_index_service
+        self.verdict_ledger_service = verdict_ledger_service
+        self.profile_service = profile_service
+        self.options = options
+        self._lock = Lock()
+        # Recent searches and when a client last asked for them, least recently asked first.
+        self._recent_searches: OrderedDict[
+            Tuple[str, str], Tuple[SearchRequest, float]
+        ] = OrderedDict()
+        self._stopped = Event()
+
+    def serve(self, socket_path: Path, refresh_secs: float = DEFAULT_REFRESH_SECS) -> None:
+        """
+        Answer searches on the given socket until interrupted.
+
+        :param socket_path: Path to create the socket at.
+        :param refresh_secs: Number of seconds between background refreshes.
+        """
+        self._remove_stale_socket(socket_path)
+        server = self.create_server(socket_path)
+        refresher = Thread(
+            target=self._refresh_loop, args=(refresh_secs,), name="refresh", daemon=True
+        )
+        refresher.start()
+        LOGGER.info("Daemon listening", socket=str(socket_path))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            LOGGER.info("Daemon shutting down")
+        finally:
+            self._stopped.set()
+            server.server_close()
+            socket_path.unlink(missing_ok=True)
+
+    def create_server(self, socket_path: Path) -> SearchServer:
+        """
+        Create a server listening on the given socket.
+
+        :param socket_path: Path to create the socket at.
+        :return: Server that answers searches with this daemon.
+        """
+        daemon = self
+
+        class SearchRequestHandler(socketserver.StreamRequestHandler):
+            def handle(self) -> None:
+                request_line = self.rfile.readline()
+                if request_line:
+                    self.wfile.write(daemon.handle_line(request_line).json().encode() + b"\n")
+
+        socket_path.parent.mkdir(parents=True, exist_ok=True)
+        # Only the user running the daemon should be able to use its Evergreen credentials, so
+        # the socket is created without access for anyone else rather than restricted after.
+        previous_umask = os.umask(0o177)
+        try:
+            return SearchServer(str(socket_path), SearchRequestHandler)
+        finally:
+            os.umask(previous_umask)
+
+    def handle_line(self, request_line: bytes) -> SearchResponse:
+        """
+        Answer a single serialized search request.
+
+        :param request_line: Serialized search request.
+        :return: Response to the request.
+        """
+        try:
+            request = SearchRequest.parse_raw(request_line)
+            with self._lock:
+                self._recent_searches[request.key()] = (request, monotonic())
+                self._recent_searches.move_to_end(request.key())
+                while len(self._recent_searches) > MAX_REFRESHED_SEARCHES:
+                    self._recent_searches.popitem(last=False)
+            return SearchResponse(revision=self.search(request))
+        except Exception as err:
+            LOGGER.warning("Error handling search", exc_info=True)
+            return SearchResponse(error=str(err))
+
+    def search(self, request: SearchRequest) -> Optional[str]:
+        """
+        Run the given search.
+
+        :param request: Search to run.
+        :return: First git revision to match the given criteria if it exists.
+        """
+        options = self.options._replace(
+            max_lookback=request.max_lookback,
+            commit_limit=request.commit_limit,
+            timeout_secs=request.timeout_secs,
+            search_window=request.search_window,
+            use_version_index=request.use_version_index,
+            output_format=OutputFormat.JSON,
+        )
+        search_service = SearchService(
+            self.evg_api,
+            self.evg_service,
+            self.version_index_service,
+            self.verdict_ledger_service,
+            self.profile_service,
+            options,
+        )
+        # Searches are not serialized, even for the same project, so a search asked for in the
+        # foreground never waits behind a background refresh and its timeout covers all of it.
+        return search_service.find_revision(request.evg_project, request.build_checks)
+
+    def refresh(self) -> None:
+        """Refresh the indexes of recently searched projects and re-run recent searches."""
+        with self._lock:
+            idle_since = monotonic() - SEARCH_IDLE_SECS
+            while self._recent_searches:
+                _, last_requested = next(iter(self._recent_searches.values()))
+                if last_requested > idle_since:
+                    break
+                self._recent_searches.popitem(last=False)
+            recent_searches = [request for request, _ in self._recent_searches.values()]
+
+        for project in {request.evg_project for request in recent_searches}:
+            new_versions = self.version_index_service.refresh(project)
+            LOGGER.debug("Refreshed version index", project=project, new_versions=new_versions)
+
+        for request in recent_searches:
+            self.search(request)
+
+    def _refresh_loop(self, refresh_secs: float) -> None:
+        """
+        Refresh in the background until the daemon is stopped.
+
+        :param refresh_secs: Number of seconds between refreshes.
+        """
+        while not self._stopped.wait(refresh_secs):
+            try:
+                self.refresh()
+            except Exception:
+                LOGGER.warning("Error refreshing daemon", exc_info=True)
+
+    @staticmethod
+    def _remove_stale_socket(socket_path: Path) -> None:
+        """
+        Remove a socket left behind by a daemon that is no longer running.
+
+        :param socket_path: Path of the socket.
+        """
+        if not socket_path.exists():
+            return
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+            try:
+                conn.connect(str(socket_path))
+            except OSError:
+                socket_path.unlink()
+                return
+        raise ValueError(f"A daemon is already listening on {socket_path}")
@@ -1,54 +1,182 @@
 """Service to interact with evergreen."""
-from concurrent.futures import ThreadPoolExecutor as Executor
+from concurrent.futures import Future, as_completed
+from enum import Enum
 from pathlib import Path
-from typing import Dict, List
+from threading import Event
+from typing import Any, Dict, List, Optional
 
 import inject
-from evergreen import EvergreenApi, Version
+import structlog
+from evergreen import Build, EvergreenApi, Version
 from requests.exceptions import HTTPError
 
-from goodbase.build_checker import BuildChecks
-from goodbase.models.build_status import BuildStatus
+from goodbase.batch_evaluator import evaluate_versions
+from goodbase.build_checker import BuildChecks, CriteriaMatcher
+from goodbase.models.build_status import BuildStatus, TaskCounts
+from goodbase.models.version_evaluation import VersionEvaluation
+from goodbase.services.cache_service import CacheService
+from goodbase.services.executor_service import ExecutorService
 from goodbase.services.file_service import FileService
+from goodbase.services.profile_service import ProfileService
 
-N_THREADS = 16
+LOGGER = structlog.get_logger(__name__)
+
+BUILD_STATUS_CACHE = "build_status"
+BUILD_COUNTS_CACHE = "build_counts"
+PROJECT_CACHE = "project"
+MODULE_LOCATIONS_CACHE = "module_locations"
+MANIFEST_CACHE = "manifest"
+# Project settings rarely change, but can, so they are only trusted for a day.
+PROJECT_CACHE_MAX_AGE_SECS = 24 * 60 * 60
+FINISHED_TASK_STATUSES = {"success", "failed"}
+
+
+class BuildDataSource(str, Enum):
+    """
+    Where to get the data needed to check a build.
+
+    build: Task counts from the build document, good enough for threshold checks.
+    tasks: The full task list of the build, needed to check specific tasks.
+    """
+
+    BUILD = "build"
+    TASKS = "tasks"
 
 
 class EvergreenService:
     """A service to interact with Evergreen."""
 
     @inject.autoparams()
-    def __init__(self, evg_api: EvergreenApi, file_service: FileService) -> None:
+    def __init__(
+        self,
+        evg_api: EvergreenApi,
+        file_service: FileService,
+        cache_service: CacheService,
+        executor_service: ExecutorService,
+        profile_service: ProfileService,
+    ) -> None:
         """
         Initialize the service.
 
         :param evg_api: Evergreen API client.
         :param file_service: File service.
+        :param cache_service: Service for caching data between executions.
+        :param executor_service: Worker pool to make Evergreen requests on.
+        :param profile_service: Service for timing phases of execution.
         """
         self.evg_api = evg_api
         self.file_service = file_service
+        self.cache_service = cache_service
+        self.executor_service = executor_service
+        self.profile_service = profile_service
 
-    def analyze_build(self, build_id: str) -> BuildStatus:
+    @staticmethod
+    def plan_data_source(build_variant: str, build_checks: List[BuildChecks]) -> BuildDataSource:
+        """
+        Determine the cheapest source of data that can be used to check the given build variant.
+
+        :param build_variant: Build variant to be checked.
+        :param build_checks: Build criteria to use.
+        :return: Source of data to use for the build variant.
+        """
+        applicable_checks = CriteriaMatcher.of(build_checks).applicable(build_variant)
+        if any(bc.requires_task_names() for bc in applicable_checks):
+            return BuildDataSource.TASKS
+        return BuildDataSource.BUILD
+
+    def analyze_build(
+        self, build_id: str, data_source: BuildDataSource = BuildDataSource.TASKS
+    ) -> BuildStatus:
         """
         Get a summary of results for the given build.
 
         :param build_id: ID of build to analyze.
+        :param data_source: Where to get the data about the build from.
+        :return: Summary of build.
+        """
+        cached_status = self._cached_build_status(build_id, data_source)
+        if cached_status is not None:
+            return cached_status
+
+        with self.profile_service.span("build_by_id"):
+            build = self.evg_api.build_by_id(build_id)
+        if data_source == BuildDataSource.BUILD:
+            return self._summarize_build_counts(build_id, build)
+        return self._summarize_build_tasks(build_id, build)
+
+    def _cached_build_status(
+        self, build_id: str, data_source: BuildDataSource
+    ) -> Optional[BuildStatus]:
+        """
+        Get the cached summary of the given build, if it has finished and been seen before.
+
+        :param build_id: ID of build to look up.
+        :param data_source: Where the data about the build would come from.
+        :return: Cached summary of build, if there is one.
+        """
+        cached_status = self.cache_service.get(BUILD_STATUS_CACHE, build_id)
+        if cached_status is None and data_source == BuildDataSource.BUILD:
+            cached_status = self.cache_service.get(BUILD_COUNTS_CACHE, build_id)
+        if cached_status is not None:
+            return BuildStatus.from_dict(cached_status)
+        return None
+
+    def _summarize_build_counts(self, build_id: str, build: Build) -> BuildStatus:
+        """
+        Summarize the given build using the task counts in the build document.
+
+        :param build_id: ID of build being summarized.
+        :param build: Build to summarize.
+        :return: Summary of build.
+        """
+        status_counts = build.status_counts
+        inactive = (status_counts.undispatched or 0) + (status_counts.inactivate or 0)
+        in_progress = (status_counts.started or 0) + (status_counts.dispatched or 0)
+        build_status = BuildStatus.from_counts(
+            build_name=build.display_name,
+            build_variant=build.build_variant,
+            task_counts=TaskCounts(
+                successful=status_counts.succeeded or 0,
+                inactive=inactive,
+                total=len(build.tasks),
+            ),
+            finished=bool(build.tasks) and inactive == 0 and in_progress == 0,
+        )
+
+        if build_status.finished:
+            self.cache_service.put(BUILD_COUNTS_CACHE, build_id, build_status.as_dict())
+
+        return build_status
+
+    def _summarize_build_tasks(self, build_id: str, build: Build) -> BuildStatus:
+        """
+        Summarize the given build using its full task list.
+
+        :param build_id: ID of build being summarized.
+        :param build: Build to summarize.
         :return: Summary of build.
         """
-        build = self.evg_api.build_by_id(build_id)
-        tasks = build.get_tasks()
+        with self.profile_service.span("get_tasks"):
+            tasks = build.get_tasks()
         successful_tasks = {task.display_name for task in tasks if task.is_success()}
         inactive_tasks = {task.display_name for task in tasks if task.is_undispatched()}
         all_tasks = {task.display_name for task in tasks}
 
-        return BuildStatus(
+        build_status = BuildStatus(
             build_name=build.display_name,
             build_variant=build.build_variant,
             successful_tasks=successful_tasks,
             inactive_tasks=inactive_tasks,
             all_tasks=all_tasks,
+            finished=bool(tasks) and all(task.status in FINISHED_TASK_STATUSES for task in tasks),
         )
 
+        # Once every task in a build has finished, its status can no longer change.
+        if build_status.finished:
+            self.cache_service.put(BUILD_STATUS_CACHE, build_id, build_status.as_dict())
+
+        return build_status
+
     def check_version(self, evg_version: Version, build_checks: List[BuildChecks]) -> bool:
         """
         Check if the given version meets the specified criteria.
@@ -57,8 +185,48 @@ class EvergreenService:
         :param build_checks: Build criteria to use.
         :return: True if the version matches the specified criteria.
         """
-        build_status_list = self.get_build_statuses_for_version(evg_version, build_checks)
-        return all(bc.check(bs) for bs in build_status_list for bc in build_checks)
+        return self.evaluate_version(evg_version, build_checks).passed
+
+    def evaluate_version(
+        self,
+        evg_version: Version,
+        build_checks: List[BuildChecks],
+        stop: Optional[Event] = None,
+    ) -> VersionEvaluation:
+        """
+        Check the given version against the specified criteria.
+
+        :param evg_version: Evergreen version to check.
+        :param build_checks: Build criteria to use.
+        :param stop: Event set once the result is no longer needed, to skip remaining builds.
+        :return: Whether the version met the criteria and if that result can still change.
+        """
+        build_checks = CriteriaMatcher.of(build_checks)
+        if self._version_guarantees_rejection(evg_version, build_checks):
+            # The version can still be activated and run, so this result is not final.
+            return VersionEvaluation(passed=False, final=False)
+
+        jobs = self._submit_builds(evg_version, build_checks)
+        all_finished = True
+        try:
+            # Check builds as they come in so one failing build can reject the version without
+            # waiting on the rest.
+            for job in as_completed(jobs):
+                if stop is not None and stop.is_set():
+                    return VersionEvaluation(passed=False, final=False)
+                build_status = job.result()
+                if not build_checks.check(build_status):
+                    LOGGER.debug(
+                        "Build does not meet criteria, skipping remaining builds",
+                        build=build_status.build_name,
+                        commit=evg_version.revision,
+                    )
+                    return VersionEvaluation(passed=False, final=build_status.finished)
+                all_finished = all_finished and build_status.finished
+            return VersionEvaluation(passed=True, final=all_finished)
+        finally:
+            for job in jobs:
+                job.cancel()
 
     def get_build_statuses_for_version(
         self, evg_version: Version, build_checks: List[BuildChecks]
@@ -70,25 +238,140 @@ class EvergreenService:
         :param build_checks: Build criteria to use.
         :return: List of build statuses.
         """
-        with Executor(max_workers=N_THREADS) as exe:
-            jobs = [
-                exe.submit(self.analyze_build, build_id)
-                for bv, build_id in evg_version.build_variants_map.items()
-                if any(bc.should_apply(bv) for bc in build_checks)
+        return [job.result() for job in self._submit_builds(evg_version, build_checks)]
+
+    def _submit_builds(
+        self, evg_version: Version, build_checks: List[BuildChecks]
+    ) -> List["Future[BuildStatus]"]:
+        """
+        Start analyzing the builds in the given version that any of the criteria apply to.
+
+        :param evg_version: Evergreen version to check.
+        :param build_checks: Build criteria to use.
+        :return: Jobs analyzing each build.
+        """
+        build_checks = CriteriaMatcher.of(build_checks)
+        return [
+            self.executor_service.submit(
+                self.analyze_build, build_id, self.plan_data_source(bv, build_checks)
+            )
+            for bv, build_id in self._builds_to_check(evg_version, build_checks).items()
+        ]
+
+    def evaluate_cached_versions(
+        self, evg_versions: List[Version], build_checks: List[BuildChecks]
+    ) -> Dict[str, VersionEvaluation]:
+        """
+        Check the versions whose builds are all cached against the specified criteria.
+
+        Only finished builds are cached, so the results are final. No requests are made to
+        Evergreen, and versions with any build that is not cached are left out of the results.
+
+        :param evg_versions: Evergreen versions to check.
+        :param build_checks: Build criteria to use.
+        :return: Dictionary of version IDs and their evaluations.
+        """
+        build_checks = CriteriaMatcher.of(build_checks)
+        cached_versions: List[Version] = []
+        version_statuses: List[List[BuildStatus]] = []
+        for evg_version in evg_versions:
+            build_statuses = [
+                self._cached_build_status(build_id, self.plan_data_source(bv, build_checks))
+                for bv, build_id in self._builds_to_check(evg_version, build_checks).items()
             ]
+            if all(build_status is not None for build_status in build_statuses):
+                cached_versions.append(evg_version)
+                version_statuses.append(
+                    [build_status for build_status in build_statuses if build_status is not None]
+                )
+
+        if not cached_versions:
+            return {}
+
+        results = evaluate_versions(build_checks, version_statuses)
+        return {
+            evg_version.version_id: VersionEvaluation(passed=passed, final=True)
+            for evg_version, passed in zip(cached_versions, results)
+        }
+
+    @staticmethod
+    def _version_guarantees_rejection(
+        evg_version: Version, build_checks: List[BuildChecks]
+    ) -> bool:
+        """
+        Determine if the version document alone shows the version can not meet the criteria.
+
+        Only versions fetched from Evergreen say if they are activated and what their status is.
+        Versions read from the version index leave those fields out, so they are never ruled out
+        here.
+
+        :param evg_version: Evergreen version to check.
+        :param build_checks: Build criteria to use.
+        :return: True if the version is guaranteed to fail the criteria.
+        """
+        activated = evg_version.json.get("activated")
+        status = evg_version.json.get("status")
+        if activated is None and status is None:
+            return False
+
+        matcher = CriteriaMatcher.of(build_checks)
+        for bv in evg_version.build_variants_map:
+            if any(bc.guarantees_rejection(activated, status) for bc in matcher.applicable(bv)):
+                LOGGER.debug(
+                    "Version ruled out by version document",
+                    commit=evg_version.revision,
+                    build_variant=bv,
+                    activated=activated,
+                    status=status,
+                )
+                return True
+        return False
 
-        return [j.result() for j in jobs]
+    @staticmethod
+    def _builds_to_check(evg_version: Version, build_checks: List[BuildChecks]) -> Dict[str, str]:
+        """
+        Get the builds in the given version that any of the criteria apply to.
+
+        :param evg_version: Evergreen version to check.
+        :param build_checks: Build criteria to use.
+        :return: Dictionary of build variants and the IDs of their builds.
+        """
+        matcher = CriteriaMatcher.of(build_checks)
+        return {
+            bv: build_id
+            for bv, build_id in evg_version.build_variants_map.items()
+            if matcher.applies_to(bv)
+        }
 
     def get_modules_revisions(self, project_id: str, revision: str) -> Dict[str, str]:
         """
         Get a map of the modules and git revisions they ran with on the given commit.
 
+        :param project_id: Evergreen project being queried.
+        :param revision: Commit revision to query.
+        :return: Dictionary of modules and revisions associated with specified commit.
+        """
+        # The manifest of a commit never changes, so it is always safe to use a cached copy.
+        cache_key = f"{project_id}/{revision}"
+        cached_manifest = self.cache_service.get(MANIFEST_CACHE, cache_key)
+        if cached_manifest is not None:
+            return cached_manifest["modules"]
+
+        modules_revisions = self._get_modules_revisions(project_id, revision)
+        self.cache_service.put(MANIFEST_CACHE, cache_key, {"modules": modules_revisions})
+        return modules_revisions
+
+    def _get_modules_revisions(self, project_id: str, revision: str) -> Dict[str, str]:
+        """
+        Get the modules and git revisions in the manifest of the given commit from Evergreen.
+
         :param project_id: Evergreen project being queried.
         :param revision: Commit revision to query.
         :return: Dictionary of modules and revisions associated with specified commit.
         """
         try:
-            manifest = self.evg_api.manifest(project_id, revision)
+            with self.profile_service.span("manifest"):
+                manifest = self.evg_api.manifest(project_id, revision)
         except HTTPError as err:
             if err.response.status_code == 404:
                 # If a project does not use modules, the manifest will return 404.
@@ -106,13 +389,29 @@ class EvergreenService:
         :param project_id: ID of Evergreen project being queried.
         :return: Path to project config file.
         """
-        project_config_list = self.evg_api.all_projects(
-            project_filter_fn=lambda p: p.identifier == project_id
+        project = self.cache_service.get(
+            PROJECT_CACHE, project_id, max_age_secs=PROJECT_CACHE_MAX_AGE_SECS
         )
-        if len(project_config_list) != 1:
-            raise ValueError(f"Could not find unique project configuration for : '{project_id}'.")
-        project_config = project_config_list[0]
-        return project_config.remote_path
+        if project is None:
+            project = self._get_project(project_id)
+            self.cache_service.put(PROJECT_CACHE, project_id, project)
+        return project["remote_path"]
+
+    def _get_project(self, project_id: str) -> Dict[str, Any]:
+        """
+        Get the metadata of the given project from Evergreen.
+
+        :param project_id: ID of Evergreen project being queried.
+        :return: Metadata of project.
+        """
+        try:
+            with self.profile_service.span("get_project_config_location"):
+                project = self.evg_api.project_by_id(project_id)
+        except HTTPError as err:
+            if err.response is not None and err.response.status_code == 404:
+                raise ValueError(f"Could not find project configuration for : '{project_id}'.")
+            raise err
+        return project.json
 
     def get_module_locations(self, project_id: str) -> Dict[str, str]:
         """
@@ -121,6 +420,12 @@ class EvergreenService:
         :param project_id: ID of project to query.
         :return: Dictionary of modules and their paths.
         """
-        project_config_location = self.get_project_config_location(project_id)
-        project_config = self.file_service.read_yaml_file(Path(project_config_location))
-        return {module["name"]: module["prefix"] for module in project_config.get("modules", [])}
+        project_config_location = Path(self.get_project_config_location(project_id))
+        # The project config is large, so the modules found in it are cached by its contents.
+        config_hash = self.file_service.file_hash(project_config_location)
+        module_locations = self.cache_service.get(MODULE_LOCATIONS_CACHE, config_hash)
+        if module_locations is None:
+            modules = self.file_service.read_yaml_section(project_config_location, "modules")
+            module_locations = {module["name"]: module["prefix"] for module in modules or []}
+            self.cache_service.put(MODULE_LOCATIONS_CACHE, config_hash, module_locations)
+        return module_locations
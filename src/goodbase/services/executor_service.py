@@ -0,0 +1,59 @@
+"""A service for running work concurrently."""
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor as Executor
+from threading import BoundedSemaphore
+from typing import Any, Callable, TypeVar
+
+import inject
+
+from goodbase.goodbase_options import GoodBaseOptions
+
+T = TypeVar("T")
+
+
+class ExecutorService:
+    """
+    A process-wide worker pool for Evergreen requests.
+
+    All concurrent calls to Evergreen should be submitted here, so the number of threads and
+    in-flight requests stay bounded no matter how many versions are being checked at once.
+    """
+
+    @inject.autoparams()
+    def __init__(self, options: GoodBaseOptions) -> None:
+        """
+        Initialize the service.
+
+        :param options: Options for execution.
+        """
+        self._executor = Executor(max_workers=options.evg_workers, thread_name_prefix="evg")
+        self._in_flight = BoundedSemaphore(options.evg_max_in_flight or options.evg_workers)
+
+    def submit(self, fn: Callable[..., T], *args: Any) -> "Future[T]":
+        """
+        Schedule the given function to run on the worker pool.
+
+        :param fn: Function to run.
+        :param args: Arguments to pass to the function.
+        :return: Future for the result of the function.
+        """
+        return self._executor.submit(self._run_limited, fn, *args)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Shutdown the worker pool.
+
+        :param wait: Wait for running work to complete before returning.
+        """
+        self._executor.shutdown(wait=wait)
+
+    def _run_limited(self, fn: Callable[..., T], *args: Any) -> T:
+        """
+        Run the given function once an in-flight request slot is available.
+
+        :param fn: Function to run.
+        :param args: Arguments to pass to the function.
+        :return: Result of the function.
+        """
+        with self._in_flight:
+            return fn(*args)
@@ -1,8 +1,60 @@
 """A service for working with files."""
+import hashlib
+from collections import deque
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Deque, Dict, List, Optional
 
 import yaml
+from yaml.composer import Composer
+from yaml.constructor import SafeConstructor
+from yaml.events import (
+    CollectionEndEvent,
+    CollectionStartEvent,
+    Event,
+    MappingEndEvent,
+    MappingStartEvent,
+    ScalarEvent,
+    SequenceStartEvent,
+)
+from yaml.resolver import Resolver
+
+# Use the libyaml bindings when they are available, they parse many times faster.
+YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+class _EventLoader(Composer, SafeConstructor, Resolver):
+    """A yaml loader that builds a document from events that have already been parsed."""
+
+    def __init__(self, events: List[Event]) -> None:
+        """
+        Initialize the loader.
+
+        :param events: Events of a single node.
+        """
+        self._events: Deque[Event] = deque(events)
+        Composer.__init__(self)
+        SafeConstructor.__init__(self)
+        Resolver.__init__(self)
+
+    def check_event(self, *choices: Any) -> bool:
+        """Check whether the next event is one of the given types."""
+        if not self._events:
+            return False
+        return not choices or isinstance(self._events[0], choices)
+
+    def peek_event(self) -> Event:
+        """Get the next event without consuming it."""
+        return self._events[0]
+
+    def get_event(self) -> Event:
+        """Consume the next event."""
+        return self._events.popleft()
+
+    def load(self) -> Any:
+        """Build the node the events describe."""
+        return self.construct_document(self.compose_node(None, None))  # type: ignore[arg-type]
 
 
 class FileService:
@@ -19,6 +71,49 @@ class FileService:
         with open(file_path) as file_contents:
             return yaml.safe_load(file_contents)
 
+    @staticmethod
+    def read_yaml_section(file_path: Path, key: str) -> Optional[Any]:
+        """
+        Read a single top-level section of the given yaml file.
+
+        The file is only parsed up to the end of the section, and the rest of the document is
+        never built. If the section refers to anchors defined outside of it, the whole file is
+        loaded instead.
+
+        :param file_path: Path to yaml file to read.
+        :param key: Top-level key of section to read.
+        :return: Contents of the section, or None if the file has no such section.
+        """
+        with open(file_path, "rb") as file_contents:
+            loader = YamlLoader(file_contents)
+            try:
+                section_events = _find_top_level_section(loader, key)
+            finally:
+                loader.dispose()
+        if section_events is None:
+            return None
+
+        try:
+            return _EventLoader(section_events).load()
+        except yaml.composer.ComposerError:
+            with open(file_path, "rb") as file_contents:
+                document = yaml.load(file_contents, Loader=YamlLoader)
+            return document.get(key) if isinstance(document, dict) else None
+
+    @staticmethod
+    def file_hash(file_path: Path) -> str:
+        """
+        Get a hash of the contents of the given file.
+
+        :param file_path: Path to file to hash.
+        :return: Hex digest of the file contents.
+        """
+        file_hash = hashlib.sha256()
+        with open(file_path, "rb") as file_contents:
+            for chunk in iter(lambda: file_contents.read(HASH_CHUNK_SIZE), b""):
+                file_hash.update(chunk)
+        return file_hash.hexdigest()
+
     @staticmethod
     def write_yaml_file(file_path: Path, contents: Dict[str, Any]) -> None:
         """Write the given contents to the specified file."""
@@ -32,3 +127,50 @@ class FileService:
     def path_exists(path: Path) -> bool:
         """Determine if the given path exists."""
         return path.exists()
+
+
+def _find_top_level_section(loader: Any, key: str) -> Optional[List[Event]]:
+    """
+    Get the events of the value under the given key of the document's top-level mapping.
+
+    :param loader: Loader to read events from, positioned at the start of the stream.
+    :param key: Top-level key to find.
+    :return: Events of the value, or None if the document has no such key.
+    """
+    # The libyaml bindings only match exact event types, so base classes can not be checked for.
+    while loader.check_event() and not loader.check_event(MappingStartEvent, SequenceStartEvent):
+        loader.get_event()
+    if not loader.check_event(MappingStartEvent):
+        return None
+
+    loader.get_event()
+    while not loader.check_event(MappingEndEvent):
+        key_event = loader.peek_event()
+        _read_node(loader, keep=False)
+        is_section = isinstance(key_event, ScalarEvent) and key_event.value == key
+        value_events = _read_node(loader, keep=is_section)
+        if is_section:
+            return value_events
+    return None
+
+
+def _read_node(loader: Any, keep: bool) -> List[Event]:
+    """
+    Consume the events of the next node.
+
+    :param loader: Loader to read events from.
+    :param keep: Whether to return the events, rather than discarding them.
+    :return: Events of the node, if they were kept.
+    """
+    events = []
+    depth = 0
+    while True:
+        event = loader.get_event()
+        if keep:
+            events.append(event)
+        if isinstance(event, CollectionStartEvent):
+            depth += 1
+        elif isinstance(event, CollectionEndEvent):
+            depth -= 1
+        if depth == 0:
+            return events
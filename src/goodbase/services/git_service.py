@@ -1,9 +1,21 @@
 """A service for interacting with git."""
+from concurrent.futures import Future, ThreadPoolExecutor
 from enum import Enum
 from pathlib import Path
-from typing import Optional
+from threading import BoundedSemaphore, Thread
+from typing import Dict, List, Optional, Set, Tuple
 
-from plumbum import local
+import inject
+import structlog
+from plumbum import ProcessExecutionError, local
+
+from goodbase.services.profile_service import ProfileService
+
+LOGGER = structlog.get_logger(__name__)
+
+DEFAULT_GIT_WORKERS = 4
+# Number of commits back from a ref that are read when checking which revisions are reachable.
+MAX_REACHABLE_COMMITS = 10_000
 
 
 class GitAction(str, Enum):
@@ -23,11 +35,24 @@ class GitAction(str, Enum):
 
 
 class GitService:
-    """A service for interacting with git."""
+    """
+    A service for interacting with git.
 
-    def __init__(self) -> None:
-        """Initialize the service."""
+    Commands are run with the repository directory as their working directory, rather than by
+    changing the working directory of the process, so commands in different repositories can be
+    run from different threads.
+    """
+
+    @inject.autoparams()
+    def __init__(self, profile_service: ProfileService) -> None:
+        """
+        Initialize the service.
+
+        :param profile_service: Service for timing phases of execution.
+        """
         self.git = local.cmd.git
+        self.profile_service = profile_service
+        self._prefetches: Dict[Path, "Future[None]"] = {}
 
     def perform_action(
         self,
@@ -35,6 +60,7 @@ class GitService:
         revision: str,
         directory: Optional[Path] = None,
         branch_name: Optional[str] = None,
+        fetch: bool = True,
     ) -> None:
         """
         Perform the given git operation.
@@ -43,17 +69,207 @@ class GitService:
         :param revision: Git revision to perform operation with.
         :param directory: Directory of git repository.
         :param branch_name: Name of branch for git checkout.
+        :param fetch: Whether to fetch from origin before performing the operation.
         """
         if action == GitAction.NONE:
             return
 
-        self.fetch(directory)
-        if action == GitAction.CHECKOUT:
-            self.checkout(revision, directory, branch_name)
-        elif action == GitAction.REBASE:
-            self.rebase(revision, directory)
-        elif action == GitAction.MERGE:
-            self.merge(revision, directory)
+        if fetch:
+            with self.profile_service.span("git_fetch"):
+                self.fetch_revision(revision, directory)
+        with self.profile_service.span(f"git_{action.value}"):
+            if action == GitAction.CHECKOUT:
+                self.checkout(revision, directory, branch_name)
+            elif action == GitAction.REBASE:
+                self.rebase(revision, directory)
+            elif action == GitAction.MERGE:
+                self.merge(revision, directory)
+
+    def fetch_revisions(
+        self, revisions: Dict[Optional[Path], str], max_workers: int = DEFAULT_GIT_WORKERS
+    ) -> Dict[Optional[Path], ProcessExecutionError]:
+        """
+        Make sure each repository has the given revision, fetching them concurrently if needed.
+
+        :param revisions: Dictionary of git repository directories and the revision each needs.
+        :param max_workers: Maximum number of fetches to run at once.
+        :return: Dictionary of directories that could not be fetched and the error encountered.
+        """
+
+        def fetch(directory: Optional[Path], revision: str) -> None:
+            with self.profile_service.span("git_fetch"):
+                self.fetch_revision(revision, directory)
+
+        workers = max(min(max_workers, len(revisions)), 1)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="git") as executor:
+            jobs = {
+                directory: executor.submit(fetch, directory, revision)
+                for directory, revision in revisions.items()
+            }
+
+        errors = {}
+        for directory, job in jobs.items():
+            err = job.exception()
+            if isinstance(err, ProcessExecutionError):
+                errors[directory] = err
+            elif err is not None:
+                raise err
+        return errors
+
+    def prefetch(
+        self, directories: List[Optional[Path]], max_workers: int = DEFAULT_GIT_WORKERS
+    ) -> None:
+        """
+        Start fetching everything from origin in the background in each of the given repositories.
+
+        Later fetches in a repository wait for its background fetch to finish first, as do any
+        operations that change its working tree. The background fetches do not keep the process
+        alive on their own, so `wait_for_prefetches` needs to be called before exiting.
+
+        :param directories: Directories of git repositories to fetch.
+        :param max_workers: Maximum number of fetches to run at once.
+        """
+        slots = BoundedSemaphore(max_workers)
+        for directory in directories:
+            repository = self._determine_directory(directory)
+            if repository in self._prefetches:
+                continue
+            prefetch: "Future[None]" = Future()
+            self._prefetches[repository] = prefetch
+            Thread(
+                target=self._run_prefetch,
+                args=(repository, prefetch, slots),
+                name="git-prefetch",
+                daemon=True,
+            ).start()
+
+    def wait_for_prefetch(self, directory: Optional[Path] = None) -> bool:
+        """
+        Wait for the background fetch of the given repository to finish, if there is one.
+
+        :param directory: Directory of git repository.
+        :return: True if there was a background fetch to wait for.
+        """
+        prefetch = self._prefetches.pop(self._determine_directory(directory), None)
+        if prefetch is None:
+            return False
+
+        with self.profile_service.span("git_prefetch_wait"):
+            err = prefetch.exception()
+        if err is not None:
+            # The revision will be fetched directly if the background fetch did not get it.
+            LOGGER.debug("Background fetch failed", directory=directory, exc_info=err)
+        return True
+
+    def wait_for_prefetches(self) -> None:
+        """Wait for every background fetch that has not been waited for yet to finish."""
+        for repository in list(self._prefetches):
+            self.wait_for_prefetch(repository)
+
+    def _run_prefetch(
+        self, repository: Path, prefetch: "Future[None]", slots: BoundedSemaphore
+    ) -> None:
+        """
+        Fetch everything from origin in the given repository.
+
+        :param repository: Directory of git repository.
+        :param prefetch: Future to report the result of the fetch to.
+        :param slots: Semaphore limiting how many fetches run at once.
+        """
+        try:
+            with slots, self.profile_service.span("git_prefetch"):
+                self.fetch(repository)
+        except Exception as err:
+            prefetch.set_exception(err)
+        else:
+            prefetch.set_result(None)
+
+    def fetch_revision(self, revision: str, directory: Optional[Path] = None) -> None:
+        """
+        Fetch the given revision from origin, unless it is already available locally.
+
+        Only the given revision is fetched. If origin does not allow fetching a single commit,
+        everything is fetched instead.
+
+        :param revision: Revision that needs to be available.
+        :param directory: Directory to execute command at.
+        """
+        self.fetch_missing_revisions([revision], directory)
+
+    def fetch_missing_revisions(
+        self, revisions: List[str], directory: Optional[Path] = None
+    ) -> None:
+        """
+        Fetch whichever of the given revisions are not available locally with a single fetch.
+
+        If origin does not allow fetching single commits, everything is fetched instead. Any
+        background fetch of the repository is only waited for if some revisions are missing.
+
+        :param revisions: Revisions that need to be available.
+        :param directory: Directory to execute command at.
+        """
+        missing = self.missing_revisions(revisions, directory)
+        if missing and self.wait_for_prefetch(directory):
+            # The background fetch may have brought in the missing revisions.
+            missing = self.missing_revisions(missing, directory)
+        if not missing:
+            return
+
+        try:
+            self.fetch(directory, missing)
+        except ProcessExecutionError:
+            LOGGER.debug("Unable to fetch revisions, fetching all refs", revisions=missing)
+            self.fetch(directory)
+
+    def commit_distance(self, revision: str, directory: Optional[Path] = None) -> Tuple[int, int]:
+        """
+        Count the commits between HEAD and the given revision.
+
+        :param revision: Revision to compare HEAD against.
+        :param directory: Directory to execute command at.
+        :return: Number of commits only on HEAD and number of commits only on the revision.
+        """
+        rev_list = self.git["rev-list", "--count", "--left-right", f"HEAD...{revision}", "--"]
+        ahead, behind = rev_list.with_cwd(self._determine_directory(directory))().split()
+        return int(ahead), int(behind)
+
+    def reachable_revisions(
+        self, ref: str, directory: Optional[Path] = None, max_count: int = MAX_REACHABLE_COMMITS
+    ) -> Set[str]:
+        """
+        Get the commits reachable from the given ref in the local repository.
+
+        The ref is read as it is now, without waiting on any background fetch of the repository,
+        so the search can run while the fetch does.
+
+        :param ref: Ref to walk back from, for example `origin/master`.
+        :param directory: Directory to execute command at.
+        :param max_count: Maximum number of commits to read.
+        :return: Full hashes of the newest commits reachable from the ref.
+        """
+        rev_list = self.git["rev-list", f"--max-count={max_count}", ref, "--"]
+        return set(rev_list.with_cwd(self._determine_directory(directory))().split())
+
+    def missing_revisions(
+        self, revisions: List[str], directory: Optional[Path] = None
+    ) -> List[str]:
+        """
+        Find which of the given revisions are not commits in the local repository.
+
+        :param revisions: Revisions to look for.
+        :param directory: Directory to execute command at.
+        :return: Revisions that are not available locally.
+        """
+        batch_input = "".join(f"{revision}^{{commit}}\n" for revision in revisions)
+        cat_file = self.git["cat-file", "--batch-check"].with_cwd(
+            self._determine_directory(directory)
+        )
+        # Each revision gets a line of output, either describing the commit or saying why it
+        # could not be found.
+        output = (cat_file << batch_input)().splitlines()
+        return [
+            revision for revision, line in zip(revisions, output) if line.split()[1:2] != ["commit"]
+        ]
 
     def checkout(
         self, revision: str, directory: Optional[Path] = None, branch_name: Optional[str] = None
@@ -65,21 +281,24 @@ class GitService:
         :param directory: Directory to execute command at.
         :param branch_name: Name of branch for git checkout.
         """
+        self.wait_for_prefetch(directory)
         args = ["checkout"]
         if branch_name is not None:
             args += ["-b", branch_name]
         args.append(revision)
-        with local.cwd(self._determine_directory(directory)):
-            self.git[args]()
+        self.git[args].with_cwd(self._determine_directory(directory))()
 
-    def fetch(self, directory: Optional[Path] = None) -> None:
+    def fetch(
+        self, directory: Optional[Path] = None, revisions: Optional[List[str]] = None
+    ) -> None:
         """
         Check the latest code from origin.
 
         :param directory: Directory to execute command at.
+        :param revisions: Revisions to fetch, rather than every ref.
         """
-        with local.cwd(self._determine_directory(directory)):
-            self.git["fetch", "origin"]()
+        args = ("fetch", "origin", *(revisions or []))
+        self.git[args].with_cwd(self._determine_directory(directory))()
 
     def rebase(self, revision: str, directory: Optional[Path] = None) -> None:
         """
@@ -88,8 +307,8 @@ class GitService:
         :param revision: Revision to rebase on.
         :param directory: Directory to execute command at.
         """
-        with local.cwd(self._determine_directory(directory)):
-            self.git["rebase", revision]()
+        self.wait_for_prefetch(directory)
+        self.git["rebase", revision].with_cwd(self._determine_directory(directory))()
 
     def merge(self, revision: str, directory: Optional[Path] = None) -> None:
         """
@@ -98,8 +317,8 @@ class GitService:
         :param revision: Revision to merge.
         :param directory: Directory to execute command at.
         """
-        with local.cwd(self._determine_directory(directory)):
-            self.git["merge", revision]()
+        self.wait_for_prefetch(directory)
+        self.git["merge", revision].with_cwd(self._determine_directory(directory))()
 
     @staticmethod
     def _determine_directory(directory: Optional[Path] = None) -> Path:
@@ -0,0 +1,266 @@
+"""A service for timing the phases of an execution."""
+from __future__ import annotations
+
+import json
+import math
+import os
+import threading
+from contextlib import contextmanager
+from enum import Enum
+from pathlib import Path
+from threading import Lock
+from time import perf_counter
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, TypeVar
+from urllib.parse import urlparse
+
+T = TypeVar("T")
+
+PHASE = "phase"
+ENDPOINT = "endpoint"
+
+# Segments of Evergreen API paths that name a resource rather than identify one.
+ENDPOINT_PATH_WORDS = {
+    "rest",
+    "v2",
+    "api",
+    "projects",
+    "versions",
+    "builds",
+    "tasks",
+    "patches",
+    "revisions",
+    "plugin",
+    "manifest",
+    "get",
+}
+
+
+class ProfileFormat(str, Enum):
+    """
+    Format to write profile spans in.
+
+    json: List of spans.
+    chrome-trace: Chrome trace event format, viewable in chrome://tracing or Perfetto.
+    """
+
+    JSON = "json"
+    CHROME_TRACE = "chrome-trace"
+
+
+class Span(NamedTuple):
+    """
+    A timed section of an execution.
+
+    name: Name of the phase or endpoint that was timed.
+    category: Whether the span times a phase of execution or a call to an endpoint.
+    start_secs: Seconds since profiling started that the span started at.
+    duration_secs: Seconds the span took.
+    thread_id: ID of thread the span ran on.
+    """
+
+    name: str
+    category: str
+    start_secs: float
+    duration_secs: float
+    thread_id: int
+
+
+class SpanSummary(NamedTuple):
+    """
+    Summary of every span with the same name.
+
+    name: Name of the phase or endpoint.
+    category: Whether the spans time a phase of execution or calls to an endpoint.
+    span_count: Number of spans.
+    total_secs: Combined duration of the spans.
+    p50_secs: Median duration of the spans.
+    p95_secs: 95th percentile duration of the spans.
+    """
+
+    name: str
+    category: str
+    span_count: int
+    total_secs: float
+    p50_secs: float
+    p95_secs: float
+
+
+def endpoint_name(url: str) -> str:
+    """
+    Get the name of the endpoint the given URL calls, with any IDs in the path replaced.
+
+    :param url: URL of an Evergreen API call.
+    :return: Path of the endpoint, for example `/rest/v2/builds/{id}/tasks`.
+    """
+    segments = [
+        segment if segment in ENDPOINT_PATH_WORDS else "{id}"
+        for segment in urlparse(url).path.split("/")
+        if segment
+    ]
+    return "/" + "/".join(segments)
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    """
+    Get the given percentile of some sorted values using the nearest-rank method.
+
+    :param sorted_values: Values to get percentile of, in ascending order.
+    :param pct: Percentile to get, between 0 and 100.
+    :return: Value at the given percentile.
+    """
+    rank = max(math.ceil(pct / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+class ProfileService:
+    """
+    A service for timing the phases of an execution.
+
+    Spans are only recorded when profiling is enabled, otherwise timing a section does nothing.
+    Spans can be recorded from any thread.
+    """
+
+    def __init__(self, enabled: bool = False) -> None:
+        """
+        Initialize the service.
+
+        :param enabled: Whether to record spans.
+        """
+        self.enabled = enabled
+        self._lock = Lock()
+        self._origin = perf_counter()
+        self._spans: List[Span] = []
+
+    @contextmanager
+    def span(self, name: str, category: str = PHASE) -> Iterator[None]:
+        """
+        Time the code run within this context.
+
+        :param name: Name of the phase or endpoint being timed.
+        :param category: Whether a phase of execution or a call to an endpoint is being timed.
+        """
+        if not self.enabled:
+            yield
+            return
+
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, category, start, perf_counter() - start)
+
+    def iterate(self, name: str, iterable: Iterable[T]) -> Iterator[T]:
+        """
+        Time getting each item from the given iterable.
+
+        This is used to time lazy iterables, like paginated API results, where the work happens
+        as items are requested.
+
+        :param name: Name of the phase being timed.
+        :param iterable: Iterable to time.
+        :return: Iterator over the items of the iterable.
+        """
+        if not self.enabled:
+            yield from iterable
+            return
+
+        iterator = iter(iterable)
+        while True:
+            start = perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.record(name, PHASE, start, perf_counter() - start)
+                return
+            self.record(name, PHASE, start, perf_counter() - start)
+            yield item
+
+    def record(self, name: str, category: str, start: float, duration_secs: float) -> None:
+        """
+        Record a span.
+
+        :param name: Name of the phase or endpoint that was timed.
+        :param category: Whether a phase of execution or a call to an endpoint was timed.
+        :param start: Value of `perf_counter` when the span started.
+        :param duration_secs: Seconds the span took.
+        """
+        span = Span(
+            name=name,
+            category=category,
+            start_secs=start - self._origin,
+            duration_secs=duration_secs,
+            thread_id=threading.get_ident(),
+        )
+        with self._lock:
+            self._spans.append(span)
+
+    @property
+    def spans(self) -> List[Span]:
+        """Spans recorded so far, in the order they finished."""
+        with self._lock:
+            return list(self._spans)
+
+    def summarize(self) -> List[SpanSummary]:
+        """
+        Summarize the recorded spans by name.
+
+        :return: Summary of each phase and endpoint, with the longest total time first.
+        """
+        durations: Dict[Tuple[str, str], List[float]] = {}
+        for span in self.spans:
+            durations.setdefault((span.category, span.name), []).append(span.duration_secs)
+
+        summaries = []
+        for (category, name), values in durations.items():
+            values.sort()
+            summaries.append(
+                SpanSummary(
+                    name=name,
+                    category=category,
+                    span_count=len(values),
+                    total_secs=sum(values),
+                    p50_secs=_percentile(values, 50),
+                    p95_secs=_percentile(values, 95),
+                )
+            )
+        return sorted(summaries, key=lambda summary: (summary.category, -summary.total_secs))
+
+    def write(self, destination: Path, profile_format: ProfileFormat) -> None:
+        """
+        Write the recorded spans to the given file.
+
+        :param destination: File to write to.
+        :param profile_format: Format to write spans in.
+        """
+        contents: Any
+        if profile_format == ProfileFormat.CHROME_TRACE:
+            contents = self._chrome_trace()
+        else:
+            contents = {"spans": [span._asdict() for span in self.spans]}
+
+        with open(destination, "w") as output:
+            json.dump(contents, output, indent=1)
+
+    def _chrome_trace(self, pid: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Convert the recorded spans to Chrome trace events.
+
+        :param pid: Process ID to attribute the events to.
+        :return: Document in Chrome trace event format.
+        """
+        pid = pid if pid is not None else os.getpid()
+        return {
+            "displayTimeUnit": "ms",
+            "traceEvents": [
+                {
+                    "name": span.name,
+                    "cat": span.category,
+                    "ph": "X",
+                    "ts": span.start_secs * 1_000_000,
+                    "dur": span.duration_secs * 1_000_000,
+                    "pid": pid,
+                    "tid": span.thread_id,
+                }
+                for span in self.spans
+            ],
+        }
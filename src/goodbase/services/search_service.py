@@ -1,15 +1,22 @@
 """A service to search for revisions."""
+from collections import deque
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor as Executor
+from threading import Event
 from time import perf_counter
-from typing import Iterable, List, Optional
+from typing import Deque, Iterable, List, Optional, Set, Tuple
 
 import click
 import inject
 import structlog
 from evergreen import EvergreenApi, Version
 
-from goodbase.build_checker import BuildChecks
+from goodbase.build_checker import BuildChecks, CriteriaMatcher
 from goodbase.goodbase_options import GoodBaseOptions, OutputFormat
 from goodbase.services.evg_service import EvergreenService
+from goodbase.services.profile_service import ProfileService
+from goodbase.services.verdict_ledger_service import VerdictLedgerService
+from goodbase.services.version_index_service import VersionIndexService
 
 LOGGER = structlog.get_logger(__name__)
 
@@ -19,61 +26,312 @@ class SearchService:
 
     @inject.autoparams()
     def __init__(
-        self, evg_api: EvergreenApi, evg_service: EvergreenService, options: GoodBaseOptions
+        self,
+        evg_api: EvergreenApi,
+        evg_service: EvergreenService,
+        version_index_service: VersionIndexService,
+        verdict_ledger_service: VerdictLedgerService,
+        profile_service: ProfileService,
+        options: GoodBaseOptions,
     ) -> None:
         """
         Initialize the service.
 
         :param evg_api: Client to query evergreen API.
         :param evg_service: Service to work with evergreen.
+        :param version_index_service: Service to keep a local index of project versions.
+        :param verdict_ledger_service: Service to remember which versions met criteria.
+        :param profile_service: Service for timing phases of execution.
         :param options: Good Base options for execution.
         """
         self.evg_api = evg_api
         self.evg_service = evg_service
+        self.version_index_service = version_index_service
+        self.verdict_ledger_service = verdict_ledger_service
+        self.profile_service = profile_service
         self.options = options
 
-    def find_revision(self, evg_project: str, build_checks: List[BuildChecks]) -> Optional[str]:
+    def find_revision(
+        self,
+        evg_project: str,
+        build_checks: List[BuildChecks],
+        reachable_revisions: Optional[Set[str]] = None,
+    ) -> Optional[str]:
         """
         Iterate through revisions until one is found that matches the given criteria.
 
         :param evg_project: Evergreen project to check.
         :param build_checks: Criteria to enforce.
+        :param reachable_revisions: Only consider versions of these revisions, if given.
         :return: First git revision to match the given criteria if it exists.
         """
-        versions = self.evg_api.versions_by_project(evg_project)
+        revisions = self.find_revisions(evg_project, build_checks, reachable_revisions)
+        return revisions[0] if revisions else None
+
+    def find_revisions(
+        self,
+        evg_project: str,
+        build_checks: List[BuildChecks],
+        reachable_revisions: Optional[Set[str]] = None,
+        max_revisions: int = 1,
+    ) -> List[str]:
+        """
+        Iterate through revisions until enough are found that match the given criteria.
+
+        :param evg_project: Evergreen project to check.
+        :param build_checks: Criteria to enforce.
+        :param reachable_revisions: Only consider versions of these revisions, if given.
+        :param max_revisions: Number of matching revisions to find before stopping.
+        :return: Newest git revisions to match the given criteria, newest first.
+        """
+        # Compile the criteria once, so every version in the search shares the same matcher.
+        build_checks = CriteriaMatcher.of(build_checks)
+        try:
+            if not self.options.use_version_index:
+                return self._search_versions(
+                    evg_project,
+                    self.evg_api.versions_by_project(evg_project),
+                    build_checks,
+                    reachable_revisions,
+                    max_revisions,
+                )
+
+            try:
+                return self._search_versions(
+                    evg_project,
+                    self.version_index_service.versions(evg_project),
+                    build_checks,
+                    reachable_revisions,
+                    max_revisions,
+                )
+            finally:
+                self.version_index_service.save(evg_project)
+        finally:
+            self.verdict_ledger_service.save()
+
+    def _search_versions(
+        self,
+        evg_project: str,
+        versions: Iterable[Version],
+        build_checks: List[BuildChecks],
+        reachable_revisions: Optional[Set[str]] = None,
+        max_revisions: int = 1,
+    ) -> List[str]:
+        """
+        Search the given versions for ones that match the given criteria.
 
+        :param evg_project: Evergreen project being checked.
+        :param versions: Evergreen versions to iterate over.
+        :param build_checks: Criteria to enforce.
+        :param reachable_revisions: Only consider versions of these revisions, if given.
+        :param max_revisions: Number of matching revisions to find before stopping.
+        :return: Newest git revisions to match the given criteria, newest first.
+        """
+        versions = self.profile_service.iterate("version_paging", versions)
         if self.options.output_format in {OutputFormat.YAML, OutputFormat.JSON}:
-            stable_revision = self._find_stable_revision(versions, build_checks)
+            stable_revisions = self._find_stable_revisions(
+                versions, build_checks, reachable_revisions, max_revisions
+            )
         else:  # plaintext: show progress bar
             with click.progressbar(
                 versions,
                 length=self.options.max_lookback,
                 label=f"Searching {evg_project} revisions",
             ) as bar:
-                stable_revision = self._find_stable_revision(bar, build_checks)
+                stable_revisions = self._find_stable_revisions(
+                    bar, build_checks, reachable_revisions, max_revisions
+                )
 
-        return stable_revision
+        return stable_revisions
 
-    def _find_stable_revision(
-        self, evg_versions: Iterable[Version], build_checks: List[BuildChecks]
-    ) -> Optional[str]:
+    def _find_stable_revisions(
+        self,
+        evg_versions: Iterable[Version],
+        build_checks: List[BuildChecks],
+        reachable_revisions: Optional[Set[str]] = None,
+        max_revisions: int = 1,
+    ) -> List[str]:
         """
-        Find the latest revision that matches the specified criteria.
+        Find the latest revisions that match the specified criteria.
+
+        Versions that are not reachable still count towards the lookback limit, but are never
+        checked.
 
         :param evg_versions: Evergreen versions to iterate over.
         :param build_checks: Criteria to enforce.
-        :return: First git revision to match the given criteria if it exists.
+        :param reachable_revisions: Only consider versions of these revisions, if given.
+        :param max_revisions: Number of matching revisions to find before stopping.
+        :return: Newest git revisions to match the given criteria, newest first.
         """
+        if self.options.search_window > 1:
+            return self._find_stable_revisions_windowed(
+                evg_versions, build_checks, reachable_revisions, max_revisions
+            )
+
+        stable_revisions: List[str] = []
         start_time = perf_counter()
         for idx, evg_version in enumerate(evg_versions):
             current_time = perf_counter()
             elapsed_time = current_time - start_time
             if self.options.lookback_limit_hit(idx, evg_version.revision, elapsed_time):
-                return None
+                return stable_revisions
+
+            if self._unreachable(evg_version, reachable_revisions):
+                continue
 
             LOGGER.debug("Checking version", commit=evg_version.revision)
 
-            if self.evg_service.check_version(evg_version, build_checks):
-                return evg_version.revision
+            if self._check_version(evg_version, build_checks):
+                stable_revisions.append(evg_version.revision)
+                if len(stable_revisions) >= max_revisions:
+                    return stable_revisions
+
+        return stable_revisions
+
+    def _find_stable_revisions_windowed(
+        self,
+        evg_versions: Iterable[Version],
+        build_checks: List[BuildChecks],
+        reachable_revisions: Optional[Set[str]] = None,
+        max_revisions: int = 1,
+    ) -> List[str]:
+        """
+        Find the latest revisions that match the criteria, checking several versions at once.
+
+        Up to `search_window` versions are checked concurrently. Results are still consumed in
+        order, so a version is only returned once every newer version has been ruled out. Once
+        the search is done, checks of older versions that have not started are cancelled and
+        checks already running are told to stop, but the search returns without waiting for them.
+        A stopped check cancels the builds it has not started fetching, while builds that are
+        already being fetched finish in the background. Versions that have already been rejected
+        under the same criteria never take a slot in the window, and versions whose builds are all
+        cached are evaluated together as they enter the window.
+
+        :param evg_versions: Evergreen versions to iterate over.
+        :param build_checks: Criteria to enforce.
+        :param reachable_revisions: Only consider versions of these revisions, if given.
+        :param max_revisions: Number of matching revisions to find before stopping.
+        :return: Newest git revisions to match the given criteria, newest first.
+        """
+        stable_revisions: List[str] = []
+        start_time = perf_counter()
+        fingerprint = CriteriaMatcher.of(build_checks).fingerprint()
+        version_iter = enumerate(evg_versions)
+        in_flight: Deque[Tuple[Version, Future]] = deque()
+        versions_exhausted = False
+        stop = Event()
+
+        exe = Executor(max_workers=self.options.search_window)
+        try:
+            while True:
+                to_check: List[Version] = []
+                while (
+                    not versions_exhausted
+                    and len(in_flight) + len(to_check) < self.options.search_window
+                ):
+                    next_version = next(version_iter, None)
+                    if next_version is None:
+                        versions_exhausted = True
+                        break
+
+                    idx, evg_version = next_version
+                    elapsed_time = perf_counter() - start_time
+                    if self.options.lookback_limit_hit(idx, evg_version.revision, elapsed_time):
+                        versions_exhausted = True
+                        break
+
+                    if self._unreachable(evg_version, reachable_revisions):
+                        continue
+
+                    if self._known_rejection(evg_version, fingerprint):
+                        continue
+
+                    to_check.append(evg_version)
+
+                # Versions whose builds have all been seen before are checked together, without
+                # taking a worker.
+                cached = self.evg_service.evaluate_cached_versions(to_check, build_checks)
+                for evg_version in to_check:
+                    LOGGER.debug("Checking version", commit=evg_version.revision)
+                    evaluation = cached.get(evg_version.version_id)
+                    if evaluation is None:
+                        job = exe.submit(self._check_version, evg_version, build_checks, stop)
+                    else:
+                        self.verdict_ledger_service.record(
+                            fingerprint, evg_version.version_id, evaluation
+                        )
+                        job = Future()
+                        job.set_result(evaluation.passed)
+                    in_flight.append((evg_version, job))
+
+                if not in_flight:
+                    return stable_revisions
+
+                evg_version, job = in_flight.popleft()
+                if job.result():
+                    stable_revisions.append(evg_version.revision)
+                    if len(stable_revisions) >= max_revisions:
+                        return stable_revisions
+        finally:
+            stop.set()
+            for _, job in in_flight:
+                job.cancel()
+            # Running checks see the stop event, so a found revision is not held back by them.
+            exe.shutdown(wait=False)
+
+    @staticmethod
+    def _unreachable(evg_version: Version, reachable_revisions: Optional[Set[str]]) -> bool:
+        """
+        Check if the revision of the given version can not be used locally.
+
+        :param evg_version: Evergreen version to check.
+        :param reachable_revisions: Revisions that can be used, if limited.
+        :return: True if the version should be skipped.
+        """
+        if reachable_revisions is None or evg_version.revision in reachable_revisions:
+            return False
+        LOGGER.debug("Skipping version not reachable locally", commit=evg_version.revision)
+        return True
+
+    def _check_version(
+        self,
+        evg_version: Version,
+        build_checks: List[BuildChecks],
+        stop: Optional[Event] = None,
+    ) -> bool:
+        """
+        Check if the given version meets the specified criteria.
+
+        :param evg_version: Evergreen version to check.
+        :param build_checks: Criteria to enforce.
+        :param stop: Event set once the result is no longer needed.
+        :return: True if the version matches the specified criteria.
+        """
+        build_checks = CriteriaMatcher.of(build_checks)
+        fingerprint = build_checks.fingerprint()
+        verdict = self.verdict_ledger_service.get_verdict(fingerprint, evg_version.version_id)
+        if verdict is not None:
+            LOGGER.debug("Using recorded verdict", commit=evg_version.revision, verdict=verdict)
+            return verdict
+
+        if stop is not None and stop.is_set():
+            return False
+
+        with self.profile_service.span("evaluate_version"):
+            evaluation = self.evg_service.evaluate_version(evg_version, build_checks, stop)
+        self.verdict_ledger_service.record(fingerprint, evg_version.version_id, evaluation)
+        return evaluation.passed
 
-        return None
+    def _known_rejection(self, evg_version: Version, fingerprint: str) -> bool:
+        """
+        Check if the given version has already been permanently rejected under some criteria.
+
+        :param evg_version: Evergreen version to check.
+        :param fingerprint: Fingerprint of the criteria.
+        :return: True if the version is known to not match the criteria.
+        """
+        verdict = self.verdict_ledger_service.get_verdict(fingerprint, evg_version.version_id)
+        if verdict is False:
+            LOGGER.debug("Skipping version rejected under criteria", commit=evg_version.revision)
+            return True
+        return False
@@ -0,0 +1,162 @@
+"""A service for counting the load an execution puts on Evergreen."""
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from threading import Lock
+from typing import Any, Dict, List
+
+# Upper bounds, in milliseconds, of the buckets request latencies are counted in.
+LATENCY_BUCKETS_MS = [10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+
+def _empty_histogram() -> List[int]:
+    """Create a histogram with no latencies counted."""
+    return [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+
+def latency_histogram_labels() -> List[str]:
+    """Get a label for each bucket of a latency histogram."""
+    return [f"<={bound}ms" for bound in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}ms"]
+
+
+@dataclass
+class EndpointStats:
+    """
+    Requests made to a single endpoint.
+
+    requests: Number of HTTP requests made, including retries.
+    errors: Number of requests that got an error response.
+    retries: Number of requests that were retries of a failed request.
+    bytes_received: Number of bytes received over the wire.
+    latency_histogram: Number of requests that completed within each latency bucket.
+    """
+
+    requests: int = 0
+    errors: int = 0
+    retries: int = 0
+    bytes_received: int = 0
+    latency_histogram: List[int] = field(default_factory=_empty_histogram)
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Get a dictionary representation of the stats."""
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "retries": self.retries,
+            "bytes_received": self.bytes_received,
+            "latency_histogram": dict(zip(latency_histogram_labels(), self.latency_histogram)),
+        }
+
+
+@dataclass
+class CacheStats:
+    """
+    Lookups in a single namespace of the local cache.
+
+    hits: Number of lookups that found an entry.
+    misses: Number of lookups that did not find an entry.
+    """
+
+    hits: int = 0
+    misses: int = 0
+
+
+class StatsService:
+    """
+    A service for counting the load an execution puts on Evergreen.
+
+    Counts every HTTP request made to Evergreen by endpoint, along with the bytes received,
+    retries and latency of the requests, and how often the local cache saved a request. Nothing is
+    counted unless stats are enabled.
+    """
+
+    def __init__(self, enabled: bool = False) -> None:
+        """
+        Initialize the service.
+
+        :param enabled: Whether to count requests and cache lookups.
+        """
+        self.enabled = enabled
+        self._lock = Lock()
+        self._endpoints: Dict[str, EndpointStats] = {}
+        self._cache: Dict[str, CacheStats] = {}
+
+    def record_response(
+        self, endpoint: str, status_code: int, bytes_received: int, latency_secs: float
+    ) -> None:
+        """
+        Record a response received from Evergreen.
+
+        :param endpoint: Name of endpoint the request was made to.
+        :param status_code: HTTP status code of the response.
+        :param bytes_received: Number of bytes received over the wire.
+        :param latency_secs: Seconds the request took.
+        """
+        if not self.enabled:
+            return
+
+        bucket = bisect_left(LATENCY_BUCKETS_MS, latency_secs * 1000)
+        with self._lock:
+            stats = self._endpoints.setdefault(endpoint, EndpointStats())
+            stats.requests += 1
+            stats.bytes_received += bytes_received
+            stats.latency_histogram[bucket] += 1
+            if status_code >= 400:
+                stats.errors += 1
+
+    def record_retries(self, endpoint: str, retries: int) -> None:
+        """
+        Record that requests to an endpoint were retried.
+
+        :param endpoint: Name of endpoint the requests were made to.
+        :param retries: Number of retries.
+        """
+        if not self.enabled:
+            return
+
+        with self._lock:
+            self._endpoints.setdefault(endpoint, EndpointStats()).retries += retries
+
+    def record_cache_lookup(self, namespace: str, hit: bool) -> None:
+        """
+        Record a lookup in the local cache.
+
+        :param namespace: Namespace that was looked up.
+        :param hit: Whether an entry was found.
+        """
+        if not self.enabled:
+            return
+
+        with self._lock:
+            stats = self._cache.setdefault(namespace, CacheStats())
+            if hit:
+                stats.hits += 1
+            else:
+                stats.misses += 1
+
+    def as_dict(self) -> Dict[str, Any]:
+        """
+        Get the stats counted so far.
+
+        :return: Dictionary of totals, stats for each endpoint and stats for each cache namespace.
+        """
+        with self._lock:
+            endpoints = {name: stats.as_dict() for name, stats in sorted(self._endpoints.items())}
+            cache = {
+                namespace: {"hits": stats.hits, "misses": stats.misses}
+                for namespace, stats in sorted(self._cache.items())
+            }
+
+        latency_histogram = dict.fromkeys(latency_histogram_labels(), 0)
+        for stats in endpoints.values():
+            for label, count in stats["latency_histogram"].items():
+                latency_histogram[label] += count
+
+        return {
+            "requests": sum(stats["requests"] for stats in endpoints.values()),
+            "errors": sum(stats["errors"] for stats in endpoints.values()),
+            "retries": sum(stats["retries"] for stats in endpoints.values()),
+            "bytes_received": sum(stats["bytes_received"] for stats in endpoints.values()),
+            "latency_histogram": latency_histogram,
+            "endpoints": endpoints,
+            "cache": cache,
+        }
@@ -0,0 +1,98 @@
+"""A service for remembering which versions met a set of criteria."""
+from threading import Lock
+from typing import Dict, Optional
+
+import inject
+import structlog
+
+from goodbase.models.version_evaluation import VersionEvaluation
+from goodbase.services.cache_service import CacheService
+
+LOGGER = structlog.get_logger(__name__)
+
+VERDICT_CACHE = "verdicts"
+MAX_VERDICTS = 10000
+
+
+class VerdictLedgerService:
+    """
+    A service for remembering which versions met a set of criteria.
+
+    Verdicts are stored per criteria fingerprint, so the same verdicts are used by anyone
+    searching with equivalent criteria, no matter which project or saved criteria name they came
+    from. Only verdicts that can no longer change are recorded.
+    """
+
+    @inject.autoparams()
+    def __init__(self, cache_service: CacheService) -> None:
+        """
+        Initialize the service.
+
+        :param cache_service: Service for caching data between executions.
+        """
+        self.cache_service = cache_service
+        self._lock = Lock()
+        self._ledgers: Dict[str, Dict[str, bool]] = {}
+        self._new_verdicts: Dict[str, Dict[str, bool]] = {}
+
+    def get_verdict(self, fingerprint: str, version_id: str) -> Optional[bool]:
+        """
+        Get the permanent verdict for the given version under some criteria.
+
+        :param fingerprint: Fingerprint of the criteria.
+        :param version_id: ID of version to query.
+        :return: True if the version met the criteria, False if it did not, None if unknown.
+        """
+        with self._lock:
+            return self._ledger(fingerprint).get(version_id)
+
+    def record(self, fingerprint: str, version_id: str, evaluation: VersionEvaluation) -> None:
+        """
+        Record the verdict for the given version if it can no longer change.
+
+        :param fingerprint: Fingerprint of the criteria the version was evaluated against.
+        :param version_id: ID of version that was evaluated.
+        :param evaluation: Result of the evaluation.
+        """
+        if not evaluation.final:
+            return
+        with self._lock:
+            self._ledger(fingerprint)[version_id] = evaluation.passed
+            self._new_verdicts.setdefault(fingerprint, {})[version_id] = evaluation.passed
+
+    def save(self) -> None:
+        """Save any verdicts recorded since the ledgers were loaded."""
+        with self._lock:
+            new_verdicts = self._new_verdicts
+            self._new_verdicts = {}
+
+        for fingerprint, verdicts in new_verdicts.items():
+            # Reload before writing, so verdicts saved by other executions are not lost.
+            ledger = self._load(fingerprint)
+            ledger.update(verdicts)
+            trimmed = dict(list(ledger.items())[-MAX_VERDICTS:])
+            self.cache_service.put(VERDICT_CACHE, fingerprint, trimmed)
+            LOGGER.debug("Saved verdicts", fingerprint=fingerprint, new_verdicts=len(verdicts))
+
+    def _ledger(self, fingerprint: str) -> Dict[str, bool]:
+        """
+        Get the verdicts for the given fingerprint, loading them if needed.
+
+        Must be called with the lock held.
+
+        :param fingerprint: Fingerprint of the criteria.
+        :return: Map of version IDs to verdicts.
+        """
+        if fingerprint not in self._ledgers:
+            self._ledgers[fingerprint] = self._load(fingerprint)
+        return self._ledgers[fingerprint]
+
+    def _load(self, fingerprint: str) -> Dict[str, bool]:
+        """
+        Load the saved verdicts for the given fingerprint.
+
+        :param fingerprint: Fingerprint of the criteria.
+        :return: Map of version IDs to verdicts.
+        """
+        saved_verdicts = self.cache_service.get(VERDICT_CACHE, fingerprint)
+        return {k: bool(v) for k, v in (saved_verdicts or {}).items()}
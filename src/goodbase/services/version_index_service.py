@@ -0,0 +1,254 @@
+"""A service for keeping a local index of the versions in an evergreen project."""
+from threading import Lock, local
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import inject
+import structlog
+from evergreen import EvergreenApi, Version
+from pydantic import BaseModel
+
+from goodbase.services.cache_service import CacheService
+
+LOGGER = structlog.get_logger(__name__)
+
+VERSION_INDEX_CACHE = "version_index"
+MAX_INDEXED_VERSIONS = 1000
+
+
+class VersionIndex(BaseModel):
+    """
+    Local index of the versions in an evergreen project.
+
+    versions: Summaries of indexed versions, newest first.
+    gaps: IDs of indexed versions that are not known to directly follow the newer version before
+        them in the index, because versions between them have not been indexed.
+    """
+
+    versions: List[Dict[str, Any]] = []
+    gaps: List[str] = []
+
+    def contiguous_from(self, position: int) -> Iterator[int]:
+        """
+        Iterate over the positions of the indexed versions with no gap between them.
+
+        :param position: Position of the first version to include.
+        :return: Iterator over positions, up to the next gap or the end of the index.
+        """
+        gaps = set(self.gaps)
+        yield position
+        for next_position in range(position + 1, len(self.versions)):
+            if self.versions[next_position]["version_id"] in gaps:
+                return
+            yield next_position
+
+
+class VersionIndexScan:
+    """Tracks the versions seen while scanning a project so they can be added to its index."""
+
+    def __init__(self, index: VersionIndex) -> None:
+        """
+        Initialize the scan.
+
+        :param index: Index of the project being scanned.
+        """
+        self.index = index
+        self.scanned_versions: List[Dict[str, Any]] = []
+        self.new_versions: List[Dict[str, Any]] = []
+        self.reached_index = False
+
+    def add(self, version_summary: Dict[str, Any], from_index: bool = False) -> None:
+        """
+        Record the next version of the scan.
+
+        :param version_summary: Summary of the version.
+        :param from_index: Whether the version came from the index rather than Evergreen.
+        """
+        self.scanned_versions.append(version_summary)
+        if from_index:
+            self.reached_index = True
+        else:
+            self.new_versions.append(version_summary)
+
+    def merge_into(self, saved_index: VersionIndex) -> VersionIndex:
+        """
+        Merge the versions seen by this scan into the given index.
+
+        Versions are ordered by their order in the project. Two neighbouring versions are only
+        treated as contiguous if the scan, the index the scan started from or the given index
+        saw them next to each other. A gap is recorded anywhere else, such as where a scan
+        stopped before reaching the older part of the index.
+
+        :param saved_index: Latest saved index of the project.
+        :return: Index to save.
+        """
+        if not self.scanned_versions:
+            return saved_index
+
+        links = set()
+        for versions, gaps in [
+            (saved_index.versions, set(saved_index.gaps)),
+            (self.index.versions, set(self.index.gaps)),
+            (self.scanned_versions, set()),
+        ]:
+            for newer, older in zip(versions, versions[1:]):
+                if older["version_id"] not in gaps:
+                    links.add((newer["version_id"], older["version_id"]))
+
+        versions_by_id = {v["version_id"]: v for v in saved_index.versions + self.scanned_versions}
+        versions = sorted(versions_by_id.values(), key=lambda v: v["order"], reverse=True)
+        versions = versions[:MAX_INDEXED_VERSIONS]
+        return VersionIndex(
+            versions=versions,
+            gaps=[
+                older["version_id"]
+                for newer, older in zip(versions, versions[1:])
+                if (newer["version_id"], older["version_id"]) not in links
+            ],
+        )
+
+
+class VersionIndexService:
+    """
+    A service for keeping a local index of the versions in an evergreen project.
+
+    Scans start from the newest versions in Evergreen, but only until they reach versions that
+    are already in the index. Indexed versions are then used until the next gap in the index,
+    where Evergreen is paged again from the last indexed version.
+    """
+
+    @inject.autoparams()
+    def __init__(self, evg_api: EvergreenApi, cache_service: CacheService) -> None:
+        """
+        Initialize the service.
+
+        :param evg_api: Evergreen API client.
+        :param cache_service: Service for caching data between executions.
+        """
+        self.evg_api = evg_api
+        self.cache_service = cache_service
+        self._save_lock = Lock()
+        # Each thread tracks its own scans, so searches of the same project can run at once.
+        self._local = local()
+
+    @property
+    def _scans(self) -> Dict[str, VersionIndexScan]:
+        """Scans started by the current thread, by project."""
+        if not hasattr(self._local, "scans"):
+            self._local.scans = {}
+        return self._local.scans
+
+    def versions(self, project_id: str) -> Iterator[Version]:
+        """
+        Iterate over the versions of the given project, newest first.
+
+        :param project_id: ID of evergreen project to query.
+        :return: Iterator over the versions of the project.
+        """
+        scan = VersionIndexScan(self._load(project_id))
+        self._scans[project_id] = scan
+        index_positions = {v["version_id"]: i for i, v in enumerate(scan.index.versions)}
+
+        start = None
+        # Position of the oldest indexed version used so far, so the scan only moves forward.
+        last_position = -1
+        while True:
+            resume_at = None
+            for evg_version in self._versions_from(project_id, start):
+                position = index_positions.get(evg_version.version_id)
+                if position is None:
+                    scan.add(self._summarize(evg_version))
+                    yield evg_version
+                elif position > last_position:
+                    resume_at = position
+                    break
+
+            if resume_at is None:
+                return
+
+            LOGGER.debug(
+                "Continuing from version index",
+                project=project_id,
+                new_versions=len(scan.new_versions),
+                index_position=resume_at,
+            )
+            for position in scan.index.contiguous_from(resume_at):
+                version_summary = scan.index.versions[position]
+                scan.add(version_summary, from_index=True)
+                yield Version(version_summary, self.evg_api)
+                last_position = position
+            start = scan.scanned_versions[-1]["order"]
+
+    def _versions_from(self, project_id: str, start: Optional[int]) -> Iterable[Version]:
+        """
+        Page through the versions of the given project in Evergreen.
+
+        :param project_id: ID of evergreen project to query.
+        :param start: Order of the version to start after, or None to start from the newest.
+        :return: Iterable over the versions of the project.
+        """
+        if start is None:
+            return self.evg_api.versions_by_project(project_id)
+        return self.evg_api.versions_by_project(project_id, start=start)
+
+    def refresh(self, project_id: str) -> int:
+        """
+        Add any versions newer than the saved index of the given project to it.
+
+        :param project_id: ID of evergreen project to refresh index of.
+        :return: Number of new versions added to the index.
+        """
+        for n_versions, _ in enumerate(self.versions(project_id)):
+            scan = self._scans[project_id]
+            if scan.reached_index or n_versions >= MAX_INDEXED_VERSIONS:
+                break
+        self.save(project_id)
+        return len(self._scans[project_id].new_versions)
+
+    def save(self, project_id: str) -> None:
+        """
+        Save the index of the given project, including any versions seen since it was loaded.
+
+        :param project_id: ID of evergreen project to save index of.
+        """
+        scan = self._scans.get(project_id)
+        if scan is None:
+            return
+        with self._save_lock:
+            # Reload before writing, so versions saved by other scans are not lost.
+            index = scan.merge_into(self._load(project_id))
+            self.cache_service.put(VERSION_INDEX_CACHE, project_id, index.dict())
+
+    def _load(self, project_id: str) -> VersionIndex:
+        """
+        Load the saved index of the given project.
+
+        :param project_id: ID of evergreen project to load index of.
+        :return: Saved index or an empty index if none exists.
+        """
+        saved_index = self.cache_service.get(VERSION_INDEX_CACHE, project_id)
+        if saved_index is None:
+            return VersionIndex()
+        return VersionIndex(**saved_index)
+
+    @staticmethod
+    def _summarize(evg_version: Version) -> Dict[str, Any]:
+        """
+        Summarize the parts of the given version that can not change.
+
+        Fields that change as builds are activated are left out, so stale data from the index is
+        never used to rule a version out.
+
+        :param evg_version: Version to summarize.
+        :return: Summary of version.
+        """
+        return {
+            "version_id": evg_version.version_id,
+            "revision": evg_version.revision,
+            "create_time": evg_version.json.get("create_time"),
+            "order": evg_version.order,
+            "project": evg_version.project,
+            "build_variants_status": [
+                {"build_variant": bvs.build_variant, "build_id": bvs.build_id}
+                for bvs in evg_version.build_variants_status
+            ],
+        }
@@ -0,0 +1,285 @@
+"""Tests for the fake Evergreen server."""
+import tempfile
+from pathlib import Path
+
+import pytest
+import requests
+from evergreen import EvergreenApi, RetryingEvergreenApi
+from tenacity import wait_none
+
+from fake_evergreen import (
+    FIXTURES_DIR,
+    EndpointBehavior,
+    FakeEvergreenData,
+    FakeEvergreenServer,
+    create_search_service,
+)
+from fake_evergreen import server as endpoints
+from fake_evergreen.data import SUCCESS, UNDISPATCHED
+from fake_evergreen.server import BUILD, BUILD_TASKS, MANIFEST, VERSIONS
+from goodbase.build_checker import BuildChecks
+from goodbase.goodbase_options import GoodBaseOptions
+from goodbase.services.evg_service import BuildDataSource
+from goodbase.services.git_service import GitAction
+
+PROJECT = "fake-project"
+REQUIRED_CHECKS = [BuildChecks(build_variant_regex=[".*-required$"], success_threshold=1.0)]
+RUN_CHECKS = [BuildChecks(build_variant_regex=[".*"], run_threshold=0.95)]
+
+
+def all_tasks_successful(tasks):
+    return all(task["status"] == SUCCESS for task in tasks)
+
+
+def enough_tasks_run(tasks):
+    return sum(task["status"] != UNDISPATCHED for task in tasks) / len(tasks) >= 0.95
+
+
+def expected_revision(data, project_id, build_passes=all_tasks_successful, suffix="-required"):
+    for version in data.versions[project_id]:
+        builds = [
+            bvs["build_id"]
+            for bvs in version["build_variants_status"]
+            if bvs["build_variant"].endswith(suffix)
+        ]
+        if all(build_passes(data.tasks[build_id]) for build_id in builds):
+            return version["revision"]
+    return None
+
+
+@pytest.fixture(scope="module")
+def data():
+    return FakeEvergreenData.synthetic(project_id=PROJECT, n_versions=40, n_tasks=20, seed=1)
+
+
+@pytest.fixture()
+def server(data):
+    with FakeEvergreenServer(data, page_size=7) as fake_server:
+        yield fake_server
+
+
+@pytest.fixture()
+def cache_dir():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        yield Path(tmp_dir)
+
+
+@pytest.fixture()
+def search_service_factory(cache_dir):
+    search_services = []
+
+    def create(api_server, **kwargs):
+        search_service = create_search_service(api_server, cache_dir, options(**kwargs))
+        search_services.append(search_service)
+        return search_service
+
+    yield create
+    # Let builds still being analyzed finish writing to the cache before it is removed.
+    for search_service in search_services:
+        search_service.evg_service.executor_service.shutdown()
+
+
+def options(**kwargs):
+    return GoodBaseOptions(
+        max_lookback=50,
+        commit_limit=None,
+        operation=GitAction.NONE,
+        override_criteria=False,
+        **kwargs,
+    )
+
+
+class TestFakeEvergreenServer:
+    def test_versions_should_be_paginated_in_order(self, data, server):
+        evg_api = EvergreenApi(api_server=server.url)
+
+        versions = list(evg_api.versions_by_project(PROJECT))
+
+        assert [v.version_id for v in versions] == [v["version_id"] for v in data.versions[PROJECT]]
+        assert server.request_counts[VERSIONS] == 40 // 7 + 1
+
+    def test_builds_and_tasks_should_be_served(self, data, server):
+        evg_api = EvergreenApi(api_server=server.url)
+        build_id = data.versions[PROJECT][0]["build_variants_status"][0]["build_id"]
+
+        build = evg_api.build_by_id(build_id)
+        tasks = build.get_tasks()
+
+        assert build.id == build_id
+        assert len(tasks) == 20
+        assert build.status_counts.succeeded == sum(1 for task in tasks if task.is_success())
+
+    def test_missing_manifest_should_return_404(self, server):
+        response = requests.get(f"{server.url}/plugin/manifest/get/{PROJECT}/not-a-revision")
+
+        assert response.status_code == 404
+        assert server.request_counts[MANIFEST] == 1
+
+    def test_latency_should_be_injected_per_endpoint(self, data):
+        build_id = data.versions[PROJECT][0]["build_variants_status"][0]["build_id"]
+        behaviors = {BUILD: EndpointBehavior(latency_secs=0.2)}
+
+        with FakeEvergreenServer(data, behaviors=behaviors) as fake_server:
+            slow = requests.get(f"{fake_server.url}/rest/v2/builds/{build_id}")
+            fast = requests.get(f"{fake_server.url}/rest/v2/projects/{PROJECT}")
+
+        assert slow.elapsed.total_seconds() >= 0.2
+        assert fast.elapsed.total_seconds() < 0.2
+
+    def test_errors_should_be_injected_at_the_configured_rate(self, data):
+        build_id = data.versions[PROJECT][0]["build_variants_status"][0]["build_id"]
+        behaviors = {BUILD: EndpointBehavior(error_rate=0.5, error_status=502)}
+
+        with FakeEvergreenServer(data, behaviors=behaviors, seed=3) as fake_server:
+            with requests.Session() as session:
+                statuses = [
+                    session.get(f"{fake_server.url}/rest/v2/builds/{build_id}").status_code
+                    for _ in range(100)
+                ]
+
+        assert set(statuses) == {200, 502}
+        assert 30 < statuses.count(502) < 70
+
+    def test_connections_should_be_kept_alive(self, data, server):
+        with requests.Session() as session:
+            for _ in range(10):
+                session.get(f"{server.url}/rest/v2/projects/{PROJECT}")
+
+        assert server.connections_opened == 1
+
+
+class TestFakeEvergreenData:
+    def test_synthetic_data_should_be_reproducible(self):
+        first = FakeEvergreenData.synthetic(n_versions=10, seed=5)
+        second = FakeEvergreenData.synthetic(n_versions=10, seed=5)
+
+        assert first == second
+
+    def test_saved_data_should_load_unchanged(self, data, cache_dir):
+        data_file = cache_dir / "data.json"
+
+        data.save(data_file)
+
+        assert FakeEvergreenData.load(data_file) == data
+
+    def test_fixture_should_load_as_the_synthetic_data_it_was_generated_from(self):
+        data = FakeEvergreenData.load(FIXTURES_DIR / "synthetic_small_project.json")
+
+        assert data == FakeEvergreenData.synthetic(
+            project_id=PROJECT,
+            n_versions=5,
+            n_variants=2,
+            n_tasks=3,
+            good_version_rate=0.5,
+            n_running_versions=1,
+            modules=["enterprise"],
+            seed=7,
+        )
+
+    def test_recording_should_store_the_served_documents(self, data, server):
+        evg_api = EvergreenApi(api_server=server.url)
+
+        recorded = FakeEvergreenData.record(evg_api, PROJECT, 3)
+
+        assert recorded.versions[PROJECT] == data.versions[PROJECT][:3]
+        for version in recorded.versions[PROJECT]:
+            for build_summary in version["build_variants_status"]:
+                assert (
+                    recorded.tasks[build_summary["build_id"]]
+                    == data.tasks[build_summary["build_id"]]
+                )
+
+    def test_recording_should_leave_out_missing_manifests(self, data):
+        data = FakeEvergreenData(
+            projects=data.projects,
+            versions=data.versions,
+            builds=data.builds,
+            tasks=data.tasks,
+            manifests={},
+        )
+        with FakeEvergreenServer(data) as fake_server:
+            evg_api = EvergreenApi(api_server=fake_server.url)
+
+            recorded = FakeEvergreenData.record(evg_api, PROJECT, 2)
+
+        assert len(recorded.versions[PROJECT]) == 2
+        assert recorded.manifests == {}
+
+
+class TestSearchAgainstFakeEvergreen:
+    @pytest.mark.parametrize("search_window", [1, 4])
+    @pytest.mark.parametrize("use_version_index", [False, True])
+    def test_search_should_find_newest_passing_revision(
+        self, data, server, search_service_factory, search_window, use_version_index
+    ):
+        search_service = search_service_factory(
+            server.url, search_window=search_window, use_version_index=use_version_index
+        )
+
+        revision = search_service.find_revision(PROJECT, REQUIRED_CHECKS)
+
+        assert revision is not None
+        assert revision == expected_revision(data, PROJECT)
+
+    def test_run_threshold_should_be_checked_from_build_counts(
+        self, data, server, search_service_factory
+    ):
+        search_service = search_service_factory(server.url)
+
+        revision = search_service.find_revision(PROJECT, RUN_CHECKS)
+
+        assert revision is not None
+        assert revision == expected_revision(data, PROJECT, enough_tasks_run, suffix="")
+        assert server.request_counts[BUILD_TASKS] == 0
+
+    def test_build_counts_should_match_task_lists(self, data, server, search_service_factory):
+        evg_service = search_service_factory(server.url).evg_service
+        build_ids = [bvs["build_id"] for bvs in data.versions[PROJECT][0]["build_variants_status"]]
+
+        counted = [evg_service.analyze_build(b, BuildDataSource.BUILD) for b in build_ids]
+        listed = [evg_service.analyze_build(b, BuildDataSource.TASKS) for b in build_ids]
+
+        assert any(build_status.task_counts.inactive for build_status in counted)
+        assert [bs.task_counts.inactive for bs in counted] == [
+            len(bs.inactive_tasks) for bs in listed
+        ]
+
+    def test_repeated_search_should_resume_from_version_index(self, data, search_service_factory):
+        with FakeEvergreenServer(data, page_size=2) as server:
+            search_service = search_service_factory(server.url)
+            search_service.find_revision(PROJECT, REQUIRED_CHECKS)
+            first_version_requests = server.request_counts[VERSIONS]
+            server.reset_counts()
+
+            revision = search_service.find_revision(PROJECT, REQUIRED_CHECKS)
+
+        assert revision == expected_revision(data, PROJECT)
+        assert server.request_counts[VERSIONS] < first_version_requests
+
+    def test_project_config_location_should_be_looked_up_once(
+        self, data, server, search_service_factory
+    ):
+        evg_service = search_service_factory(server.url).evg_service
+
+        locations = [evg_service.get_project_config_location(PROJECT) for _ in range(3)]
+
+        assert locations == [data.projects[PROJECT]["remote_path"]] * 3
+        assert server.request_counts[endpoints.PROJECT] == 1
+        assert server.request_counts[endpoints.PROJECTS] == 0
+
+    def test_manifests_should_only_be_fetched_once(
+        self, data, server, search_service_factory, monkeypatch
+    ):
+        # Evergreen requests that fail, including with a 404, are retried after a wait.
+        monkeypatch.setattr(RetryingEvergreenApi._call_api.retry, "wait", wait_none())
+        evg_service = search_service_factory(server.url).evg_service
+        revisions = [version["revision"] for version in data.versions[PROJECT][:2]]
+        revisions.append("not-a-revision")
+
+        first = [evg_service.get_modules_revisions(PROJECT, revision) for revision in revisions]
+        server.reset_counts()
+        second = [evg_service.get_modules_revisions(PROJECT, revision) for revision in revisions]
+
+        assert second == first
+        assert first[-1] == {}
+        assert server.request_counts[MANIFEST] == 0
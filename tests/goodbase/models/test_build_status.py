@@ -1,6 +1,7 @@
 """Unit tests for build_status.py."""
 
 import goodbase.models.build_status as under_test
+from goodbase.models.task_names import TaskNameTables
 
 
 class TestBuildStatus:
@@ -25,3 +26,79 @@ class TestBuildStatus:
         )
 
         assert build_status.active_pct() == 0.7
+
+    def test_percents_should_use_task_counts_when_given(self):
+        build_status = under_test.BuildStatus.from_counts(
+            build_name="build name",
+            build_variant="build_name",
+            task_counts=under_test.TaskCounts(successful=5, inactive=3, total=10),
+        )
+
+        assert build_status.success_pct() == 0.5
+        assert build_status.active_pct() == 0.7
+        assert not build_status.has_task_names()
+
+    def test_build_status_should_round_trip_through_dict(self):
+        build_status = under_test.BuildStatus(
+            build_name="build name",
+            build_variant="build_name",
+            successful_tasks={"task 0", "task 1"},
+            inactive_tasks={"task 2"},
+            all_tasks={f"task {i}" for i in range(3)},
+        )
+
+        assert under_test.BuildStatus.from_dict(build_status.as_dict()) == build_status
+
+    def test_build_status_with_counts_should_round_trip_through_dict(self):
+        build_status = under_test.BuildStatus.from_counts(
+            build_name="build name",
+            build_variant="build_name",
+            task_counts=under_test.TaskCounts(successful=5, inactive=3, total=10),
+        )
+
+        assert under_test.BuildStatus.from_dict(build_status.as_dict()) == build_status
+
+    def test_task_sets_should_be_available_by_name(self):
+        build_status = under_test.BuildStatus(
+            build_name="build name",
+            build_variant="build_name",
+            successful_tasks={"task 0", "task 1"},
+            inactive_tasks={"task 2"},
+            all_tasks={f"task {i}" for i in range(3)},
+        )
+
+        assert build_status.successful_tasks == {"task 0", "task 1"}
+        assert build_status.inactive_tasks == {"task 2"}
+        assert build_status.all_tasks == {"task 0", "task 1", "task 2"}
+
+    def test_tasks_should_only_be_checked_when_in_build(self):
+        build_status = under_test.BuildStatus(
+            build_name="build name",
+            build_variant="build_name",
+            successful_tasks={"task 0"},
+            inactive_tasks={"task 1"},
+            all_tasks={"task 0", "task 1"},
+        )
+
+        assert not build_status.unsuccessful_among(["task 0", "task not in build"])
+        assert build_status.unsuccessful_among(["task 0", "task 1"])
+        assert not build_status.inactive_among(["task 0", "task not in build"])
+        assert build_status.inactive_among(["task 1"])
+
+    def test_statuses_stored_over_different_tables_should_keep_their_tasks(self, monkeypatch):
+        monkeypatch.setattr(under_test, "TASK_NAMES", TaskNameTables(max_names=1))
+        statuses = [
+            under_test.BuildStatus(
+                build_name="build name",
+                build_variant="build_name",
+                successful_tasks={"task 0"},
+                inactive_tasks=set(),
+                all_tasks={"task 0", "task 1"},
+            )
+            for _ in range(2)
+        ]
+
+        assert statuses[0].task_names is not statuses[1].task_names
+        assert statuses[0] == statuses[1]
+        assert statuses[1].successful_tasks == {"task 0"}
+        assert statuses[1].unsuccessful_among(["task 1"])
@@ -0,0 +1,53 @@
+"""Unit tests for task_names.py."""
+import goodbase.models.task_names as under_test
+
+
+class TestTaskNameTable:
+    def test_names_should_round_trip_through_mask(self):
+        table = under_test.TaskNameTable()
+        names = {f"task {i}" for i in range(100)}
+
+        assert table.names(table.mask(names)) == names
+
+    def test_each_name_should_only_be_added_once(self):
+        table = under_test.TaskNameTable()
+
+        mask_1 = table.mask(["task 0", "task 1"])
+        mask_2 = table.mask(["task 1", "task 0", "task 0"])
+
+        assert mask_1 == mask_2
+        assert len(table) == 2
+
+    def test_lookup_mask_should_not_add_unknown_names(self):
+        table = under_test.TaskNameTable()
+        table.mask(["task 0"])
+
+        mask = table.lookup_mask(["task 0", "unknown task"])
+
+        assert table.names(mask) == {"task 0"}
+        assert len(table) == 1
+
+    def test_popcount_should_count_tasks_in_mask(self):
+        table = under_test.TaskNameTable()
+
+        assert under_test.popcount(table.mask([f"task {i}" for i in range(70)])) == 70
+
+
+class TestTaskNameTables:
+    def test_full_table_should_be_replaced(self):
+        tables = under_test.TaskNameTables(max_names=2)
+        first = tables.current()
+        first.mask(["task 0", "task 1"])
+
+        second = tables.current()
+
+        assert second is not first
+        assert len(second) == 0
+        assert first.names(first.mask(["task 0"])) == {"task 0"}
+
+    def test_table_with_room_should_be_reused(self):
+        tables = under_test.TaskNameTables(max_names=2)
+        first = tables.current()
+        first.mask(["task 0"])
+
+        assert tables.current() is first
@@ -0,0 +1,85 @@
+"""Unit tests for cache_service.py."""
+import os
+from time import time
+
+import pytest
+
+import goodbase.services.cache_service as under_test
+from goodbase.services.stats_service import StatsService
+
+
+@pytest.fixture()
+def cache_service(tmp_path):
+    return under_test.CacheService(cache_dir=tmp_path / "cache")
+
+
+class TestGetAndPut:
+    def test_missing_entry_should_return_none(self, cache_service):
+        assert cache_service.get("namespace", "key") is None
+
+    def test_stored_entry_should_be_returned(self, cache_service):
+        cache_service.put("namespace", "key", {"value": 42})
+
+        assert cache_service.get("namespace", "key") == {"value": 42}
+
+    def test_hits_and_misses_should_be_counted(self, tmp_path):
+        stats_service = StatsService(enabled=True)
+        cache_service = under_test.CacheService(
+            cache_dir=tmp_path / "cache", stats_service=stats_service
+        )
+        cache_service.put("namespace", "key", {"value": 42})
+
+        cache_service.get("namespace", "key")
+        cache_service.get("namespace", "missing key")
+
+        assert stats_service.as_dict()["cache"] == {"namespace": {"hits": 1, "misses": 1}}
+
+    def test_entries_in_different_namespaces_should_not_collide(self, cache_service):
+        cache_service.put("namespace 1", "key", {"value": 1})
+        cache_service.put("namespace 2", "key", {"value": 2})
+
+        assert cache_service.get("namespace 1", "key") == {"value": 1}
+        assert cache_service.get("namespace 2", "key") == {"value": 2}
+
+    def test_expired_entry_should_not_be_returned(self, cache_service):
+        cache_service.put("namespace", "key", {"value": 42})
+        entry_path = cache_service._entry_path("namespace", "key")
+        expired = time() - cache_service.max_age_secs - 10
+        os.utime(entry_path, (expired, expired))
+
+        assert cache_service.get("namespace", "key") is None
+        assert not entry_path.exists()
+
+    def test_entry_older_than_given_max_age_should_not_be_returned(self, cache_service):
+        cache_service.put("namespace", "key", {"value": 42})
+        entry_path = cache_service._entry_path("namespace", "key")
+        two_hours_ago = time() - 2 * 60 * 60
+        os.utime(entry_path, (two_hours_ago, two_hours_ago))
+
+        assert cache_service.get("namespace", "key") == {"value": 42}
+        assert cache_service.get("namespace", "key", max_age_secs=60 * 60) is None
+
+
+class TestEvict:
+    def test_oldest_entries_should_be_evicted_when_over_size(self, cache_service):
+        for i in range(10):
+            cache_service.put("namespace", f"key {i}", {"value": i})
+            entry_path = cache_service._entry_path("namespace", f"key {i}")
+            os.utime(entry_path, (time() - 100 + i, time() - 100 + i))
+        entry_size = cache_service._entry_path("namespace", "key 0").stat().st_size
+        cache_service.max_size_bytes = entry_size * 3
+
+        cache_service.evict()
+
+        assert [cache_service.get("namespace", f"key {i}") for i in range(7)] == [None] * 7
+        assert cache_service.get("namespace", "key 9") == {"value": 9}
+
+
+class TestPurge:
+    def test_purge_should_remove_all_entries(self, cache_service):
+        cache_service.put("namespace", "key", {"value": 42})
+
+        cache_service.purge()
+
+        assert cache_service.get("namespace", "key") is None
+        assert not cache_service.cache_dir.exists()
@@ -0,0 +1,203 @@
+"""Unit tests for daemon_service.py."""
+import stat
+import tempfile
+from pathlib import Path
+from threading import Event, Thread
+from unittest.mock import MagicMock
+
+import pytest
+from evergreen import EvergreenApi
+
+import goodbase.services.daemon_service as under_test
+from goodbase.build_checker import BuildChecks
+from goodbase.goodbase_options import GoodBaseOptions
+from goodbase.services.evg_service import EvergreenService
+from goodbase.services.git_service import GitAction
+from goodbase.services.profile_service import ProfileService
+from goodbase.services.verdict_ledger_service import VerdictLedgerService
+from goodbase.services.version_index_service import VersionIndexService
+
+BUILD_CHECKS = [BuildChecks(build_variant_regex=[".*-required$"], successful_tasks={"compile"})]
+
+
+@pytest.fixture()
+def options():
+    return GoodBaseOptions(
+        max_lookback=20, commit_limit=None, operation=GitAction.NONE, override_criteria=False
+    )
+
+
+@pytest.fixture()
+def version_index_service():
+    return MagicMock(spec_set=VersionIndexService)
+
+
+@pytest.fixture()
+def search_daemon(options, version_index_service):
+    return under_test.SearchDaemon(
+        MagicMock(spec_set=EvergreenApi),
+        MagicMock(spec_set=EvergreenService),
+        version_index_service,
+        MagicMock(spec_set=VerdictLedgerService),
+        ProfileService(),
+        options,
+    )
+
+
+@pytest.fixture()
+def search_service(monkeypatch):
+    mock_search_service = MagicMock()
+    monkeypatch.setattr(under_test, "SearchService", mock_search_service)
+    return mock_search_service
+
+
+@pytest.fixture()
+def socket_path():
+    # Unix socket paths have a short length limit, so avoid long pytest tmp paths.
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        yield Path(tmp_dir) / "daemon.sock"
+
+
+@pytest.fixture()
+def running_daemon(search_daemon, socket_path):
+    server = search_daemon.create_server(socket_path)
+    server_thread = Thread(target=server.serve_forever, daemon=True)
+    server_thread.start()
+    yield search_daemon
+    server.shutdown()
+    server.server_close()
+
+
+class TestDaemonClient:
+    def test_search_should_be_answered_by_running_daemon(
+        self, running_daemon, search_service, socket_path, options
+    ):
+        search_service.return_value.find_revision.return_value = "abc123"
+        client = under_test.DaemonClient(socket_path)
+
+        revision = client.find_revision("project", BUILD_CHECKS, options._replace(search_window=4))
+
+        assert revision == "abc123"
+        search_service.return_value.find_revision.assert_called_once_with("project", BUILD_CHECKS)
+        search_options = search_service.call_args.args[-1]
+        assert search_options.search_window == 4
+        assert search_options.max_lookback == options.max_lookback
+
+    def test_missing_daemon_should_be_unavailable(self, socket_path, options):
+        client = under_test.DaemonClient(socket_path)
+
+        with pytest.raises(under_test.DaemonUnavailableError):
+            client.find_revision("project", BUILD_CHECKS, options)
+
+    def test_failed_search_should_be_unavailable(
+        self, running_daemon, search_service, socket_path, options
+    ):
+        search_service.return_value.find_revision.side_effect = ValueError("failed")
+        client = under_test.DaemonClient(socket_path)
+
+        with pytest.raises(under_test.DaemonUnavailableError):
+            client.find_revision("project", BUILD_CHECKS, options)
+
+
+class TestRefresh:
+    def test_recent_searches_should_be_refreshed(
+        self, search_daemon, search_service, version_index_service, options
+    ):
+        request = under_test.SearchRequest.create("project", BUILD_CHECKS, options)
+        search_daemon.handle_line(request.json().encode())
+        search_service.return_value.find_revision.reset_mock()
+
+        search_daemon.refresh()
+
+        version_index_service.refresh.assert_called_once_with("project")
+        search_service.return_value.find_revision.assert_called_once_with("project", BUILD_CHECKS)
+
+    def test_recent_searches_should_be_capped(self, search_daemon, search_service, options):
+        for i in range(under_test.MAX_REFRESHED_SEARCHES + 2):
+            request = under_test.SearchRequest.create(f"project {i}", BUILD_CHECKS, options)
+            search_daemon.handle_line(request.json().encode())
+        search_service.return_value.find_revision.reset_mock()
+
+        search_daemon.refresh()
+
+        assert (
+            search_service.return_value.find_revision.call_count
+            == under_test.MAX_REFRESHED_SEARCHES
+        )
+
+    def test_idle_searches_should_not_be_refreshed(
+        self, monkeypatch, search_daemon, search_service, version_index_service, options
+    ):
+        now = 1000.0
+        monkeypatch.setattr(under_test, "monotonic", lambda: now)
+        idle_request = under_test.SearchRequest.create("idle project", BUILD_CHECKS, options)
+        search_daemon.handle_line(idle_request.json().encode())
+        now += under_test.SEARCH_IDLE_SECS / 2
+        request = under_test.SearchRequest.create("project", BUILD_CHECKS, options)
+        search_daemon.handle_line(request.json().encode())
+        search_service.return_value.find_revision.reset_mock()
+        now += under_test.SEARCH_IDLE_SECS / 2 + 1
+
+        search_daemon.refresh()
+        search_daemon.refresh()
+
+        version_index_service.refresh.assert_called_with("project")
+        assert version_index_service.refresh.call_count == 2
+        assert search_service.return_value.find_revision.call_count == 2
+
+
+class TestCreateServer:
+    def test_socket_should_only_be_accessible_by_owner(self, search_daemon, socket_path):
+        server = search_daemon.create_server(socket_path)
+        try:
+            assert stat.S_IMODE(socket_path.stat().st_mode) == 0o600
+        finally:
+            server.server_close()
+
+
+class TestConcurrentSearches:
+    def test_search_should_not_wait_for_background_refresh_of_same_project(
+        self, search_daemon, search_service, options
+    ):
+        refresh_running = Event()
+        release_refresh = Event()
+        request = under_test.SearchRequest.create("project", BUILD_CHECKS, options)
+        search_daemon.handle_line(request.json().encode())
+
+        def find_revision(*_args):
+            if not refresh_running.is_set():
+                refresh_running.set()
+                release_refresh.wait(5)
+            return "abc123"
+
+        search_service.return_value.find_revision.side_effect = find_revision
+        refresher = Thread(target=search_daemon.refresh, daemon=True)
+        refresher.start()
+        assert refresh_running.wait(5)
+
+        responses = []
+        foreground = Thread(
+            target=lambda: responses.append(search_daemon.handle_line(request.json().encode()))
+        )
+        foreground.start()
+        foreground.join(2)
+        release_refresh.set()
+        refresher.join(5)
+
+        assert not foreground.is_alive()
+        assert responses[0].revision == "abc123"
+
+
+class TestRemoveStaleSocket:
+    def test_stale_socket_should_be_removed(self, socket_path):
+        socket_path.touch()
+
+        under_test.SearchDaemon._remove_stale_socket(socket_path)
+
+        assert not socket_path.exists()
+
+    def test_live_socket_should_not_be_removed(self, running_daemon, socket_path):
+        with pytest.raises(ValueError):
+            under_test.SearchDaemon._remove_stale_socket(socket_path)
+
+        assert socket_path.exists()
@@ -1,16 +1,24 @@
 """Unit tests for evg_service.py."""
 from enum import Enum
+from pathlib import Path
+from threading import Event
 from typing import Any, Dict, List, Optional
 from unittest.mock import MagicMock
 
 import pytest
 from evergreen import Build, EvergreenApi, Manifest, Project, Task, Version
+from evergreen.build import StatusCounts
 from evergreen.manifest import ManifestModule
 from requests.exceptions import HTTPError
 
 import goodbase.services.evg_service as under_test
 from goodbase.build_checker import BuildChecks
+from goodbase.models.build_status import BuildStatus
+from goodbase.models.version_evaluation import VersionEvaluation
+from goodbase.services.cache_service import CacheService
+from goodbase.services.executor_service import ExecutorService
 from goodbase.services.file_service import FileService
+from goodbase.services.profile_service import ProfileService
 
 
 class TaskStatus(int, Enum):
@@ -20,7 +28,7 @@ class TaskStatus(int, Enum):
 
 
 def build_mock_task(name: str, status: TaskStatus) -> Task:
-    mock_task = MagicMock(spec_set=Task, display_name=name)
+    mock_task = MagicMock(spec_set=Task, display_name=name, status="started")
     if status == TaskStatus.SUCCESS or status == TaskStatus.FAILED:
         mock_task.is_undispatched.return_value = False
         mock_task.is_success.return_value = status == TaskStatus.SUCCESS
@@ -31,24 +39,48 @@ def build_mock_task(name: str, status: TaskStatus) -> Task:
 
 
 def build_mock_build(name: str, task_list: List[Task]) -> Build:
-    mock_build = MagicMock(spec_set=Build, display_name=name, build_variant=name)
+    status_counts = MagicMock(
+        spec_set=StatusCounts,
+        succeeded=len([task for task in task_list if task.is_success()]),
+        undispatched=len([task for task in task_list if task.is_undispatched()]),
+        inactivate=0,
+        started=0,
+        dispatched=0,
+    )
+    mock_build = MagicMock(
+        spec_set=Build,
+        display_name=name,
+        build_variant=name,
+        tasks=[task.display_name for task in task_list],
+        status_counts=status_counts,
+    )
     mock_build.get_tasks.return_value = task_list
     return mock_build
 
 
-def build_mock_version(build_names: List[str]) -> Version:
-    mock_version = MagicMock(spec=Version)
+def build_mock_version(build_names: List[str], **version_fields) -> Version:
+    mock_version = MagicMock(spec=Version, json=version_fields)
     mock_version.build_variants_map = {build_name: build_name for build_name in build_names}
     return mock_version
 
 
 def build_mock_project(index):
-    mock_project = MagicMock(
-        spec=Project, identifier=f"project {index}", remote_path=f"remote/path/{index}"
-    )
+    project_json = {"identifier": f"project {index}", "remote_path": f"remote/path/{index}"}
+    mock_project = MagicMock(spec=Project, json=project_json, **project_json)
     return mock_project
 
 
+def build_mock_project_by_id(project_list: List[Project]):
+    projects = {project.identifier: project for project in project_list}
+
+    def project_by_id(project_id):
+        if project_id not in projects:
+            raise HTTPError(response=MagicMock(status_code=404))
+        return projects[project_id]
+
+    return project_by_id
+
+
 def build_mock_manifest(modules: Optional[Dict[str, str]]) -> Manifest:
     mock_manifest = MagicMock(spec=Manifest)
     if modules is not None:
@@ -70,7 +102,8 @@ def build_mock_project_config() -> Dict[str, Any]:
 @pytest.fixture()
 def file_service():
     file_service = MagicMock(spec_set=FileService)
-    file_service.read_yaml_file.return_value = build_mock_project_config()
+    file_service.file_hash.return_value = "config hash"
+    mock_project_config_sections(file_service, build_mock_project_config())
     return file_service
 
 
@@ -78,20 +111,38 @@ def file_service():
 def evergreen_api():
     mock_evg_api = MagicMock(spec_set=EvergreenApi)
     project_list = [build_mock_project(i) for i in range(10)]
-    mock_evg_api.all_projects = lambda project_filter_fn: [
-        p for p in project_list if project_filter_fn(p)
-    ]
+    mock_evg_api.project_by_id.side_effect = build_mock_project_by_id(project_list)
     return mock_evg_api
 
 
 @pytest.fixture()
-def evg_service(evergreen_api, file_service):
-    evg_service = under_test.EvergreenService(evergreen_api, file_service)
+def cache_service():
+    cache_service = MagicMock(spec_set=CacheService)
+    cache_service.get.return_value = None
+    return cache_service
+
+
+@pytest.fixture()
+def executor_service():
+    executor_service = ExecutorService(MagicMock(evg_workers=4, evg_max_in_flight=None))
+    yield executor_service
+    executor_service.shutdown()
+
+
+@pytest.fixture()
+def evg_service(evergreen_api, file_service, cache_service, executor_service):
+    evg_service = under_test.EvergreenService(
+        evergreen_api, file_service, cache_service, executor_service, ProfileService()
+    )
     return evg_service
 
 
+def mock_project_config_sections(file_service, project_config):
+    file_service.read_yaml_section.side_effect = lambda path, key: project_config.get(key)
+
+
 def mock_project_config(service, project_config):
-    service.file_service.read_yaml_file.return_value = project_config
+    mock_project_config_sections(service.file_service, project_config)
 
 
 def mock_task_list_for_build(service, task_list: Dict[str, List[Task]]):
@@ -156,6 +207,84 @@ class TestAnalyzeBuild:
         assert build_status.inactive_tasks == {"task_2", "task_5", "task_8"}
         assert build_status.all_tasks == {task.display_name for task in mock_task_list}
 
+    def test_cached_build_status_should_be_used(self, evg_service, cache_service):
+        build_status = BuildStatus(
+            build_name="my build",
+            build_variant="my_build",
+            successful_tasks={"task_0"},
+            inactive_tasks=set(),
+            all_tasks={"task_0"},
+        )
+        cache_service.get.return_value = build_status.as_dict()
+
+        assert evg_service.analyze_build("my build") == build_status
+        evg_service.evg_api.build_by_id.assert_not_called()
+
+    def test_finished_builds_should_be_cached(self, evg_service, cache_service):
+        mock_task_list = [build_mock_task(f"task_{i}", TaskStatus.SUCCESS) for i in range(5)]
+        for task in mock_task_list:
+            task.status = "success"
+        mock_task_list_for_build(evg_service, {"my build": mock_task_list})
+
+        build_status = evg_service.analyze_build("my build")
+
+        cache_service.put.assert_called_once_with(
+            under_test.BUILD_STATUS_CACHE, "my build", build_status.as_dict()
+        )
+
+    def test_unfinished_builds_should_not_be_cached(self, evg_service, cache_service):
+        mock_task_list = [build_mock_task(f"task_{i}", TaskStatus(i % 3)) for i in range(9)]
+        mock_task_list_for_build(evg_service, {"my build": mock_task_list})
+
+        evg_service.analyze_build("my build")
+
+        cache_service.put.assert_not_called()
+
+
+class TestAnalyzeBuildWithBuildCounts:
+    def test_task_list_should_not_be_fetched(self, evg_service):
+        mock_task_list = [build_mock_task(f"task_{i}", TaskStatus(i % 3)) for i in range(9)]
+        mock_task_list_for_build(evg_service, {"my build": mock_task_list})
+
+        build_status = evg_service.analyze_build("my build", under_test.BuildDataSource.BUILD)
+
+        assert build_status.success_pct() == 3 / 9
+        assert build_status.active_pct() == 1 - 3 / 9
+        assert not build_status.has_task_names()
+        evg_service.evg_api.build_by_id("my build").get_tasks.assert_not_called()
+
+    def test_finished_builds_should_be_cached(self, evg_service, cache_service):
+        mock_task_list = [build_mock_task(f"task_{i}", TaskStatus.SUCCESS) for i in range(5)]
+        mock_task_list_for_build(evg_service, {"my build": mock_task_list})
+
+        build_status = evg_service.analyze_build("my build", under_test.BuildDataSource.BUILD)
+
+        cache_service.put.assert_called_once_with(
+            under_test.BUILD_COUNTS_CACHE, "my build", build_status.as_dict()
+        )
+
+
+class TestPlanDataSource:
+    @pytest.mark.parametrize(
+        "build_checks,expected",
+        [
+            ([BuildChecks(build_variant_regex=[".*"], success_threshold=0.9)], "build"),
+            ([BuildChecks(build_variant_regex=[".*"], run_threshold=0.9)], "build"),
+            ([BuildChecks(build_variant_regex=[".*"], successful_tasks={"t1"})], "tasks"),
+            ([BuildChecks(build_variant_regex=[".*"], active_tasks={"t1"})], "tasks"),
+            ([BuildChecks(build_variant_regex=["^other$"], active_tasks={"t1"})], "build"),
+            (
+                [
+                    BuildChecks(build_variant_regex=[".*"], success_threshold=0.9),
+                    BuildChecks(build_variant_regex=["^my_bv$"], active_tasks={"t1"}),
+                ],
+                "tasks",
+            ),
+        ],
+    )
+    def test_cheapest_data_source_should_be_used(self, build_checks, expected):
+        assert under_test.EvergreenService.plan_data_source("my_bv", build_checks) == expected
+
 
 class TestGetBuildStatusesForVersion:
     def test_all_builds_meet_predicate(self, evg_service):
@@ -258,6 +387,150 @@ class TestCheckVersion:
 
         assert result
 
+    def test_failing_build_should_skip_remaining_builds(self, evg_service):
+        evg_service.executor_service = ExecutorService(
+            MagicMock(evg_workers=1, evg_max_in_flight=None)
+        )
+        n_builds = 20
+        mock_build_map = {
+            f"build_{i}": [build_mock_task(f"task_{j}", TaskStatus.INACTIVE) for j in range(10)]
+            for i in range(n_builds)
+        }
+        mock_task_list_for_build(evg_service, mock_build_map)
+        build_by_id = MagicMock(side_effect=evg_service.evg_api.build_by_id)
+        evg_service.evg_api.build_by_id = build_by_id
+        mock_version = build_mock_version([build_name for build_name in mock_build_map.keys()])
+        build_checks = BuildChecks(build_variant_regex=[".*"], run_threshold=0.9)
+
+        result = evg_service.check_version(mock_version, [build_checks])
+
+        assert not result
+        assert build_by_id.call_count < n_builds
+
+
+class TestEvaluateVersion:
+    def test_result_from_running_builds_should_not_be_final(self, evg_service):
+        mock_build_map = {
+            f"build_{i}": [build_mock_task(f"task_{j}", TaskStatus.SUCCESS) for j in range(10)]
+            for i in range(3)
+        }
+        mock_task_list_for_build(evg_service, mock_build_map)
+        mock_version = build_mock_version(list(mock_build_map.keys()))
+        build_checks = BuildChecks(build_variant_regex=[".*"], successful_tasks={"task_0"})
+
+        evaluation = evg_service.evaluate_version(mock_version, [build_checks])
+
+        assert evaluation.passed
+        assert not evaluation.final
+
+    def test_result_from_finished_builds_should_be_final(self, evg_service):
+        mock_build_map = {
+            f"build_{i}": [build_mock_task(f"task_{j}", TaskStatus.SUCCESS) for j in range(10)]
+            for i in range(3)
+        }
+        for task_list in mock_build_map.values():
+            for task in task_list:
+                task.status = "success"
+        mock_task_list_for_build(evg_service, mock_build_map)
+        mock_version = build_mock_version(list(mock_build_map.keys()))
+        build_checks = BuildChecks(build_variant_regex=[".*"], successful_tasks={"task_0"})
+
+        evaluation = evg_service.evaluate_version(mock_version, [build_checks])
+
+        assert evaluation.passed
+        assert evaluation.final
+
+    def test_stopped_evaluation_should_not_pass(self, evg_service):
+        mock_build_map = {
+            f"build_{i}": [build_mock_task(f"task_{j}", TaskStatus.SUCCESS) for j in range(10)]
+            for i in range(3)
+        }
+        mock_task_list_for_build(evg_service, mock_build_map)
+        mock_version = build_mock_version(list(mock_build_map.keys()))
+        build_checks = BuildChecks(build_variant_regex=[".*"], run_threshold=0.9)
+        stop = Event()
+        stop.set()
+
+        evaluation = evg_service.evaluate_version(mock_version, [build_checks], stop)
+
+        assert evaluation == VersionEvaluation(passed=False, final=False)
+
+    @pytest.mark.parametrize(
+        "version_fields", [{"activated": False}, {"activated": True, "status": "created"}]
+    )
+    def test_unstarted_version_should_be_rejected_without_fetching_builds(
+        self, evg_service, version_fields
+    ):
+        mock_version = build_mock_version(["build_0", "build_1"], **version_fields)
+        build_checks = BuildChecks(build_variant_regex=["^build_0$"], success_threshold=0.9)
+
+        evaluation = evg_service.evaluate_version(mock_version, [build_checks])
+
+        assert evaluation == VersionEvaluation(passed=False, final=False)
+        evg_service.evg_api.build_by_id.assert_not_called()
+
+    def test_unstarted_version_should_be_checked_when_no_criteria_apply(self, evg_service):
+        mock_build_map = {
+            "build_0": [build_mock_task(f"task_{j}", TaskStatus.SUCCESS) for j in range(10)],
+        }
+        mock_task_list_for_build(evg_service, mock_build_map)
+        mock_version = build_mock_version(list(mock_build_map.keys()), activated=False)
+        build_checks = BuildChecks(build_variant_regex=["^build_0$"], successful_tasks={"task_0"})
+        other_checks = BuildChecks(build_variant_regex=["^build_1$"], success_threshold=0.9)
+
+        evaluation = evg_service.evaluate_version(mock_version, [build_checks, other_checks])
+
+        assert evaluation.passed
+
+    def test_version_from_index_should_not_be_ruled_out(self, evg_service):
+        mock_build_map = {
+            "build_0": [build_mock_task(f"task_{j}", TaskStatus.SUCCESS) for j in range(10)],
+        }
+        mock_task_list_for_build(evg_service, mock_build_map)
+        # Versions read from the index leave out whether they are activated and their status.
+        mock_version = build_mock_version(list(mock_build_map.keys()))
+        build_checks = BuildChecks(build_variant_regex=[".*"], success_threshold=0.9)
+
+        evaluation = evg_service.evaluate_version(mock_version, [build_checks])
+
+        assert evaluation.passed
+
+
+class TestEvaluateCachedVersions:
+    def test_versions_with_all_builds_cached_should_be_evaluated(
+        self, evg_service, evergreen_api, cache_service
+    ):
+        cached_builds = {
+            "build_0": BuildStatus("build_0", "build_0", {"t"}, set(), {"t"}, finished=True),
+            "build_1": BuildStatus("build_1", "build_1", set(), set(), {"t"}, finished=True),
+        }
+        cache_service.get.side_effect = lambda _, build_id: (
+            cached_builds[build_id].as_dict() if build_id in cached_builds else None
+        )
+        passing_version = build_mock_version(["build_0"])
+        failing_version = build_mock_version(["build_0", "build_1"])
+        uncached_version = build_mock_version(["build_0", "build_2"])
+        build_checks = BuildChecks(build_variant_regex=[".*"], success_threshold=0.9)
+
+        evaluations = evg_service.evaluate_cached_versions(
+            [passing_version, failing_version, uncached_version], [build_checks]
+        )
+
+        assert evaluations == {
+            passing_version.version_id: VersionEvaluation(passed=True, final=True),
+            failing_version.version_id: VersionEvaluation(passed=False, final=True),
+        }
+        evergreen_api.build_by_id.assert_not_called()
+
+    def test_no_cached_versions_should_return_nothing(self, evg_service):
+        build_checks = BuildChecks(build_variant_regex=[".*"], success_threshold=0.9)
+
+        evaluations = evg_service.evaluate_cached_versions(
+            [build_mock_version(["build_0"])], [build_checks]
+        )
+
+        assert evaluations == {}
+
 
 class TestGetModulesRevisions:
     def test_empty_modules_returned(self, evg_service):
@@ -288,6 +561,40 @@ class TestGetModulesRevisions:
 
         assert {} == evg_service.get_modules_revisions("project id", "gitrevision")
 
+    def test_manifest_should_be_cached(self, evg_service):
+        mock_evg_manifest(evg_service, build_mock_manifest({"module 1": "abc123"}))
+
+        evg_service.get_modules_revisions("project id", "gitrevision")
+
+        evg_service.cache_service.put.assert_called_once_with(
+            under_test.MANIFEST_CACHE, "project id/gitrevision", {"modules": {"module 1": "abc123"}}
+        )
+
+    def test_missing_manifest_should_be_cached(self, evg_service):
+        http_response = MagicMock(status_code=404)
+        evg_service.evg_api.manifest.side_effect = HTTPError(response=http_response)
+
+        evg_service.get_modules_revisions("project id", "gitrevision")
+
+        evg_service.cache_service.put.assert_called_once_with(
+            under_test.MANIFEST_CACHE, "project id/gitrevision", {"modules": {}}
+        )
+
+    def test_other_errors_should_not_be_cached(self, evg_service):
+        http_response = MagicMock(status_code=500)
+        evg_service.evg_api.manifest.side_effect = HTTPError(response=http_response)
+
+        with pytest.raises(HTTPError):
+            evg_service.get_modules_revisions("project id", "gitrevision")
+        evg_service.cache_service.put.assert_not_called()
+
+    @pytest.mark.parametrize("modules", [{}, {"module 1": "abc123"}])
+    def test_cached_manifest_should_be_used(self, evg_service, modules):
+        evg_service.cache_service.get.return_value = {"modules": modules}
+
+        assert modules == evg_service.get_modules_revisions("project id", "gitrevision")
+        evg_service.evg_api.manifest.assert_not_called()
+
 
 class TestGetProjectConfigLocation:
     def test_remote_path_is_returned(self, evg_service):
@@ -298,15 +605,39 @@ class TestGetProjectConfigLocation:
             evg_service.get_project_config_location("non-existing-project")
             assert "non-existing-project" in exp.value
 
-    def test_more_than_one_matching_project_should_throw_exception(self, evg_service):
-        project_list = [build_mock_project(5) for _ in range(10)]
-        evg_service.evg_api.all_projects = lambda project_filter_fn: [
-            p for p in project_list if project_filter_fn(p)
-        ]
+    def test_only_the_requested_project_should_be_fetched(self, evg_service):
+        evg_service.get_project_config_location("project 3")
 
-        with pytest.raises(ValueError) as exp:
-            evg_service.get_project_config_location("project_5")
-            assert "project_5" in exp.value
+        evg_service.evg_api.project_by_id.assert_called_once_with("project 3")
+        evg_service.evg_api.all_projects.assert_not_called()
+
+    def test_other_errors_should_be_raised(self, evg_service):
+        evg_service.evg_api.project_by_id.side_effect = HTTPError(
+            response=MagicMock(status_code=500)
+        )
+
+        with pytest.raises(HTTPError):
+            evg_service.get_project_config_location("project 3")
+
+    def test_fetched_project_should_be_cached(self, evg_service):
+        evg_service.get_project_config_location("project 3")
+
+        evg_service.cache_service.put.assert_called_once_with(
+            under_test.PROJECT_CACHE,
+            "project 3",
+            {"identifier": "project 3", "remote_path": "remote/path/3"},
+        )
+
+    def test_cached_project_should_be_used(self, evg_service):
+        evg_service.cache_service.get.return_value = {"remote_path": "cached/path"}
+
+        assert "cached/path" == evg_service.get_project_config_location("project 3")
+        evg_service.evg_api.project_by_id.assert_not_called()
+        evg_service.cache_service.get.assert_called_once_with(
+            under_test.PROJECT_CACHE,
+            "project 3",
+            max_age_secs=under_test.PROJECT_CACHE_MAX_AGE_SECS,
+        )
 
 
 class TestGetModuleLocations:
@@ -320,3 +651,26 @@ class TestGetModuleLocations:
         project_locations = evg_service.get_module_locations("project 2")
 
         assert project_locations == {}
+
+    def test_only_the_modules_section_should_be_read(self, evg_service):
+        evg_service.get_module_locations("project 2")
+
+        evg_service.file_service.read_yaml_section.assert_called_once_with(
+            Path("remote/path/2"), "modules"
+        )
+
+    def test_module_locations_should_be_cached_by_config_hash(self, evg_service):
+        module_locations = evg_service.get_module_locations("project 2")
+
+        evg_service.cache_service.put.assert_called_with(
+            under_test.MODULE_LOCATIONS_CACHE, "config hash", module_locations
+        )
+
+    def test_cached_module_locations_should_be_used(self, evg_service):
+        cached_locations = {"module": "path/to/module"}
+        evg_service.cache_service.get.side_effect = lambda namespace, key, **kwargs: (
+            cached_locations if namespace == under_test.MODULE_LOCATIONS_CACHE else None
+        )
+
+        assert evg_service.get_module_locations("project 2") == cached_locations
+        evg_service.file_service.read_yaml_section.assert_not_called()
@@ -0,0 +1,53 @@
+"""Unit tests for executor_service.py."""
+from threading import Lock
+from time import sleep
+from unittest.mock import MagicMock
+
+import pytest
+
+import goodbase.services.executor_service as under_test
+
+
+def build_executor_service(evg_workers, evg_max_in_flight=None):
+    return under_test.ExecutorService(
+        MagicMock(evg_workers=evg_workers, evg_max_in_flight=evg_max_in_flight)
+    )
+
+
+class TestSubmit:
+    def test_submitted_work_should_return_result(self):
+        executor_service = build_executor_service(2)
+
+        assert executor_service.submit(lambda x, y: x + y, 1, 2).result() == 3
+
+        executor_service.shutdown()
+
+    @pytest.mark.parametrize("evg_workers,evg_max_in_flight,expected", [(8, 2, 2), (3, None, 3)])
+    def test_in_flight_work_should_be_capped(self, evg_workers, evg_max_in_flight, expected):
+        executor_service = build_executor_service(evg_workers, evg_max_in_flight)
+        lock = Lock()
+        state = {"running": 0, "max_running": 0}
+
+        def work():
+            with lock:
+                state["running"] += 1
+                state["max_running"] = max(state["max_running"], state["running"])
+            sleep(0.01)
+            with lock:
+                state["running"] -= 1
+
+        jobs = [executor_service.submit(work) for _ in range(20)]
+        for job in jobs:
+            job.result()
+        executor_service.shutdown()
+
+        assert state["max_running"] <= expected
+
+
+class TestShutdown:
+    def test_submit_after_shutdown_should_fail(self):
+        executor_service = build_executor_service(2)
+        executor_service.shutdown()
+
+        with pytest.raises(RuntimeError):
+            executor_service.submit(lambda: None)
@@ -0,0 +1,89 @@
+"""Unit tests for file_service.py."""
+import pytest
+
+import goodbase.services.file_service as under_test
+
+PROJECT_CONFIG = """
+functions:
+  run tests:
+    - command: shell.exec
+      params:
+        script: "echo {a: [1, 2]}"
+modules:
+  - name: enterprise
+    repo: git@github.com:example/enterprise.git
+    prefix: src/modules
+    branch: main
+  - name: wtdevelop
+    prefix: src/third_party
+    branch: develop
+tasks:
+  - name: compile
+    commands:
+      - func: run tests
+"""
+
+
+@pytest.fixture()
+def file_service():
+    return under_test.FileService()
+
+
+def write_file(tmp_path, contents):
+    file_path = tmp_path / "evergreen.yml"
+    file_path.write_text(contents)
+    return file_path
+
+
+class TestReadYamlSection:
+    def test_section_should_match_full_load(self, file_service, tmp_path):
+        file_path = write_file(tmp_path, PROJECT_CONFIG)
+
+        section = file_service.read_yaml_section(file_path, "modules")
+
+        assert section == file_service.read_yaml_file(file_path)["modules"]
+
+    def test_missing_section_should_be_none(self, file_service, tmp_path):
+        file_path = write_file(tmp_path, PROJECT_CONFIG)
+
+        assert file_service.read_yaml_section(file_path, "buildvariants") is None
+
+    def test_nested_keys_should_not_match(self, file_service, tmp_path):
+        file_path = write_file(tmp_path, "tasks:\n  - modules: [nested]\n")
+
+        assert file_service.read_yaml_section(file_path, "modules") is None
+
+    def test_file_that_is_not_a_mapping_should_have_no_sections(self, file_service, tmp_path):
+        file_path = write_file(tmp_path, "- modules\n")
+
+        assert file_service.read_yaml_section(file_path, "modules") is None
+
+    def test_anchors_defined_outside_section_should_be_resolved(self, file_service, tmp_path):
+        file_path = write_file(
+            tmp_path, "defaults: &defaults\n  branch: main\nmodules:\n  - *defaults\n"
+        )
+
+        assert file_service.read_yaml_section(file_path, "modules") == [{"branch": "main"}]
+
+    def test_anchors_defined_inside_section_should_be_resolved(self, file_service, tmp_path):
+        file_path = write_file(tmp_path, "modules:\n  - &module {name: a}\n  - *module\n")
+
+        assert file_service.read_yaml_section(file_path, "modules") == [{"name": "a"}] * 2
+
+
+class TestFileHash:
+    def test_files_with_same_contents_should_have_same_hash(self, file_service, tmp_path):
+        first = tmp_path / "first.yml"
+        second = tmp_path / "second.yml"
+        first.write_text(PROJECT_CONFIG)
+        second.write_text(PROJECT_CONFIG)
+
+        assert file_service.file_hash(first) == file_service.file_hash(second)
+
+    def test_changed_file_should_have_different_hash(self, file_service, tmp_path):
+        file_path = write_file(tmp_path, PROJECT_CONFIG)
+        original_hash = file_service.file_hash(file_path)
+
+        file_path.write_text(PROJECT_CONFIG + "\nparameters: []\n")
+
+        assert file_service.file_hash(file_path) != original_hash
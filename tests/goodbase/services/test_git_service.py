@@ -1,10 +1,13 @@
 """Unit tests for git_service.py."""
 from pathlib import Path
+from threading import Barrier, Event, Timer
 from unittest.mock import MagicMock
 
 import pytest
+from plumbum import ProcessExecutionError
 
 import goodbase.services.git_service as under_test
+from goodbase.services.profile_service import ProfileService
 
 
 @pytest.fixture()
@@ -16,47 +19,384 @@ def mock_git():
 
 @pytest.fixture()
 def evg_service(mock_git):
-    git_service = under_test.GitService()
+    git_service = under_test.GitService(ProfileService())
     git_service.git = mock_git
     return git_service
 
 
+def mock_cat_file_output(mock_git, output):
+    mock_git.__getitem__.return_value.with_cwd.return_value.__lshift__.return_value.return_value = (
+        output
+    )
+
+
+@pytest.fixture()
+def missing_revision(mock_git):
+    mock_cat_file_output(mock_git, "revision123^{commit} missing\n")
+
+
 class TestPerformAction:
     def test_none_action_should_not_perform_any_actions(self, evg_service, mock_git):
         evg_service.perform_action(under_test.GitAction.NONE, "revision1234")
 
         mock_git.__getitem__.assert_not_called()
 
-    def test_checkout_action_should_call_git_checkout(self, evg_service, mock_git):
+    def test_checkout_action_should_call_git_checkout(
+        self, evg_service, mock_git, missing_revision
+    ):
         revision = "revision123"
         evg_service.perform_action(under_test.GitAction.CHECKOUT, revision)
 
-        mock_git.assert_git_call(("fetch", "origin"))
+        mock_git.assert_git_call(("fetch", "origin", revision))
         mock_git.assert_git_call(["checkout", revision])
 
     def test_checkout_action_with_branch_should_call_git_checkout_with_branch(
-        self, evg_service, mock_git
+        self, evg_service, mock_git, missing_revision
     ):
         revision = "revision123"
         evg_service.perform_action(under_test.GitAction.CHECKOUT, revision, branch_name="my-branch")
 
-        mock_git.assert_git_call(("fetch", "origin"))
+        mock_git.assert_git_call(("fetch", "origin", revision))
         mock_git.assert_git_call(["checkout", "-b", "my-branch", revision])
 
-    def test_rebase_action_should_call_git_rebase(self, evg_service, mock_git):
+    def test_rebase_action_should_call_git_rebase(self, evg_service, mock_git, missing_revision):
         revision = "revision123"
         evg_service.perform_action(under_test.GitAction.REBASE, revision)
 
-        mock_git.assert_git_call(("fetch", "origin"))
+        mock_git.assert_git_call(("fetch", "origin", revision))
         mock_git.assert_git_call(("rebase", revision))
 
-    def test_merge_action_should_call_git_merge(self, evg_service, mock_git):
+    def test_merge_action_should_call_git_merge(self, evg_service, mock_git, missing_revision):
         revision = "revision123"
         evg_service.perform_action(under_test.GitAction.MERGE, revision)
 
-        mock_git.assert_git_call(("fetch", "origin"))
+        mock_git.assert_git_call(("fetch", "origin", revision))
         mock_git.assert_git_call(("merge", revision))
 
+    def test_fetch_should_be_skipped_when_not_requested(self, evg_service, mock_git):
+        evg_service.perform_action(under_test.GitAction.CHECKOUT, "revision123", fetch=False)
+
+        mock_git.assert_git_call(["checkout", "revision123"])
+        assert ("cat-file", "--batch-check") not in git_calls(mock_git)
+
+
+def git_calls(mock_git):
+    return [c.args[0] for c in mock_git.__getitem__.call_args_list]
+
+
+class TestFetchRevision:
+    def test_revision_that_exists_locally_should_not_be_fetched(self, evg_service, mock_git):
+        mock_cat_file_output(mock_git, "0123abcd commit 250\n")
+
+        evg_service.fetch_revision("0123abcd")
+
+        assert git_calls(mock_git) == [("cat-file", "--batch-check")]
+
+    def test_missing_revision_should_be_fetched_alone(
+        self, evg_service, mock_git, missing_revision
+    ):
+        evg_service.fetch_revision("revision123")
+
+        assert git_calls(mock_git) == [
+            ("cat-file", "--batch-check"),
+            ("fetch", "origin", "revision123"),
+        ]
+
+    def test_everything_should_be_fetched_if_revision_can_not_be_fetched_alone(
+        self, evg_service, mock_git, missing_revision
+    ):
+        def git_command(args):
+            command = MagicMock()
+            command.with_cwd.return_value.__lshift__.return_value.return_value = (
+                "revision123^{commit} missing\n"
+            )
+            if args == ("fetch", "origin", "revision123"):
+                command.with_cwd.return_value.side_effect = ProcessExecutionError(
+                    ["git"], 1, "", ""
+                )
+            return command
+
+        mock_git.__getitem__.side_effect = git_command
+
+        evg_service.fetch_revision("revision123")
+
+        assert git_calls(mock_git)[-1] == ("fetch", "origin")
+
+
+class TestFetchMissingRevisions:
+    def test_missing_revisions_should_be_fetched_together(self, evg_service, mock_git):
+        mock_cat_file_output(
+            mock_git, "aaaa^{commit} missing\nbbbb commit 250\ncccc^{commit} missing\n"
+        )
+
+        evg_service.fetch_missing_revisions(["aaaa", "bbbb", "cccc"])
+
+        assert git_calls(mock_git) == [
+            ("cat-file", "--batch-check"),
+            ("fetch", "origin", "aaaa", "cccc"),
+        ]
+
+
+class TestCommitDistance:
+    def test_commits_on_each_side_should_be_counted(self, evg_service, mock_git):
+        mock_git.__getitem__.return_value.with_cwd.return_value.return_value = "3\t42\n"
+
+        assert evg_service.commit_distance("revision123") == (3, 42)
+        assert git_calls(mock_git) == [
+            ("rev-list", "--count", "--left-right", "HEAD...revision123", "--")
+        ]
+
+
+class TestPrefetch:
+    def test_each_repository_should_be_fetched_in_the_background(self, evg_service, mock_git):
+        directories = [Path(f"/path/to/repo_{i}") for i in range(3)]
+
+        evg_service.prefetch(directories)
+        for directory in directories:
+            evg_service.wait_for_prefetch(directory)
+
+        command = mock_git.__getitem__.return_value
+        assert {c.args[0] for c in command.with_cwd.call_args_list} == set(directories)
+        assert git_calls(mock_git) == [("fetch", "origin")] * 3
+
+    @staticmethod
+    def mock_blocked_prefetch(mock_git, order, cat_file_outputs):
+        fetch_started = Event()
+        release_fetch = Event()
+
+        def run_git(args):
+            command = MagicMock()
+            if args == ("fetch", "origin"):
+
+                def fetch():
+                    fetch_started.set()
+                    release_fetch.wait(5)
+                    order.append("prefetch")
+
+                command.with_cwd.return_value.side_effect = fetch
+            elif args[0] == "fetch":
+                command.with_cwd.return_value.side_effect = lambda: order.append("fetch")
+            else:
+
+                def cat_file():
+                    order.append("cat-file")
+                    # The background fetch only finishes once revisions have been looked up.
+                    release_fetch.set()
+                    return cat_file_outputs.pop(0)
+
+                command.with_cwd.return_value.__lshift__.return_value.side_effect = cat_file
+            return command
+
+        mock_git.__getitem__.side_effect = run_git
+        return fetch_started
+
+    def test_missing_revision_should_wait_for_the_background_fetch(self, evg_service, mock_git):
+        order = []
+        fetch_started = self.mock_blocked_prefetch(
+            mock_git, order, ["revision123^{commit} missing\n", "revision123 commit 250\n"]
+        )
+        evg_service.prefetch([None])
+        fetch_started.wait(5)
+
+        evg_service.fetch_revision("revision123")
+
+        assert order == ["cat-file", "prefetch", "cat-file"]
+
+    def test_revision_still_missing_after_background_fetch_should_be_fetched(
+        self, evg_service, mock_git
+    ):
+        order = []
+        fetch_started = self.mock_blocked_prefetch(
+            mock_git, order, ["revision123^{commit} missing\n"] * 2
+        )
+        evg_service.prefetch([None])
+        fetch_started.wait(5)
+
+        evg_service.fetch_revision("revision123")
+
+        assert order == ["cat-file", "prefetch", "cat-file", "fetch"]
+
+    def test_available_revision_should_not_wait_for_the_background_fetch(
+        self, evg_service, mock_git
+    ):
+        order = []
+        fetch_started = self.mock_blocked_prefetch(mock_git, order, ["revision123 commit 250\n"])
+        evg_service.prefetch([None])
+        fetch_started.wait(5)
+
+        evg_service.fetch_revision("revision123")
+
+        assert order[0] == "cat-file"
+
+    def test_failed_background_fetch_should_not_raise(
+        self, evg_service, mock_git, missing_revision
+    ):
+        mock_git.__getitem__.return_value.with_cwd.return_value.side_effect = ProcessExecutionError(
+            ["git"], 1, "", ""
+        )
+        evg_service.prefetch([None])
+
+        evg_service.wait_for_prefetch()
+
+    @pytest.mark.parametrize(
+        "operation",
+        [under_test.GitAction.CHECKOUT, under_test.GitAction.REBASE, under_test.GitAction.MERGE],
+    )
+    def test_operations_should_wait_for_the_background_fetch(
+        self, evg_service, mock_git, operation
+    ):
+        order = []
+        fetch_started = Event()
+        release_fetch = Event()
+
+        def run_git(args):
+            command = MagicMock()
+            if args == ("fetch", "origin"):
+
+                def fetch():
+                    fetch_started.set()
+                    release_fetch.wait(5)
+                    order.append("prefetch")
+
+                command.with_cwd.return_value.side_effect = fetch
+            else:
+                command.with_cwd.return_value.side_effect = lambda: order.append(args[0])
+            return command
+
+        mock_git.__getitem__.side_effect = run_git
+        evg_service.prefetch([None])
+        fetch_started.wait(5)
+        Timer(0.1, release_fetch.set).start()
+
+        evg_service.perform_action(operation, "revision123", fetch=False)
+
+        assert order == ["prefetch", operation.value]
+
+    def test_every_background_fetch_should_be_waited_for(self, evg_service, mock_git):
+        directories = [Path(f"/path/to/repo_{i}") for i in range(3)]
+        evg_service.prefetch(directories)
+
+        evg_service.wait_for_prefetches()
+
+        assert git_calls(mock_git) == [("fetch", "origin")] * 3
+        assert not any(evg_service.wait_for_prefetch(directory) for directory in directories)
+
+    def test_repository_should_only_be_prefetched_once(self, evg_service, mock_git):
+        evg_service.prefetch([Path("/path/to/repo")])
+        evg_service.prefetch([Path("/path/to/repo")])
+        evg_service.wait_for_prefetch(Path("/path/to/repo"))
+
+        assert git_calls(mock_git) == [("fetch", "origin")]
+
+
+class TestReachableRevisions:
+    def test_revisions_should_be_read_with_a_single_rev_list(self, evg_service, mock_git):
+        mock_git.__getitem__.return_value.with_cwd.return_value.return_value = "aaaa\nbbbb\n"
+
+        reachable = evg_service.reachable_revisions("origin/master", max_count=100)
+
+        assert reachable == {"aaaa", "bbbb"}
+        assert git_calls(mock_git) == [("rev-list", "--max-count=100", "origin/master", "--")]
+
+    def test_background_fetch_should_not_be_waited_for(self, evg_service, mock_git):
+        fetch_started = Event()
+        release_fetch = Event()
+        fetch_finished = Event()
+
+        def run_git(args):
+            command = MagicMock()
+            if args == ("fetch", "origin"):
+
+                def fetch():
+                    fetch_started.set()
+                    release_fetch.wait(5)
+                    fetch_finished.set()
+
+                command.with_cwd.return_value.side_effect = fetch
+            else:
+                command.with_cwd.return_value.return_value = "aaaa\n"
+            return command
+
+        mock_git.__getitem__.side_effect = run_git
+        evg_service.prefetch([None])
+        fetch_started.wait(5)
+
+        reachable = evg_service.reachable_revisions("origin/master")
+        finished_before_search = fetch_finished.is_set()
+        release_fetch.set()
+
+        assert reachable == {"aaaa"}
+        assert not finished_before_search
+
+
+class TestMissingRevisions:
+    def test_revisions_that_are_not_commits_should_be_missing(self, evg_service, mock_git):
+        mock_cat_file_output(
+            mock_git,
+            "\n".join(
+                [
+                    "aaaa commit 250",
+                    "bbbb^{commit} missing",
+                    "cc^{commit} ambiguous",
+                    "dddd commit 300",
+                ]
+            ),
+        )
+
+        missing = evg_service.missing_revisions(["aaaa", "bbbb", "cc", "dddd"])
+
+        assert missing == ["bbbb", "cc"]
+        batch_check = mock_git.__getitem__.return_value.with_cwd.return_value
+        batch_check.__lshift__.assert_called_once_with(
+            "aaaa^{commit}\nbbbb^{commit}\ncc^{commit}\ndddd^{commit}\n"
+        )
+
+
+class TestFetchRevisions:
+    def test_each_repository_should_be_checked_in_its_own_directory(
+        self, evg_service, mock_git, missing_revision
+    ):
+        revisions = {Path(f"/path/to/repo_{i}"): "revision123" for i in range(5)}
+
+        errors = evg_service.fetch_revisions(revisions, max_workers=2)
+
+        assert errors == {}
+        command = mock_git.__getitem__.return_value
+        directories = {c.args[0] for c in command.with_cwd.call_args_list}
+        assert directories == set(revisions)
+
+    def test_fetches_should_run_concurrently(self, evg_service, mock_git):
+        barrier = Barrier(3, timeout=5)
+
+        def cat_file():
+            barrier.wait()
+            return "revision123 commit 250\n"
+
+        command = mock_git.__getitem__.return_value.with_cwd.return_value
+        command.__lshift__.return_value.side_effect = cat_file
+
+        errors = evg_service.fetch_revisions(
+            {Path(f"/path/to/repo_{i}"): "revision123" for i in range(3)}
+        )
+
+        assert errors == {}
+
+    def test_fetch_errors_should_be_returned_by_directory(self, evg_service, mock_git):
+        failing = Path("/path/to/failing")
+
+        def run_git(directory):
+            command = MagicMock()
+            if directory == failing:
+                command.__lshift__.side_effect = ProcessExecutionError(["git"], 1, "", "")
+            return command
+
+        mock_git.__getitem__.return_value.with_cwd.side_effect = run_git
+
+        errors = evg_service.fetch_revisions({Path("/path/to/ok"): "abc", failing: "def"})
+
+        assert list(errors) == [failing]
+        assert isinstance(errors[failing], ProcessExecutionError)
+
 
 class TestDetermineDirectory:
     def test_no_directory_should_return_cwd(self):
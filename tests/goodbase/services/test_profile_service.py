@@ -0,0 +1,134 @@
+"""Unit tests for profile_service.py."""
+import json
+import tempfile
+from pathlib import Path
+
+import pytest
+
+import goodbase.services.profile_service as under_test
+
+
+@pytest.fixture()
+def profile_service():
+    return under_test.ProfileService(enabled=True)
+
+
+def record_durations(profile_service, name, durations, category=under_test.PHASE):
+    for duration in durations:
+        profile_service.record(name, category, 0.0, duration)
+
+
+class TestEndpointName:
+    @pytest.mark.parametrize(
+        "url,expected",
+        [
+            ("https://evg.example.com/rest/v2/builds/build_123", "/rest/v2/builds/{id}"),
+            (
+                "https://evg.example.com/rest/v2/builds/build_123/tasks",
+                "/rest/v2/builds/{id}/tasks",
+            ),
+            (
+                "https://evg.example.com/rest/v2/projects/my-project/versions?start=5",
+                "/rest/v2/projects/{id}/versions",
+            ),
+            (
+                "https://evg.example.com/plugin/manifest/get/my-project/abc123",
+                "/plugin/manifest/get/{id}/{id}",
+            ),
+            ("https://evg.example.com/rest/v2/projects", "/rest/v2/projects"),
+        ],
+    )
+    def test_ids_should_be_replaced(self, url, expected):
+        assert under_test.endpoint_name(url) == expected
+
+
+class TestSpan:
+    def test_span_should_be_recorded_when_enabled(self, profile_service):
+        with profile_service.span("phase 1"):
+            pass
+
+        assert [span.name for span in profile_service.spans] == ["phase 1"]
+        assert profile_service.spans[0].category == under_test.PHASE
+
+    def test_span_should_be_recorded_when_code_raises(self, profile_service):
+        with pytest.raises(ValueError):
+            with profile_service.span("phase 1", under_test.ENDPOINT):
+                raise ValueError("error")
+
+        assert [span.category for span in profile_service.spans] == [under_test.ENDPOINT]
+
+    def test_nothing_should_be_recorded_when_disabled(self):
+        profile_service = under_test.ProfileService()
+
+        with profile_service.span("phase 1"):
+            pass
+
+        assert profile_service.spans == []
+
+
+class TestIterate:
+    def test_each_item_and_the_end_should_be_timed(self, profile_service):
+        items = list(profile_service.iterate("paging", iter([1, 2, 3])))
+
+        assert items == [1, 2, 3]
+        assert len(profile_service.spans) == 4
+
+    def test_items_should_pass_through_when_disabled(self):
+        profile_service = under_test.ProfileService()
+
+        assert list(profile_service.iterate("paging", [1, 2, 3])) == [1, 2, 3]
+        assert profile_service.spans == []
+
+
+class TestSummarize:
+    def test_spans_should_be_summarized_by_name(self, profile_service):
+        record_durations(profile_service, "fetch", [float(i) for i in range(1, 101)])
+        record_durations(profile_service, "checkout", [0.5])
+
+        summaries = {summary.name: summary for summary in profile_service.summarize()}
+
+        assert summaries["fetch"].span_count == 100
+        assert summaries["fetch"].total_secs == 5050.0
+        assert summaries["fetch"].p50_secs == 50.0
+        assert summaries["fetch"].p95_secs == 95.0
+        assert summaries["checkout"].p50_secs == 0.5
+        assert summaries["checkout"].p95_secs == 0.5
+
+    def test_summaries_should_be_ordered_by_total_time_within_category(self, profile_service):
+        record_durations(profile_service, "short", [1.0])
+        record_durations(profile_service, "long", [2.0, 3.0])
+        record_durations(profile_service, "/rest/v2/builds/{id}", [9.0], under_test.ENDPOINT)
+
+        summaries = profile_service.summarize()
+
+        assert [summary.name for summary in summaries] == [
+            "/rest/v2/builds/{id}",
+            "long",
+            "short",
+        ]
+
+
+class TestWrite:
+    def test_spans_should_be_written_as_json(self, profile_service):
+        record_durations(profile_service, "fetch", [1.0, 2.0])
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output = Path(tmp_dir) / "profile.json"
+            profile_service.write(output, under_test.ProfileFormat.JSON)
+            contents = json.loads(output.read_text())
+
+        assert [span["duration_secs"] for span in contents["spans"]] == [1.0, 2.0]
+
+    def test_spans_should_be_written_as_chrome_trace(self, profile_service):
+        profile_service.record("fetch", under_test.PHASE, profile_service._origin + 1.0, 0.25)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output = Path(tmp_dir) / "profile.json"
+            profile_service.write(output, under_test.ProfileFormat.CHROME_TRACE)
+            contents = json.loads(output.read_text())
+
+        event = contents["traceEvents"][0]
+        assert event["name"] == "fetch"
+        assert event["ph"] == "X"
+        assert event["ts"] == pytest.approx(1_000_000)
+        assert event["dur"] == pytest.approx(250_000)
@@ -1,4 +1,6 @@
 """Unit tests for search_service.py."""
+from threading import Event
+from time import perf_counter, sleep
 from unittest.mock import MagicMock
 
 import pytest
@@ -6,10 +8,14 @@ from click._termui_impl import ProgressBar
 from evergreen import EvergreenApi, Version
 
 import goodbase.services.search_service as under_test
-from goodbase.build_checker import BuildChecks
+from goodbase.build_checker import BuildChecks, criteria_fingerprint
 from goodbase.goodbase_options import OutputFormat
+from goodbase.models.version_evaluation import VersionEvaluation
 from goodbase.services.evg_service import EvergreenService
 from goodbase.services.git_service import GitAction
+from goodbase.services.profile_service import ProfileService
+from goodbase.services.verdict_ledger_service import VerdictLedgerService
+from goodbase.services.version_index_service import VersionIndexService
 
 
 @pytest.fixture()
@@ -19,11 +25,35 @@ def evg_api():
 
 
 @pytest.fixture()
-def evg_service():
+def version_passes():
+    return MagicMock(return_value=False)
+
+
+@pytest.fixture()
+def evg_service(version_passes):
     mock_evg_service = MagicMock(spec_set=EvergreenService)
+    mock_evg_service.evaluate_version.side_effect = (
+        lambda evg_version, checks, _stop: VersionEvaluation(
+            passed=version_passes(evg_version, checks), final=False
+        )
+    )
+    mock_evg_service.evaluate_cached_versions.return_value = {}
     return mock_evg_service
 
 
+@pytest.fixture()
+def version_index_service():
+    mock_version_index_service = MagicMock(spec_set=VersionIndexService)
+    return mock_version_index_service
+
+
+@pytest.fixture()
+def verdict_ledger_service():
+    mock_verdict_ledger_service = MagicMock(spec_set=VerdictLedgerService)
+    mock_verdict_ledger_service.get_verdict.return_value = None
+    return mock_verdict_ledger_service
+
+
 @pytest.fixture()
 def options():
     mock_options = MagicMock(
@@ -34,23 +64,33 @@ def options():
         timeout_secs=None,
         branch_name=None,
         output_format=OutputFormat.PLAINTEXT,
+        search_window=1,
+        use_version_index=False,
     )
     mock_options.lookback_limit_hit.return_value = False
     return mock_options
 
 
 @pytest.fixture()
-def search_service(evg_api, evg_service, options):
-    service = under_test.SearchService(evg_api, evg_service, options)
+def search_service(evg_api, evg_service, version_index_service, verdict_ledger_service, options):
+    service = under_test.SearchService(
+        evg_api,
+        evg_service,
+        version_index_service,
+        verdict_ledger_service,
+        ProfileService(),
+        options,
+    )
     return service
 
 
 class TestFindRevision:
     def test_find_revision_should_use_progressbar_for_plaintext(self, search_service):
-        def assert_progress_bar(bar, _checks):
+        def assert_progress_bar(bar, _checks, _reachable_revisions, _max_revisions):
             assert isinstance(bar, ProgressBar)
+            return []
 
-        search_service._find_stable_revision = assert_progress_bar
+        search_service._find_stable_revisions = assert_progress_bar
 
         search_service.find_revision("project", [])
 
@@ -58,45 +98,277 @@ class TestFindRevision:
     def test_find_revision_should_not_use_progressbar_for_non_plaintest(
         self, format, search_service, options
     ):
-        def assert_no_progress_bar(bar, _checks):
+        def assert_no_progress_bar(bar, _checks, _reachable_revisions, _max_revisions):
             assert not isinstance(bar, ProgressBar)
+            return []
 
         options.output_format = format
-        search_service._find_stable_revision = assert_no_progress_bar
+        search_service._find_stable_revisions = assert_no_progress_bar
 
         search_service.find_revision("project", [])
 
 
 class TestFindStableRevision:
-    def test_a_good_revision_should_be_returned(self, search_service, evg_service):
+    def test_a_good_revision_should_be_returned(self, search_service, version_passes):
         version_list = [MagicMock(spec=Version, revision=f"abc_{i}") for i in range(20)]
         checks = [MagicMock(spec=BuildChecks)]
-        evg_service.check_version.side_effect = [False, False, False, True, True, False]
+        version_passes.side_effect = [False, False, False, True, True, False]
 
-        revision = search_service._find_stable_revision(version_list, checks)
+        revisions = search_service._find_stable_revisions(version_list, checks)
 
-        assert version_list[3].revision == revision
-        evg_service.check_version.assert_any_call(version_list[0], checks)
+        assert revisions == [version_list[3].revision]
+        version_passes.assert_any_call(version_list[0], checks)
 
-    def test_no_good_revision_should_be_return_none(self, search_service, evg_service):
+    def test_no_good_revision_should_be_return_none(self, search_service, version_passes):
         version_list = [MagicMock(spec=Version, revision=f"abc_{i}") for i in range(20)]
         checks = [MagicMock(spec=BuildChecks)]
-        evg_service.check_version.return_value = False
+        version_passes.return_value = False
 
-        revision = search_service._find_stable_revision(version_list, checks)
+        revisions = search_service._find_stable_revisions(version_list, checks)
 
-        assert revision is None
-        evg_service.check_version.assert_any_call(version_list[0], checks)
+        assert revisions == []
+        version_passes.assert_any_call(version_list[0], checks)
 
     def test_no_good_revision_before_limit_should_be_return_none(
-        self, search_service, evg_service, options
+        self, search_service, options, version_passes
+    ):
+        version_list = [MagicMock(spec=Version, revision=f"abc_{i}") for i in range(20)]
+        checks = [MagicMock(spec=BuildChecks)]
+        version_passes.side_effect = [False, False, False, True, True, False]
+        options.lookback_limit_hit.side_effect = [False, False, True]
+
+        revisions = search_service._find_stable_revisions(version_list, checks)
+
+        assert revisions == []
+        version_passes.assert_any_call(version_list[0], checks)
+
+
+class TestReachableRevisions:
+    @pytest.mark.parametrize("search_window", [1, 4])
+    def test_unreachable_versions_should_not_be_checked(
+        self, search_service, options, search_window, version_passes
+    ):
+        options.search_window = search_window
+        version_list = [MagicMock(spec=Version, revision=f"abc_{i}") for i in range(20)]
+        checks = [MagicMock(spec=BuildChecks)]
+        version_passes.side_effect = lambda v, _: v.revision in {"abc_2", "abc_5"}
+
+        revisions = search_service._find_stable_revisions(
+            version_list, checks, {"abc_0", "abc_1", "abc_5"}
+        )
+
+        assert revisions == ["abc_5"]
+        checked = {c.args[0].revision for c in version_passes.call_args_list}
+        assert checked == {"abc_0", "abc_1", "abc_5"}
+
+    def test_unreachable_versions_should_count_towards_lookback(
+        self, search_service, options, version_passes
     ):
         version_list = [MagicMock(spec=Version, revision=f"abc_{i}") for i in range(20)]
         checks = [MagicMock(spec=BuildChecks)]
-        evg_service.check_version.side_effect = [False, False, False, True, True, False]
+        version_passes.return_value = True
         options.lookback_limit_hit.side_effect = [False, False, True]
 
-        revision = search_service._find_stable_revision(version_list, checks)
+        revisions = search_service._find_stable_revisions(version_list, checks, {"abc_5"})
+
+        assert revisions == []
+        version_passes.assert_not_called()
+
+
+class TestFindStableRevisionWindowed:
+    def test_newest_passing_revision_should_be_returned(
+        self, search_service, options, version_passes
+    ):
+        options.search_window = 4
+        version_list = [MagicMock(spec=Version, revision=f"abc_{i}") for i in range(20)]
+        checks = [MagicMock(spec=BuildChecks)]
+        passing = {"abc_5", "abc_6", "abc_9"}
+        version_passes.side_effect = lambda v, _: v.revision in passing
+
+        revisions = search_service._find_stable_revisions(version_list, checks)
+
+        assert revisions == ["abc_5"]
+
+    def test_no_good_revision_should_return_none(self, search_service, options, version_passes):
+        options.search_window = 4
+        version_list = [MagicMock(spec=Version, revision=f"abc_{i}") for i in range(20)]
+        checks = [MagicMock(spec=BuildChecks)]
+        version_passes.return_value = False
+
+        revisions = search_service._find_stable_revisions(version_list, checks)
+
+        assert revisions == []
+        assert version_passes.call_count == 20
+
+    def test_versions_past_limit_should_not_be_checked(
+        self, search_service, options, version_passes
+    ):
+        options.search_window = 4
+        version_list = [MagicMock(spec=Version, revision=f"abc_{i}") for i in range(20)]
+        checks = [MagicMock(spec=BuildChecks)]
+        version_passes.return_value = False
+        options.lookback_limit_hit.side_effect = lambda idx, _rev, _secs: idx >= 6
+
+        revisions = search_service._find_stable_revisions(version_list, checks)
+
+        assert revisions == []
+        assert version_passes.call_count == 6
+
+    def test_window_should_not_read_far_past_passing_revision(
+        self, search_service, options, version_passes
+    ):
+        options.search_window = 3
+        version_list = [MagicMock(spec=Version, revision=f"abc_{i}") for i in range(20)]
+        checks = [MagicMock(spec=BuildChecks)]
+        version_passes.side_effect = lambda v, _: v.revision == "abc_0"
+
+        revisions = search_service._find_stable_revisions(version_list, checks)
+
+        assert revisions == ["abc_0"]
+        assert version_passes.call_count <= 3
+
+    def test_running_checks_should_be_stopped_without_waiting_for_them(
+        self, search_service, evg_service, options
+    ):
+        options.search_window = 3
+        version_list = [MagicMock(spec=Version, revision=f"abc_{i}") for i in range(20)]
+        release = Event()
+        started = []
+        stopped = []
+
+        def evaluate_version(evg_version, _checks, stop):
+            started.append(evg_version.revision)
+            if evg_version.revision != "abc_0":
+                release.wait(5)
+                stopped.append(stop.is_set())
+            return VersionEvaluation(passed=evg_version.revision == "abc_0", final=False)
+
+        evg_service.evaluate_version.side_effect = evaluate_version
+
+        try:
+            revisions = search_service._find_stable_revisions(version_list, [])
+
+            assert revisions == ["abc_0"]
+            assert stopped == []
+        finally:
+            release.set()
+
+        deadline = perf_counter() + 5
+        while len(stopped) < len(started) - 1 and perf_counter() < deadline:
+            sleep(0.01)
+        assert stopped == [True] * (len(started) - 1)
+
+    def test_cached_versions_should_be_evaluated_without_a_worker(
+        self, search_service, evg_service, verdict_ledger_service, options, version_passes
+    ):
+        options.search_window = 4
+        version_list = [
+            MagicMock(spec=Version, revision=f"abc_{i}", version_id=f"v_{i}") for i in range(20)
+        ]
+        verdict_ledger_service.get_verdict.return_value = None
+        evg_service.evaluate_cached_versions.side_effect = lambda versions, _: {
+            v.version_id: VersionEvaluation(passed=v.revision == "abc_2", final=True)
+            for v in versions
+            if v.revision in {"abc_1", "abc_2"}
+        }
+
+        revisions = search_service._find_stable_revisions(version_list, [])
+
+        assert revisions == ["abc_2"]
+        evaluated = [c.args[0].revision for c in evg_service.evaluate_version.call_args_list]
+        assert "abc_0" in evaluated
+        assert "abc_1" not in evaluated
+        assert "abc_2" not in evaluated
+        verdict_ledger_service.record.assert_any_call(
+            criteria_fingerprint([]), "v_1", VersionEvaluation(passed=False, final=True)
+        )
+
+
+class TestFindStableRevisions:
+    @pytest.mark.parametrize("search_window", [1, 4])
+    def test_newest_passing_revisions_should_be_returned_in_order(
+        self, search_service, options, search_window, version_passes
+    ):
+        options.search_window = search_window
+        version_list = [MagicMock(spec=Version, revision=f"abc_{i}") for i in range(20)]
+        checks = [MagicMock(spec=BuildChecks)]
+        passing = {"abc_3", "abc_5", "abc_6", "abc_9"}
+        version_passes.side_effect = lambda v, _: v.revision in passing
+
+        revisions = search_service._find_stable_revisions(version_list, checks, None, 3)
+
+        assert revisions == ["abc_3", "abc_5", "abc_6"]
+
+    @pytest.mark.parametrize("search_window", [1, 4])
+    def test_passing_revisions_found_before_limit_should_be_returned(
+        self, search_service, options, search_window, version_passes
+    ):
+        options.search_window = search_window
+        version_list = [MagicMock(spec=Version, revision=f"abc_{i}") for i in range(20)]
+        checks = [MagicMock(spec=BuildChecks)]
+        passing = {"abc_3", "abc_5", "abc_9"}
+        version_passes.side_effect = lambda v, _: v.revision in passing
+        options.lookback_limit_hit.side_effect = lambda idx, _rev, _secs: idx >= 8
+
+        revisions = search_service._find_stable_revisions(version_list, checks, None, 3)
+
+        assert revisions == ["abc_3", "abc_5"]
+
+
+def build_version(revision, build_summaries):
+    return Version(
+        {"revision": revision, "build_variants_status": build_summaries},
+        MagicMock(spec_set=EvergreenApi),
+    )
+
+
+class TestCheckVersionWithLedger:
+    @pytest.mark.parametrize("verdict", [True, False])
+    def test_recorded_verdict_should_be_used_without_querying_evergreen(
+        self, search_service, evg_service, verdict_ledger_service, verdict
+    ):
+        verdict_ledger_service.get_verdict.return_value = verdict
+        evg_version = build_version("abc", [])
+        checks = [BuildChecks(build_variant_regex=[".*-required$"], success_threshold=0.9)]
+
+        assert search_service._check_version(evg_version, checks) == verdict
+        evg_service.evaluate_version.assert_not_called()
+
+    def test_versions_without_verdict_should_be_evaluated_and_recorded(
+        self, search_service, evg_service, verdict_ledger_service
+    ):
+        evaluation = VersionEvaluation(passed=True, final=True)
+        evg_service.evaluate_version.side_effect = None
+        evg_service.evaluate_version.return_value = evaluation
+        evg_version = build_version("abc", [])
+        checks = [BuildChecks(build_variant_regex=[".*-required$"], success_threshold=0.9)]
+
+        assert search_service._check_version(evg_version, checks)
+        verdict_ledger_service.record.assert_called_once_with(
+            criteria_fingerprint(checks), evg_version.version_id, evaluation
+        )
+
+    def test_rejected_versions_should_not_take_a_slot_in_the_window(
+        self, search_service, verdict_ledger_service, options
+    ):
+        options.search_window = 2
+        version_list = [
+            MagicMock(spec=Version, revision=f"abc_{i}", version_id=f"v_{i}") for i in range(10)
+        ]
+        verdict_ledger_service.get_verdict.side_effect = lambda _, v: False if v < "v_5" else None
+        search_service._check_version = MagicMock(return_value=True)
+
+        revisions = search_service._find_stable_revisions(version_list, [])
+
+        assert revisions == ["abc_5"]
+        assert search_service._check_version.call_count <= 2
+
+    def test_verdicts_should_be_saved_after_search(
+        self, search_service, verdict_ledger_service, options
+    ):
+        options.output_format = OutputFormat.JSON
+        search_service._find_stable_revisions = MagicMock(return_value=[])
+
+        search_service.find_revision("project", [])
 
-        assert revision is None
-        evg_service.check_version.assert_any_call(version_list[0], checks)
+        verdict_ledger_service.save.assert_called_once()
@@ -0,0 +1,70 @@
+"""Unit tests for stats_service.py."""
+import pytest
+
+import goodbase.services.stats_service as under_test
+
+
+@pytest.fixture()
+def stats_service():
+    return under_test.StatsService(enabled=True)
+
+
+class TestRecordResponse:
+    def test_responses_should_be_counted_by_endpoint(self, stats_service):
+        stats_service.record_response("/rest/v2/builds/{id}", 200, 100, 0.005)
+        stats_service.record_response("/rest/v2/builds/{id}", 500, 50, 0.2)
+        stats_service.record_response("/rest/v2/projects", 200, 10, 20.0)
+
+        stats = stats_service.as_dict()
+
+        builds = stats["endpoints"]["/rest/v2/builds/{id}"]
+        assert builds["requests"] == 2
+        assert builds["errors"] == 1
+        assert builds["bytes_received"] == 150
+        assert builds["latency_histogram"]["<=10ms"] == 1
+        assert builds["latency_histogram"]["<=250ms"] == 1
+        assert stats["requests"] == 3
+        assert stats["errors"] == 1
+        assert stats["bytes_received"] == 160
+        assert stats["latency_histogram"][">10000ms"] == 1
+
+    def test_latency_on_bucket_boundary_should_be_in_that_bucket(self, stats_service):
+        stats_service.record_response("/rest/v2/projects", 200, 10, 0.1)
+
+        assert stats_service.as_dict()["latency_histogram"]["<=100ms"] == 1
+
+    def test_nothing_should_be_counted_when_disabled(self):
+        stats_service = under_test.StatsService()
+
+        stats_service.record_response("/rest/v2/projects", 200, 10, 0.1)
+        stats_service.record_retries("/rest/v2/projects", 2)
+        stats_service.record_cache_lookup("namespace", hit=True)
+
+        stats = stats_service.as_dict()
+        assert stats["requests"] == 0
+        assert stats["endpoints"] == {}
+        assert stats["cache"] == {}
+
+
+class TestRecordRetries:
+    def test_retries_should_be_added_to_endpoint(self, stats_service):
+        stats_service.record_retries("/rest/v2/builds/{id}", 1)
+        stats_service.record_retries("/rest/v2/builds/{id}", 2)
+
+        stats = stats_service.as_dict()
+
+        assert stats["endpoints"]["/rest/v2/builds/{id}"]["retries"] == 3
+        assert stats["retries"] == 3
+
+
+class TestRecordCacheLookup:
+    def test_hits_and_misses_should_be_counted_by_namespace(self, stats_service):
+        stats_service.record_cache_lookup("builds", hit=True)
+        stats_service.record_cache_lookup("builds", hit=False)
+        stats_service.record_cache_lookup("builds", hit=True)
+        stats_service.record_cache_lookup("verdicts", hit=False)
+
+        assert stats_service.as_dict()["cache"] == {
+            "builds": {"hits": 2, "misses": 1},
+            "verdicts": {"hits": 0, "misses": 1},
+        }
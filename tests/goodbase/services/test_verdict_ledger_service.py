@@ -0,0 +1,68 @@
+"""Unit tests for verdict_ledger_service.py."""
+import pytest
+
+import goodbase.services.verdict_ledger_service as under_test
+from goodbase.models.version_evaluation import VersionEvaluation
+from goodbase.services.cache_service import CacheService
+
+
+@pytest.fixture()
+def cache_service(tmp_path):
+    return CacheService(cache_dir=tmp_path / "cache")
+
+
+@pytest.fixture()
+def verdict_ledger_service(cache_service):
+    return under_test.VerdictLedgerService(cache_service)
+
+
+class TestRecord:
+    @pytest.mark.parametrize("passed", [True, False])
+    def test_final_verdicts_should_be_available_to_later_executions(
+        self, verdict_ledger_service, cache_service, passed
+    ):
+        verdict_ledger_service.record(
+            "fingerprint", "version", VersionEvaluation(passed=passed, final=True)
+        )
+        verdict_ledger_service.save()
+
+        later_service = under_test.VerdictLedgerService(cache_service)
+
+        assert later_service.get_verdict("fingerprint", "version") == passed
+        assert later_service.get_verdict("other fingerprint", "version") is None
+        assert later_service.get_verdict("fingerprint", "other version") is None
+
+    def test_verdicts_that_can_change_should_not_be_recorded(self, verdict_ledger_service):
+        verdict_ledger_service.record(
+            "fingerprint", "version", VersionEvaluation(passed=False, final=False)
+        )
+
+        assert verdict_ledger_service.get_verdict("fingerprint", "version") is None
+
+    def test_saving_should_keep_verdicts_saved_by_other_executions(self, cache_service):
+        service_1 = under_test.VerdictLedgerService(cache_service)
+        service_2 = under_test.VerdictLedgerService(cache_service)
+        service_1.get_verdict("fingerprint", "version 1")
+        service_2.get_verdict("fingerprint", "version 1")
+
+        service_1.record("fingerprint", "version 1", VersionEvaluation(passed=True, final=True))
+        service_2.record("fingerprint", "version 2", VersionEvaluation(passed=False, final=True))
+        service_1.save()
+        service_2.save()
+
+        later_service = under_test.VerdictLedgerService(cache_service)
+        assert later_service.get_verdict("fingerprint", "version 1") is True
+        assert later_service.get_verdict("fingerprint", "version 2") is False
+
+    def test_ledger_should_be_capped(self, verdict_ledger_service, cache_service, monkeypatch):
+        monkeypatch.setattr(under_test, "MAX_VERDICTS", 3)
+        for i in range(5):
+            verdict_ledger_service.record(
+                "fingerprint", f"version {i}", VersionEvaluation(passed=False, final=True)
+            )
+
+        verdict_ledger_service.save()
+
+        later_service = under_test.VerdictLedgerService(cache_service)
+        assert later_service.get_verdict("fingerprint", "version 1") is None
+        assert later_service.get_verdict("fingerprint", "version 4") is False
@@ -0,0 +1,167 @@
+"""Unit tests for version_index_service.py."""
+from unittest.mock import MagicMock
+
+import pytest
+from evergreen import EvergreenApi, Version
+
+import goodbase.services.version_index_service as under_test
+from goodbase.services.cache_service import CacheService
+
+
+def build_version(order, evg_api):
+    return Version(
+        {
+            "version_id": f"version_{order}",
+            "revision": f"abc_{order}",
+            "order": order,
+            "project": "project",
+            "build_variants_status": [
+                {"build_variant": "bv", "build_id": f"build_{order}", "activated": False}
+            ],
+        },
+        evg_api,
+    )
+
+
+@pytest.fixture()
+def evg_api():
+    return MagicMock(spec_set=EvergreenApi)
+
+
+@pytest.fixture()
+def version_index_service(evg_api, tmp_path):
+    return under_test.VersionIndexService(evg_api, CacheService(cache_dir=tmp_path / "cache"))
+
+
+def serve_versions(evg_api, newest, oldest):
+    def versions_by_project(project_id, start=None):
+        first = newest if start is None else start - 1
+        return (build_version(order, evg_api) for order in range(first, oldest - 1, -1))
+
+    evg_api.versions_by_project.side_effect = versions_by_project
+
+
+class TestVersions:
+    def test_versions_should_be_fetched_from_evergreen_without_an_index(
+        self, version_index_service, evg_api
+    ):
+        serve_versions(evg_api, 10, 1)
+
+        versions = list(version_index_service.versions("project"))
+
+        assert [v.order for v in versions] == list(range(10, 0, -1))
+
+    def test_saved_index_should_only_need_new_versions_from_evergreen(
+        self, version_index_service, evg_api
+    ):
+        serve_versions(evg_api, 10, 1)
+        for _ in zip(range(5), version_index_service.versions("project")):
+            pass
+        version_index_service.save("project")
+        serve_versions(evg_api, 12, 1)
+
+        versions = list(version_index_service.versions("project"))
+
+        assert [v.order for v in versions] == list(range(12, 0, -1))
+        fetched_orders = [c.kwargs.get("start") for c in evg_api.versions_by_project.mock_calls]
+        assert fetched_orders == [None, None, 6]
+
+    def test_indexed_versions_should_not_include_mutable_build_data(
+        self, version_index_service, evg_api
+    ):
+        serve_versions(evg_api, 3, 1)
+        list(version_index_service.versions("project"))
+        version_index_service.save("project")
+        serve_versions(evg_api, 3, 1)
+
+        versions = list(version_index_service.versions("project"))
+
+        build_summary = versions[-1].build_variants_status[0]
+        assert build_summary.build_id == "build_1"
+        assert "activated" not in build_summary.json
+
+    def test_index_should_be_capped(self, version_index_service, evg_api, monkeypatch):
+        monkeypatch.setattr(under_test, "MAX_INDEXED_VERSIONS", 3)
+        serve_versions(evg_api, 10, 1)
+        list(version_index_service.versions("project"))
+
+        version_index_service.save("project")
+
+        saved = version_index_service._load("project")
+        assert [v["order"] for v in saved.versions] == [10, 9, 8]
+
+
+class TestRefresh:
+    def test_refresh_should_only_page_through_new_versions(self, version_index_service, evg_api):
+        serve_versions(evg_api, 10, 1)
+        list(version_index_service.versions("project"))
+        version_index_service.save("project")
+        serve_versions(evg_api, 13, 1)
+
+        new_versions = version_index_service.refresh("project")
+
+        assert new_versions == 3
+        assert [v["order"] for v in version_index_service._load("project").versions] == list(
+            range(13, 0, -1)
+        )
+        assert evg_api.versions_by_project.call_count == 2
+
+
+class TestGaps:
+    def test_index_should_be_kept_when_search_stops_before_reaching_it(
+        self, version_index_service, evg_api
+    ):
+        serve_versions(evg_api, 10, 1)
+        list(version_index_service.versions("project"))
+        version_index_service.save("project")
+        serve_versions(evg_api, 30, 1)
+
+        for _ in zip(range(5), version_index_service.versions("project")):
+            pass
+        version_index_service.save("project")
+
+        saved = version_index_service._load("project")
+        assert [v["order"] for v in saved.versions] == list(range(30, 25, -1)) + list(
+            range(10, 0, -1)
+        )
+        assert saved.gaps == ["version_10"]
+
+    def test_gap_should_be_paged_through_before_using_older_versions(
+        self, version_index_service, evg_api
+    ):
+        serve_versions(evg_api, 10, 1)
+        list(version_index_service.versions("project"))
+        version_index_service.save("project")
+        serve_versions(evg_api, 30, 1)
+        for _ in zip(range(5), version_index_service.versions("project")):
+            pass
+        version_index_service.save("project")
+        serve_versions(evg_api, 32, 1)
+
+        versions = list(version_index_service.versions("project"))
+
+        assert [v.order for v in versions] == list(range(32, 0, -1))
+        fetched_orders = [c.kwargs.get("start") for c in evg_api.versions_by_project.mock_calls]
+        assert fetched_orders[-3:] == [None, 26, 1]
+        version_index_service.save("project")
+        saved = version_index_service._load("project")
+        assert [v["order"] for v in saved.versions] == list(range(32, 0, -1))
+        assert saved.gaps == []
+
+
+class TestSave:
+    def test_scans_saved_by_other_threads_should_be_kept(self, evg_api, tmp_path):
+        cache_service = CacheService(cache_dir=tmp_path / "cache")
+        serve_versions(evg_api, 10, 1)
+        first = under_test.VersionIndexService(evg_api, cache_service)
+        for _ in zip(range(3), first.versions("project")):
+            pass
+        second = under_test.VersionIndexService(evg_api, cache_service)
+        list(second.versions("project"))
+        second.save("project")
+
+        first.save("project")
+
+        saved = first._load("project")
+        assert [v["order"] for v in saved.versions] == list(range(10, 0, -1))
+        assert saved.gaps == []
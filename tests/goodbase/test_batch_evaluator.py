@@ -0,0 +1,119 @@
+"""Unit tests for batch_evaluator.py."""
+import random
+
+import pytest
+
+from goodbase.build_checker import BuildChecks
+from goodbase.models.build_status import BuildStatus, TaskCounts
+
+pytest.importorskip("numpy")
+
+import goodbase.batch_evaluator as under_test  # noqa: E402
+
+TASKS = [f"task {i}" for i in range(12)]
+VARIANTS = ["linux-required", "windows-required", "macos", "arm"]
+CRITERIA = [
+    [BuildChecks(build_variant_regex=[".*-required$"], success_threshold=0.7)],
+    [BuildChecks(build_variant_regex=[".*"], run_threshold=0.6)],
+    [BuildChecks(build_variant_regex=["^linux", "^mac"], successful_tasks={"task 1", "task 3"})],
+    [BuildChecks(build_variant_regex=[".*"], active_tasks={"task 2", "not a task"})],
+    [
+        BuildChecks(build_variant_regex=[".*-required$"], success_threshold=0.5),
+        BuildChecks(build_variant_regex=["^arm$"], run_threshold=0.8, active_tasks={"task 4"}),
+    ],
+]
+
+
+def random_build_status(rng, build_variant):
+    all_tasks = set(rng.sample(TASKS, rng.randint(1, len(TASKS))))
+    successful_tasks = {task for task in all_tasks if rng.random() < 0.8}
+    inactive_tasks = {task for task in all_tasks - successful_tasks if rng.random() < 0.5}
+    return BuildStatus(
+        build_name=build_variant,
+        build_variant=build_variant,
+        successful_tasks=successful_tasks,
+        inactive_tasks=inactive_tasks,
+        all_tasks=all_tasks,
+    )
+
+
+def random_versions(seed, n_versions=50):
+    rng = random.Random(seed)
+    return [
+        [random_build_status(rng, bv) for bv in VARIANTS if rng.random() < 0.9]
+        for _ in range(n_versions)
+    ]
+
+
+def evaluate(build_checks, version_statuses):
+    evaluator = under_test.BatchEvaluator(build_checks)
+    matrix = under_test.BuildMatrix.from_build_statuses(version_statuses, evaluator.task_names())
+    return list(evaluator.evaluate(matrix))
+
+
+class TestBatchEvaluator:
+    @pytest.mark.parametrize("build_checks", CRITERIA)
+    @pytest.mark.parametrize("seed", range(5))
+    def test_results_should_match_checking_each_build(self, build_checks, seed):
+        version_statuses = random_versions(seed)
+
+        expected = [
+            all(bc.check(bs) for bs in build_statuses for bc in build_checks)
+            for build_statuses in version_statuses
+        ]
+
+        assert evaluate(build_checks, version_statuses) == expected
+
+    def test_required_tasks_should_only_apply_when_in_build(self):
+        build_checks = [BuildChecks(build_variant_regex=[".*"], successful_tasks={"task 0"})]
+        version_statuses = [
+            [BuildStatus("b", "bv", {"task 1"}, set(), {"task 1", "task 2"})],
+            [BuildStatus("b", "bv", {"task 1"}, set(), {"task 0", "task 1"})],
+        ]
+
+        assert evaluate(build_checks, version_statuses) == [True, False]
+
+    def test_count_only_builds_should_use_counts_for_thresholds(self):
+        build_checks = [BuildChecks(build_variant_regex=[".*"], success_threshold=0.9)]
+        version_statuses = [
+            [BuildStatus.from_counts("b", "bv", TaskCounts(successful=9, inactive=0, total=10))],
+            [BuildStatus.from_counts("b", "bv", TaskCounts(successful=8, inactive=0, total=10))],
+        ]
+
+        assert evaluate(build_checks, version_statuses) == [True, False]
+
+    def test_count_only_builds_should_not_be_checked_for_named_tasks(self):
+        build_checks = [BuildChecks(build_variant_regex=[".*"], successful_tasks={"task 0"})]
+        version_statuses = [
+            [BuildStatus.from_counts("b", "bv", TaskCounts(successful=9, inactive=0, total=10))]
+        ]
+
+        with pytest.raises(ValueError):
+            evaluate(build_checks, version_statuses)
+
+    def test_matrix_without_task_data_should_be_rejected(self):
+        evaluator = under_test.BatchEvaluator(
+            [BuildChecks(build_variant_regex=[".*"], successful_tasks={"task 0"})]
+        )
+        matrix = under_test.BuildMatrix.from_build_statuses(random_versions(0))
+
+        with pytest.raises(ValueError):
+            evaluator.evaluate(matrix)
+
+
+class TestEvaluateVersions:
+    @pytest.mark.parametrize("build_checks", CRITERIA)
+    def test_results_should_match_batch_evaluation(self, build_checks):
+        version_statuses = random_versions(0)
+
+        assert under_test.evaluate_versions(build_checks, version_statuses) == evaluate(
+            build_checks, version_statuses
+        )
+
+    @pytest.mark.parametrize("build_checks", CRITERIA)
+    def test_builds_should_be_checked_one_by_one_without_numpy(self, build_checks, monkeypatch):
+        version_statuses = random_versions(0)
+        expected = evaluate(build_checks, version_statuses)
+        monkeypatch.setattr(under_test, "np", None)
+
+        assert under_test.evaluate_versions(build_checks, version_statuses) == expected
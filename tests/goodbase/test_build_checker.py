@@ -1,8 +1,10 @@
 """Unit tests for build_checker.py."""
+from unittest.mock import MagicMock
 
+import pytest
 
 import goodbase.build_checker as under_test
-from goodbase.models.build_status import BuildStatus
+from goodbase.models.build_status import BuildStatus, TaskCounts
 
 
 class TestSuccessThreshold:
@@ -219,3 +221,142 @@ class TestActiveTasks:
         )
 
         assert not checker.check(build_status)
+
+
+class TestTaskCountsOnly:
+    def test_thresholds_can_be_checked_with_counts(self):
+        build_status = BuildStatus.from_counts(
+            build_name="my build",
+            build_variant="my_build",
+            task_counts=TaskCounts(successful=9, inactive=0, total=10),
+        )
+        checker = under_test.BuildChecks(
+            build_variant_regex=["my_build"], success_threshold=0.9, run_threshold=1.0
+        )
+
+        assert checker.check(build_status)
+
+    def test_named_tasks_cannot_be_checked_with_counts(self):
+        build_status = BuildStatus.from_counts(
+            build_name="my build",
+            build_variant="my_build",
+            task_counts=TaskCounts(successful=9, inactive=0, total=10),
+        )
+        checker = under_test.BuildChecks(build_variant_regex=["my_build"], active_tasks={"task 0"})
+
+        with pytest.raises(ValueError):
+            checker.check(build_status)
+
+
+class TestGuaranteesRejection:
+    @pytest.mark.parametrize(
+        "checks,activated,status",
+        [
+            ({"success_threshold": 0.5}, False, "created"),
+            ({"run_threshold": 0.5}, False, "created"),
+            ({"success_threshold": 0.5}, True, "created"),
+        ],
+    )
+    def test_version_state_should_guarantee_rejection(self, checks, activated, status):
+        checker = under_test.BuildChecks(build_variant_regex=["my_build"], **checks)
+
+        assert checker.guarantees_rejection(activated, status)
+
+    @pytest.mark.parametrize(
+        "checks,activated,status",
+        [
+            ({"success_threshold": 0.5}, None, None),
+            ({"success_threshold": 0.5}, True, "started"),
+            ({"run_threshold": 0.5}, True, "created"),
+            ({"successful_tasks": {"task 0"}}, False, "created"),
+            ({"active_tasks": {"task 0"}}, False, "created"),
+        ],
+    )
+    def test_version_state_should_not_guarantee_rejection(self, checks, activated, status):
+        checker = under_test.BuildChecks(build_variant_regex=["my_build"], **checks)
+
+        assert not checker.guarantees_rejection(activated, status)
+
+
+class TestCriteriaFingerprint:
+    def test_fingerprint_should_not_depend_on_order(self):
+        checks_a = under_test.BuildChecks(
+            build_variant_regex=["a", "b"], successful_tasks={"t1", "t2", "t3"}
+        )
+        checks_b = under_test.BuildChecks(build_variant_regex=["c"], success_threshold=0.9)
+
+        assert under_test.criteria_fingerprint(
+            [checks_a, checks_b]
+        ) == under_test.criteria_fingerprint([checks_b, checks_a])
+
+    def test_different_criteria_should_have_different_fingerprints(self):
+        checks_a = under_test.BuildChecks(build_variant_regex=["a"], success_threshold=0.9)
+        checks_b = under_test.BuildChecks(build_variant_regex=["a"], success_threshold=0.95)
+
+        assert under_test.criteria_fingerprint([checks_a]) != under_test.criteria_fingerprint(
+            [checks_b]
+        )
+
+
+class TestCriteriaMatcher:
+    def test_applicable_checks_should_match_should_apply(self):
+        checks = [
+            under_test.BuildChecks(build_variant_regex=[".*-required$"], success_threshold=0.9),
+            under_test.BuildChecks(build_variant_regex=["^linux", "^windows"], run_threshold=0.5),
+            under_test.BuildChecks(build_variant_regex=["(?i)MACOS"], run_threshold=0.5),
+        ]
+        matcher = under_test.CriteriaMatcher(checks)
+
+        for build_variant in ["linux-required", "windows", "macos", "other", "other-required-not"]:
+            assert matcher.applicable(build_variant) == [
+                bc for bc in checks if bc.should_apply(build_variant)
+            ]
+
+    def test_backreferences_should_match_their_own_groups(self):
+        checks = under_test.BuildChecks(
+            build_variant_regex=["^(linux)-required$", r"^(\w+)-\1$"], run_threshold=0.5
+        )
+        matcher = under_test.CriteriaMatcher([checks])
+
+        for build_variant in ["linux-required", "macos-macos", "macos-linux", "linux-linux"]:
+            assert matcher.applies_to(build_variant) == checks.should_apply(build_variant)
+        assert matcher.applies_to("macos-macos")
+        assert not matcher.applies_to("macos-linux")
+
+    def test_regexes_should_only_run_once_per_build_variant(self, monkeypatch):
+        checks = under_test.BuildChecks(build_variant_regex=["^linux"], run_threshold=0.5)
+        variant_matcher = MagicMock(side_effect=checks.compile_variant_matcher())
+        matcher = under_test.CriteriaMatcher([checks])
+        monkeypatch.setattr(matcher, "_variant_matchers", [variant_matcher])
+
+        for _ in range(10):
+            matcher.applicable("linux")
+            matcher.applicable("windows")
+
+        assert variant_matcher.call_count == 2
+
+    def test_check_should_only_apply_matching_criteria(self):
+        matcher = under_test.CriteriaMatcher(
+            [
+                under_test.BuildChecks(build_variant_regex=["^my_build$"], success_threshold=0.9),
+                under_test.BuildChecks(build_variant_regex=["^other$"], success_threshold=1.0),
+            ]
+        )
+        build_status = BuildStatus(
+            build_name="my build",
+            build_variant="my_build",
+            successful_tasks={f"task {i}" for i in range(19)},
+            inactive_tasks=set(),
+            all_tasks={f"task {i}" for i in range(20)},
+        )
+
+        assert matcher.check(build_status)
+
+    def test_of_should_reuse_compiled_matcher(self):
+        matcher = under_test.CriteriaMatcher(
+            [under_test.BuildChecks(build_variant_regex=[".*"], success_threshold=0.9)]
+        )
+
+        assert under_test.CriteriaMatcher.of(matcher) is matcher
+        assert under_test.CriteriaMatcher.of(list(matcher)) == matcher
+        assert matcher.fingerprint() == under_test.criteria_fingerprint(list(matcher))
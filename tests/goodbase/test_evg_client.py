@@ -0,0 +1,138 @@
+"""Unit tests for evg_client.py."""
+import json
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+
+import pytest
+import requests
+from evergreen import RetryingEvergreenApi
+from tenacity import wait_none
+
+import goodbase.evg_client as under_test
+from goodbase.services.profile_service import ENDPOINT, ProfileService
+from goodbase.services.stats_service import StatsService
+
+
+class JsonHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    failures_left = 0
+
+    def do_GET(self):
+        body = json.dumps({"path": self.path}).encode()
+        status = 200
+        if JsonHandler.failures_left > 0:
+            JsonHandler.failures_left -= 1
+            status = 503
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture()
+def no_retry_wait(monkeypatch):
+    monkeypatch.setattr(RetryingEvergreenApi._call_api.retry, "wait", wait_none())
+
+
+@pytest.fixture()
+def server_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), JsonHandler)
+    thread = Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    JsonHandler.failures_left = 0
+    server.shutdown()
+    server.server_close()
+
+
+class TestConnectionPoolSize:
+    def test_pool_should_cover_requesters_outside_the_workers(self):
+        assert under_test.connection_pool_size(16) == 16 + under_test.EXTRA_REQUESTERS
+
+
+def build_response(content, headers):
+    response = requests.Response()
+    response._content = content
+    response.headers.update(headers)
+    return response
+
+
+class TestResponseSize:
+    def test_content_length_should_be_used_when_given(self):
+        # Compressed bodies are sent smaller than they are once decoded.
+        response = build_response(b"x" * 100, {"Content-Length": "40"})
+
+        assert under_test.response_size(response) == 40
+
+    @pytest.mark.parametrize("headers", [{}, {"Content-Length": "unknown"}])
+    def test_body_size_should_be_used_without_content_length(self, headers):
+        response = build_response(b"x" * 100, headers)
+
+        assert under_test.response_size(response) == 100
+
+
+class TestPooledEvergreenApi:
+    def test_session_should_be_reused_across_calls(self, server_url):
+        evg_api = under_test.PooledEvergreenApi(pool_size=4, api_server=server_url)
+
+        assert evg_api.session is evg_api.session
+
+    def test_connections_should_be_reused(self, server_url):
+        pool_size = 4
+        evg_api = under_test.PooledEvergreenApi(pool_size=pool_size, api_server=server_url)
+
+        with ThreadPoolExecutor(max_workers=pool_size * 2) as exe:
+            responses = list(
+                exe.map(lambda i: evg_api._call_api(f"{server_url}/rest/v2/{i}"), range(50))
+            )
+
+        assert all(response.status_code == 200 for response in responses)
+        assert 0 < evg_api.connections_opened <= pool_size
+
+    def test_calls_should_be_timed_by_endpoint(self, server_url):
+        profile_service = ProfileService(enabled=True)
+        evg_api = under_test.PooledEvergreenApi(
+            pool_size=4, api_server=server_url, profile_service=profile_service
+        )
+
+        for build_id in ["build_1", "build_2"]:
+            evg_api._call_api(f"{server_url}/rest/v2/builds/{build_id}")
+
+        assert [(span.name, span.category) for span in profile_service.spans] == [
+            ("/rest/v2/builds/{id}", ENDPOINT),
+            ("/rest/v2/builds/{id}", ENDPOINT),
+        ]
+
+    def test_responses_should_be_counted_by_endpoint(self, server_url):
+        stats_service = StatsService(enabled=True)
+        evg_api = under_test.PooledEvergreenApi(
+            pool_size=4, api_server=server_url, stats_service=stats_service
+        )
+
+        for build_id in ["build_1", "build_2"]:
+            response = evg_api._call_api(f"{server_url}/rest/v2/builds/{build_id}")
+
+        stats = stats_service.as_dict()
+        assert stats["endpoints"]["/rest/v2/builds/{id}"]["requests"] == 2
+        assert stats["bytes_received"] == 2 * len(response.content)
+        assert stats["retries"] == 0
+
+    def test_retries_should_be_counted(self, server_url, no_retry_wait):
+        stats_service = StatsService(enabled=True)
+        evg_api = under_test.PooledEvergreenApi(
+            pool_size=4, api_server=server_url, stats_service=stats_service
+        )
+        JsonHandler.failures_left = 2
+
+        response = evg_api._call_api(f"{server_url}/rest/v2/builds/build_1")
+
+        stats = stats_service.as_dict()["endpoints"]["/rest/v2/builds/{id}"]
+        assert response.status_code == 200
+        assert stats["requests"] == 3
+        assert stats["errors"] == 2
+        assert stats["retries"] == 2
@@ -1,8 +1,15 @@
 """Unit tests for goodbase_cli.py."""
+from pathlib import Path
+from unittest.mock import MagicMock, call
+
 import pytest
+from plumbum import ProcessExecutionError
 
 import goodbase.goodbase_cli as under_test
-from goodbase.services.git_service import GitAction
+from goodbase.services.evg_service import EvergreenService
+from goodbase.services.git_service import GitAction, GitService
+from goodbase.services.profile_service import ProfileService
+from goodbase.services.stats_service import StatsService
 
 
 class TestLookbackLimitHit:
@@ -49,3 +56,251 @@ class TestLookbackLimitHit:
         )
 
         assert options.lookback_limit_hit(index, revision, seconds)
+
+
+@pytest.fixture()
+def orchestrator(tmp_path):
+    module_root = tmp_path / "src" / "modules"
+    for module in ["enterprise", "wtdevelop"]:
+        (module_root / module).mkdir(parents=True)
+    evg_service = MagicMock(spec_set=EvergreenService)
+    evg_service.get_module_locations.return_value = {
+        "enterprise": str(module_root),
+        "wtdevelop": str(module_root),
+        "missing": str(module_root),
+    }
+    git_service = MagicMock(spec_set=GitService)
+    git_service.fetch_revisions.return_value = {}
+    return under_test.GoodBaseOrchestrator(
+        evg_service=evg_service,
+        git_service=git_service,
+        criteria_service=MagicMock(),
+        search_service=MagicMock(),
+        cache_service=MagicMock(),
+        daemon_client=MagicMock(),
+        profile_service=ProfileService(),
+        stats_service=StatsService(),
+        options=under_test.GoodBaseOptions(
+            max_lookback=50,
+            commit_limit=None,
+            operation=GitAction.CHECKOUT,
+            override_criteria=False,
+            git_workers=3,
+        ),
+        console=MagicMock(),
+    )
+
+
+MODULE_REVISIONS = {"enterprise": "ent123", "wtdevelop": "wt456", "missing": "missing789"}
+
+
+class TestPerformGitOperations:
+    def test_all_repositories_should_be_fetched_together_before_operations(self, orchestrator):
+        module_root = Path(orchestrator.evg_service.get_module_locations.return_value["enterprise"])
+
+        errors = orchestrator.perform_git_operations("project", "base123", MODULE_REVISIONS)
+
+        assert errors == {}
+        orchestrator.git_service.fetch_revisions.assert_called_once_with(
+            {
+                None: "base123",
+                module_root / "enterprise": "ent123",
+                module_root / "wtdevelop": "wt456",
+            },
+            3,
+        )
+        orchestrator.git_service.perform_action.assert_has_calls(
+            [
+                call(GitAction.CHECKOUT, "base123", None, None, False),
+                call(GitAction.CHECKOUT, "ent123", module_root / "enterprise", None, False),
+                call(GitAction.CHECKOUT, "wt456", module_root / "wtdevelop", None, False),
+            ]
+        )
+
+    def test_repositories_that_fail_to_fetch_should_be_skipped(self, orchestrator):
+        module_root = Path(orchestrator.evg_service.get_module_locations.return_value["enterprise"])
+        orchestrator.git_service.fetch_revisions.return_value = {
+            None: ProcessExecutionError(["git", "fetch"], 1, "", ""),
+            module_root / "wtdevelop": ProcessExecutionError(["git", "fetch"], 1, "", ""),
+        }
+
+        errors = orchestrator.perform_git_operations("project", "base123", MODULE_REVISIONS)
+
+        assert set(errors) == {under_test.BASE, "wtdevelop"}
+        orchestrator.git_service.perform_action.assert_called_once_with(
+            GitAction.CHECKOUT, "ent123", module_root / "enterprise", None, False
+        )
+
+    def test_operation_errors_should_be_collected_per_repository(self, orchestrator):
+        orchestrator.git_service.perform_action.side_effect = [
+            None,
+            ProcessExecutionError(["git", "checkout"], 1, "", ""),
+            None,
+        ]
+
+        errors = orchestrator.perform_git_operations("project", "base123", MODULE_REVISIONS)
+
+        assert list(errors) == ["enterprise"]
+
+    def test_none_operation_should_not_touch_git(self, orchestrator):
+        orchestrator.options = orchestrator.options._replace(operation=GitAction.NONE)
+
+        assert orchestrator.perform_git_operations("project", "base123", MODULE_REVISIONS) == {}
+        orchestrator.git_service.fetch_revisions.assert_not_called()
+        orchestrator.git_service.perform_action.assert_not_called()
+
+
+class TestStartPrefetch:
+    def test_base_and_module_repositories_should_be_prefetched(self, orchestrator):
+        module_root = Path(orchestrator.evg_service.get_module_locations.return_value["enterprise"])
+
+        orchestrator.start_prefetch("project")
+        orchestrator._module_prefetch.join()
+
+        orchestrator.git_service.prefetch.assert_has_calls(
+            [
+                call([None], 3),
+                call([module_root / "enterprise", module_root / "wtdevelop"], 3),
+            ]
+        )
+
+    def test_failing_to_find_modules_should_still_prefetch_base(self, orchestrator):
+        orchestrator.evg_service.get_module_locations.side_effect = FileNotFoundError()
+
+        orchestrator.start_prefetch("project")
+        orchestrator._module_prefetch.join()
+
+        orchestrator.git_service.prefetch.assert_called_once_with([None], 3)
+
+    @pytest.mark.parametrize(
+        "prefetch,operation,expected",
+        [
+            (True, GitAction.CHECKOUT, True),
+            (False, GitAction.CHECKOUT, False),
+            (True, GitAction.NONE, False),
+        ],
+    )
+    def test_prefetch_should_start_before_search(self, orchestrator, prefetch, operation, expected):
+        orchestrator.options = orchestrator.options._replace(prefetch=prefetch, operation=operation)
+        orchestrator.options = orchestrator.options._replace(use_daemon=False)
+        orchestrator.search_service.find_revision.return_value = None
+
+        orchestrator.checkout_good_base("project", [])
+
+        assert orchestrator.git_service.prefetch.called == expected
+
+    def test_background_fetches_should_finish_before_returning(self, orchestrator):
+        orchestrator.options = orchestrator.options._replace(use_daemon=False)
+        orchestrator.search_service.find_revision.return_value = None
+
+        orchestrator.checkout_good_base("project", [])
+
+        assert not orchestrator._module_prefetch.is_alive()
+        orchestrator.git_service.wait_for_prefetches.assert_called_once()
+
+
+class TestFindRevision:
+    def test_reachable_revisions_should_limit_a_local_search(self, orchestrator):
+        orchestrator.options = orchestrator.options._replace(reachable_from="origin/master")
+        orchestrator.git_service.reachable_revisions.return_value = {"abc123"}
+
+        orchestrator.find_revision("project", [])
+
+        orchestrator.git_service.reachable_revisions.assert_called_once_with("origin/master")
+        orchestrator.daemon_client.find_revision.assert_not_called()
+        orchestrator.search_service.find_revision.assert_called_once_with("project", [], {"abc123"})
+
+    def test_unknown_reachable_ref_should_raise_a_clear_error(self, orchestrator):
+        orchestrator.options = orchestrator.options._replace(reachable_from="origin/missing")
+        orchestrator.git_service.reachable_revisions.side_effect = ProcessExecutionError(
+            ["git", "rev-list"], 128, "", "fatal: bad revision 'origin/missing'"
+        )
+
+        with pytest.raises(ValueError, match="reachable from 'origin/missing'"):
+            orchestrator.find_revision("project", [])
+
+        orchestrator.search_service.find_revision.assert_not_called()
+
+    def test_search_should_not_be_limited_by_default(self, orchestrator):
+        orchestrator.options = orchestrator.options._replace(use_daemon=False)
+
+        orchestrator.find_revision("project", [])
+
+        orchestrator.git_service.reachable_revisions.assert_not_called()
+        orchestrator.search_service.find_revision.assert_called_once_with("project", [], None)
+
+    @pytest.mark.parametrize("profile,stats", [(True, False), (False, True)])
+    def test_measured_searches_should_not_use_the_daemon(self, orchestrator, profile, stats):
+        orchestrator.profile_service = ProfileService(enabled=profile)
+        orchestrator.stats_service = StatsService(enabled=stats)
+        orchestrator.search_service.find_revision.return_value = "abc123"
+
+        assert orchestrator.find_revision("project", []) == "abc123"
+
+        orchestrator.daemon_client.find_revision.assert_not_called()
+        orchestrator.search_service.find_revision.assert_called_once_with("project", [], None)
+
+    def test_unmeasured_searches_should_use_the_daemon(self, orchestrator):
+        orchestrator.daemon_client.find_revision.return_value = "abc123"
+
+        assert orchestrator.find_revision("project", []) == "abc123"
+
+        orchestrator.search_service.find_revision.assert_not_called()
+
+
+class TestChooseCandidate:
+    def test_candidate_closest_to_head_should_be_chosen(self, orchestrator):
+        distances = {"new123": (2, 40), "mid456": (2, 5), "old789": (2, 30)}
+        orchestrator.git_service.commit_distance.side_effect = distances.get
+
+        assert orchestrator.choose_candidate(list(distances)) == "mid456"
+        orchestrator.git_service.fetch_missing_revisions.assert_called_once_with(list(distances))
+
+    def test_ties_should_go_to_the_newest_candidate(self, orchestrator):
+        orchestrator.git_service.commit_distance.return_value = (1, 1)
+
+        assert orchestrator.choose_candidate(["new123", "old456"]) == "new123"
+
+    def test_candidates_that_can_not_be_measured_should_be_ignored(self, orchestrator):
+        def commit_distance(revision):
+            if revision == "new123":
+                raise ProcessExecutionError(["git", "rev-list"], 128, "", "")
+            return (0, 10)
+
+        orchestrator.git_service.commit_distance.side_effect = commit_distance
+
+        assert orchestrator.choose_candidate(["new123", "old456"]) == "old456"
+
+    def test_newest_candidate_should_be_used_if_none_can_be_measured(self, orchestrator):
+        orchestrator.git_service.commit_distance.side_effect = ProcessExecutionError(
+            ["git", "rev-list"], 128, "", ""
+        )
+
+        assert orchestrator.choose_candidate(["new123", "old456"]) == "new123"
+
+    def test_no_candidates_should_return_none(self, orchestrator):
+        assert orchestrator.choose_candidate([]) is None
+        orchestrator.git_service.commit_distance.assert_not_called()
+
+    @pytest.mark.parametrize(
+        "operation,candidates,expected",
+        [
+            (GitAction.REBASE, 3, True),
+            (GitAction.MERGE, 3, True),
+            (GitAction.CHECKOUT, 3, False),
+            (GitAction.REBASE, 1, False),
+        ],
+    )
+    def test_candidates_should_only_be_searched_for_rebase_and_merge(
+        self, orchestrator, operation, candidates, expected
+    ):
+        orchestrator.options = orchestrator.options._replace(
+            operation=operation, candidates=candidates
+        )
+        orchestrator.search_service.find_revisions.return_value = ["abc123"]
+        orchestrator.daemon_client.find_revision.return_value = "abc123"
+
+        assert orchestrator.find_revision("project", []) == "abc123"
+
+        assert orchestrator.search_service.find_revisions.called == expected
+        assert orchestrator.daemon_client.find_revision.called != expected